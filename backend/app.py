@@ -1,36 +1,105 @@
 import os
-import json
 import datetime
-import configparser
+import hashlib
+import logging
+import mimetypes
+import re
+import shutil
+import socket
+import threading
 import time
 import uuid
-from flask import Flask, request, jsonify, send_from_directory
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
-import threading
 from utils import (
     pdf_to_images,
     process_form_images,
+    pdf_page_count,
+    rasterize_pdf_page,
+    render_pdf_page,
+    segment_page_image,
     chat,
     generate_af,
     sandbox_packager,
     dev_packager,
-    process_json_strings,
+    prepare_package_skeleton,
     copy_and_rename_zip_file,
     move_folder_to_zip,
     resource_path,
 )
+from artifacts import SUFFIX as ARTIFACT_SUFFIX, ArtifactError, ArtifactReader, ArtifactWriter
+from cancellation import (
+    CANCELLED,
+    CancelToken,
+    ConversionCancelled,
+    Deadlines,
+    SectionTimeoutError,
+    call_with_cancel,
+    describe,
+)
+from bulk import BulkSettings, BulkSubmissionError, resolve_sources
+from checkpoints import FileCheckpoint
+from config_service import ConfigService
+from budget import BudgetExceededError, BudgetGovernor, BudgetLimits, SessionBudget
+from dedup import SectionDeduplicator
+from concurrency import AdaptiveLimit
+from endpoints import EndpointPool
+from memory import MemoryLimits, PageBudget, RssMonitor
+from pruning import Image as PILImage, REASONS as PRUNE_REASONS, PagePruner, PruneSettings
+from scheduler import PriorityLimiter, SessionScheduler, lane_for_mode
+from storage import RetentionPolicy, RetentionSweeper, SessionStorage
+from text_layer import extract_text_layer, page_answers
+from task_queue import (
+    CANCELLED as TASK_CANCELLED,
+    COMPLETED as TASK_COMPLETED,
+    LEASED,
+    TERMINAL_STATES,
+    SessionSpend,
+    TaskQueue,
+    Worker,
+)
+from observability import (
+    AI_CALL_DURATION,
+    AI_CALLS,
+    AI_COST,
+    AI_TOKENS,
+    FILES_PROCESSED,
+    REGISTRY,
+    SECTIONS_SKIPPED_AI,
+    STEP_DURATION,
+    Gauge,
+    bind_log_context,
+    configure_logging,
+    configure_tracing,
+    span,
+    start_span,
+)
+from revisions import RevisionTracker, index_path, latest_index, set_latest_index
+from records import (
+    ResponseValidationError,
+    parse_section_response,
+    parse_title_headers,
+    parse_title_response,
+    write_form_json,
+)
 
 app = Flask(__name__)
 CORS(app)
 
+logger = logging.getLogger("form_conversion")
+
 # Configuration
 UPLOAD_FOLDER = "uploads"
 OUTPUTS_FOLDER = "outputs"
+CHECKPOINTS_FOLDER = os.path.join(OUTPUTS_FOLDER, "checkpoints")
 ALLOWED_EXTENSIONS = {"pdf"}
+ACTIVE_STATUSES = ("pending", "queued", "processing")
 
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-app.config["MAX_CONTENT_LENGTH"] = 100 * 1024 * 1024  # 100MB max file size
 
 # Global variables for tracking conversion progress and statistics
 conversion_sessions = {}
@@ -40,13 +109,201 @@ global_stats = {
     "total_pages_all_forms": 0,
     "total_sections_all_forms": 0,
 }
+_global_stats_lock = threading.Lock()
+
+
+def add_to_global_stats(result):
+    """Count a completed file in global_stats, in the process that serves the API"""
+    if not result or result.get("status") != "completed":
+        return
+    with _global_stats_lock:
+        global_stats["total_tokens_all_forms"] += result["total_tokens"]
+        global_stats["total_cost_all_forms"] += result["total_cost"]
+        global_stats["total_pages_all_forms"] += result["page_count"]
+        global_stats["total_sections_all_forms"] += result["num_sections"]
+    logger.debug(
+        f"📊 [FILE] Global stats updated - Total tokens: {global_stats['total_tokens_all_forms']}, "
+        f"Total cost: ${global_stats['total_cost_all_forms']:.4f}"
+    )
 
 # Ensure directories exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUTS_FOLDER, exist_ok=True)
-os.makedirs(os.path.join(OUTPUTS_FOLDER, "images_of_pdfs"), exist_ok=True)
-os.makedirs(os.path.join(OUTPUTS_FOLDER, "json_outputs"), exist_ok=True)
-os.makedirs(os.path.join(OUTPUTS_FOLDER, "generated_AF"), exist_ok=True)
+os.makedirs(CHECKPOINTS_FOLDER, exist_ok=True)
+
+
+def active_session_ids():
+    active = {
+        session_id
+        for session_id, session in list(conversion_sessions.items())
+        if session.status in ACTIVE_STATUSES
+    }
+    if task_queue is not None:
+        active |= task_queue.active_session_ids()
+    return active
+
+
+# .config and secrets.json are parsed once and re-read only when they change
+config_service = ConfigService(".config", "secrets.json")
+_startup_config = config_service.snapshot()
+
+app.config["MAX_CONTENT_LENGTH"] = int(
+    _startup_config.getfloat("memory", "max_upload_mb", fallback=100) * 1024 * 1024
+)
+
+# Memory-bounded mode: pages go through a sliding window and page bitmaps
+# in memory are capped across all sessions
+memory_limits = MemoryLimits.from_config(_startup_config)
+page_budget = PageBudget(memory_limits.max_pages_in_flight, memory_limits.max_bitmap_bytes)
+
+# Distributed mode: /api/process queues one task per file for worker processes
+task_queue = (
+    TaskQueue.from_config(_startup_config, os.path.join(OUTPUTS_FOLDER, "task_queue.db"))
+    if _startup_config.getboolean("distributed", "enabled", fallback=False)
+    else None
+)
+
+# Daily token/cost ledger shared by every session and every process: in the
+# task queue database in distributed mode, otherwise in a locked JSON file
+budget_governor = BudgetGovernor(
+    ledger_path=os.path.join(OUTPUTS_FOLDER, "budget_ledger.json"), queue=task_queue
+)
+
+# Logging and tracing
+configure_logging(
+    os.environ.get("LOG_LEVEL") or _startup_config.get("logging", "level", fallback="INFO"),
+    _startup_config.get("logging", "format", fallback="text"),
+)
+configure_tracing(_startup_config.getboolean("tracing", "enabled", fallback=False))
+
+# Background deletion of old uploads/outputs shards
+retention_sweeper = RetentionSweeper(
+    UPLOAD_FOLDER,
+    OUTPUTS_FOLDER,
+    CHECKPOINTS_FOLDER,
+    RetentionPolicy.from_config(_startup_config),
+    active_session_ids,
+)
+
+
+# Priority lanes: interactive single-file sessions get reserved AI capacity
+# and are dispatched ahead of batches
+ai_limiter = PriorityLimiter(
+    capacity=_startup_config.getint("scheduler", "ai_max_in_flight", fallback=8),
+    reserved_interactive=_startup_config.getint("scheduler", "ai_reserved_interactive", fallback=2),
+)
+session_scheduler = SessionScheduler(
+    lambda session: process_files(session),
+    max_interactive=_startup_config.getint("scheduler", "max_interactive_sessions", fallback=4),
+    max_batch=_startup_config.getint("scheduler", "max_batch_sessions", fallback=2),
+)
+
+
+# chat() calls are spread over the AI deployments in secrets.json
+ai_endpoints = EndpointPool()
+ai_endpoints.configure(_startup_config)
+
+# Adaptive concurrency: the AI cap follows observed latency and 429s,
+# starting from ai_max_in_flight
+ai_concurrency = None
+if ai_limiter.capacity and _startup_config.getboolean("adaptive_concurrency", "enabled", fallback=True):
+    ai_concurrency = AdaptiveLimit.from_config(
+        _startup_config,
+        ai_limiter.capacity,
+        on_change=ai_limiter.set_capacity,
+        in_flight=ai_limiter.total_in_flight,
+    )
+    ai_limiter.set_capacity(ai_concurrency.limit)
+    ai_endpoints.listeners.append(ai_concurrency.observe)
+
+
+# Speculative title requests and package pre-builds run here, off the section loop
+prefetch_executor = ThreadPoolExecutor(
+    max_workers=_startup_config.getint("prefetch", "workers", fallback=4),
+    thread_name_prefix="prefetch",
+)
+
+
+# Pages of files in page-parallel mode, shared by every session
+page_executor = ThreadPoolExecutor(
+    max_workers=max(1, _startup_config.getint("pages", "workers", fallback=4)),
+    thread_name_prefix="page",
+)
+
+
+# Gauges computed when /metrics is scraped
+def _queue_depth():
+    return sum(
+        len(session.files) - len(session.results)
+        for session in list(conversion_sessions.values())
+        if session.status in ACTIVE_STATUSES
+    )
+
+
+def _disk_usage_by_kind():
+    usage = retention_sweeper.last_usage
+    if usage is None:
+        return {}
+    return {(kind,): values["bytes"] for kind, values in usage["by_kind"].items()}
+
+
+REGISTRY.register(
+    Gauge("form_conversion_active_sessions", "Sessions pending or processing",
+          callback=lambda: len(active_session_ids()))
+)
+REGISTRY.register(
+    Gauge("form_conversion_queue_depth", "Files waiting or in progress across active sessions",
+          callback=_queue_depth)
+)
+REGISTRY.register(
+    Gauge("form_conversion_disk_usage_bytes", "Disk usage at the last retention sweep", ["kind"],
+          callback=_disk_usage_by_kind)
+)
+REGISTRY.register(
+    Gauge("form_conversion_ai_in_flight", "In-flight chat() calls per lane", ["lane"],
+          callback=lambda: {(lane,): n for lane, n in ai_limiter.stats()["in_flight"].items()})
+)
+REGISTRY.register(
+    Gauge("form_conversion_sessions_queued", "Sessions waiting for a worker per lane", ["lane"],
+          callback=lambda: {(lane,): n for lane, n in session_scheduler.stats()["queued"].items()})
+)
+REGISTRY.register(
+    Gauge("form_conversion_tasks", "Distributed file tasks by state", ["state"],
+          callback=lambda: {(state,): n for state, n in task_queue.stats()["tasks"].items()} if task_queue else {})
+)
+REGISTRY.register(
+    Gauge("form_conversion_page_bitmaps_in_flight", "Page bitmaps held in memory in memory-bounded mode",
+          callback=lambda: page_budget.stats()["pages_in_flight"])
+)
+REGISTRY.register(
+    Gauge("form_conversion_ai_endpoint_in_flight", "In-flight chat() calls per AI endpoint", ["endpoint"],
+          callback=lambda: {(e["name"],): e["in_flight"] for e in ai_endpoints.stats()})
+)
+REGISTRY.register(
+    Gauge("form_conversion_ai_endpoint_latency_seconds", "Moving average chat() latency per AI endpoint",
+          ["endpoint"],
+          callback=lambda: {(e["name"],): e["latency_s"] for e in ai_endpoints.stats() if e["latency_s"] is not None})
+)
+REGISTRY.register(
+    Gauge("form_conversion_ai_endpoint_open", "1 while an AI endpoint's circuit is open", ["endpoint"],
+          callback=lambda: {(e["name"],): int(e["state"] == "open") for e in ai_endpoints.stats()})
+)
+REGISTRY.register(
+    Gauge("form_conversion_ai_concurrency_limit", "Current cap on in-flight chat() calls",
+          callback=lambda: ai_limiter.stats()["capacity"])
+)
+REGISTRY.register(
+    Gauge("form_conversion_ai_latency_baseline_seconds", "Lowest recent round median of chat() latency",
+          callback=lambda: ai_concurrency.stats()["baseline_latency_s"] or 0 if ai_concurrency else {})
+)
+REGISTRY.register(
+    Gauge("form_conversion_ai_latency_recent_seconds", "Median chat() latency of the last adaptive round",
+          callback=lambda: ai_concurrency.stats()["recent_latency_s"] or 0 if ai_concurrency else {})
+)
+REGISTRY.register(
+    Gauge("form_conversion_daily_tokens", "Tokens booked in today's budget ledger",
+          callback=lambda: budget_governor.daily()["tokens"])
+)
 
 
 def allowed_file(filename):
@@ -60,33 +317,163 @@ def validate_pdf_filename(filename):
 
 
 class ConversionSession:
-    def __init__(self, session_id, files, mode):
+    # Setting any of these bumps version, which the summary and paginated
+    # results endpoints use as their ETag
+    VERSIONED_FIELDS = frozenset(
+        ("status", "progress", "current_step", "current_file", "current_file_index", "results", "error_message")
+    )
+    # Pipeline steps of every file, in order
+    STEPS = (
+        "Initializing conversion process",
+        "Converting PDF to high-quality images",
+        "Segmenting images into form sections",
+        "Extracting form code from file name",
+        "Processing individual form sections",
+        "Writing structured JSON data",
+        "Generating final AF package",
+    )
+
+    def __init__(self, session_id, files, mode, storage=None, sources=None):
+        # Bumped on every change to VERSIONED_FIELDS, from any thread
+        self._version_lock = threading.Lock()
+        self.version = 0
         self.session_id = session_id
+        self.storage = (
+            storage or SessionStorage(session_id, UPLOAD_FOLDER, OUTPUTS_FOLDER)
+        ).create()
         self.files = files
+        self.sources = sources or {}  # filename -> server-side path read in place (bulk sessions)
         self.mode = mode  # 'single' or 'batch'
         self.current_file_index = 0
         self.current_step = 0
         self.progress = 0
-        self.status = "pending"  # pending, processing, completed, error
+        self.status = "pending"  # pending, queued, processing, completed, error, cancelled
         self.current_file = None
         self.start_time = time.time()
-        self.steps = [
-            "Initializing conversion process",
-            "Converting PDF to high-quality images",
-            "Segmenting images into form sections",
-            "Extracting form code from file name",
-            "Processing individual form sections",
-            "Writing structured JSON data",
-            "Generating final AF package",
-        ]
+        self.steps = list(self.STEPS)
         self.results = []
         self.error_message = None
+        self.section_dedup = None  # SectionDeduplicator, set when dedup is enabled
+        self.budget = SessionBudget(len(files))
+        self.config = None  # ConfigSnapshot taken when processing starts
+        self.use_checkpoints = True
+        self.speculative_title = True
+        self.page_parallel = False  # render, segment and answer pages concurrently
+        self.text_layer = False  # answer pages with a usable PDF text layer without chat()
+        self.text_layer_min_confidence = 0.8
+        self.text_layer_min_chars = 200
+        self.revisions = False  # index sections for the next revision of a form
+        self.revision_reuse = False  # reuse unchanged sections from the previous revision
+        self.requested_revision_reuse = None  # per-session override of [revision] enabled
+        self.revision_max_distance = 8
+        self.pruning = PruneSettings(enabled=False)  # blank crops and duplicate pages skip chat()
+        self.distributed = False  # files run as task_queue tasks on worker processes
+        self.counted_tasks = set()  # completed tasks already added to global_stats
+        self.pack_artifacts = False  # pack a finished file's intermediates into one container
+        self.artifact_compression = "zstd"
+        self.artifact_level = 3
+        self.keep_loose_artifacts = True
+        self.deadlines = Deadlines()
+        self.cancel_token = CancelToken()
+        self.file_token = self.cancel_token  # child token of the file being processed
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self.VERSIONED_FIELDS:
+            self.bump_version()
+
+    def bump_version(self):
+        with self._version_lock:
+            object.__setattr__(self, "version", self.version + 1)
+
+    def file_path(self, filename):
+        """Where the pipeline reads a file: in place for bulk sessions, uploads/ otherwise"""
+        return self.sources.get(filename) or os.path.join(self.storage.uploads, filename)
+
+    def add_result(self, result):
+        self.results.append(result)
+        self.bump_version()
+
+    def _update(self, **values):
+        """Set only the fields that changed, so polling does not bump version"""
+        for name, value in values.items():
+            if getattr(self, name) != value:
+                setattr(self, name, value)
+
+    def sync_from_tasks(self, tasks, spend=None):
+        """
+        Rebuild progress, results and spend (tokens, cost, sections from the
+        queue) of a distributed session from its task rows
+        """
+        if not tasks:
+            return
+        for task in tasks:
+            if task["status"] == TASK_COMPLETED and task["id"] not in self.counted_tasks:
+                self.counted_tasks.add(task["id"])
+                add_to_global_stats(task["result"])
+        if spend is not None:
+            self.budget.tokens, self.budget.cost, self.budget.sections_done = spend
+            self.budget.files_seen = sum(1 for task in tasks if task["status"] in TERMINAL_STATES)
+        # Results in the order files finished, so result cursors stay valid
+        finished = sorted(
+            (task for task in tasks if task["status"] in TERMINAL_STATES),
+            key=lambda task: (task["updated_at"], task["id"]),
+        )
+        running = [task for task in tasks if task["status"] == LEASED]
+        file_progress = sum(((task["step"] or 0) + 1) / len(self.steps) for task in running)
+        self._update(
+            results=[
+                task["result"] or {"filename": task["filename"], "status": "error", "error": task["error"]}
+                for task in finished
+            ],
+            progress=((len(finished) + file_progress) / len(self.files)) * 100,
+        )
+        if running:
+            self._update(
+                current_file_index=running[0]["file_index"],
+                current_file=running[0]["filename"],
+                current_step=running[0]["step"] or 0,
+            )
+        if len(finished) == len(tasks):
+            cancelled = any(task["status"] == TASK_CANCELLED for task in tasks)
+            self._update(status="cancelled" if cancelled else "completed")
+        elif running or finished:
+            self._update(status="processing")
+
+    def queue_position(self):
+        return session_scheduler.queue_position(self.session_id) if self.status == "queued" else None
+
+    def summary(self):
+        """Progress without the per-file results, for frequent polling"""
+        failed = sum(1 for result in self.results if result.get("status") != "completed")
+        return {
+            "session_id": self.session_id,
+            "mode": self.mode,
+            "lane": lane_for_mode(self.mode),
+            "queue_position": self.queue_position(),
+            "total_files": len(self.files),
+            "completed_files": len(self.results) - failed,
+            "failed_files": failed,
+            "current_file_index": self.current_file_index,
+            "current_file": self.current_file,
+            "current_step": self.current_step,
+            "total_steps": len(self.steps),
+            "steps": self.steps,
+            "progress": self.progress,
+            "status": self.status,
+            "started_at": self.start_time,
+            "error_message": self.error_message,
+            "budget": self.budget.to_dict(budget_governor.daily()),
+            "version": self.version,
+        }
 
     def to_dict(self):
         elapsed_time = int(time.time() - self.start_time)
         return {
             "session_id": self.session_id,
             "mode": self.mode,
+            "lane": lane_for_mode(self.mode),
+            "queue_position": self.queue_position(),
             "total_files": len(self.files),
             "current_file_index": self.current_file_index,
             "current_file": self.current_file,
@@ -98,6 +485,8 @@ class ConversionSession:
             "elapsed_time": elapsed_time,
             "results": self.results,
             "error_message": self.error_message,
+            "budget": self.budget.to_dict(budget_governor.daily()),
+            "version": self.version,
         }
 
 
@@ -105,46 +494,24 @@ class ConversionSession:
 def handle_config():
     """Handle configuration and secrets management"""
     if request.method == "GET":
-        # Check if config files exist
-        config_exists = os.path.exists(".config")
-        secrets_exists = os.path.exists("secrets.json")
+        config = config_service.snapshot()
 
         config_data = {}
-        secrets_data = {}
-
-        if config_exists:
-            config = configparser.ConfigParser()
-            config.read(".config")
-            try:
-                config_data["packager_mode"] = config.get("packager", "mode")
-            except (configparser.NoSectionError, configparser.NoOptionError):
-                config_data["packager_mode"] = None
-
-        if secrets_exists:
-            with open("secrets.json", "r") as f:
-                secrets_data = json.load(f)
+        if config.config_exists:
+            config_data["packager_mode"] = config.get("packager", "mode")
 
         return jsonify(
             {
-                "config_exists": config_exists,
-                "secrets_exists": secrets_exists,
+                "config_exists": config.config_exists,
+                "secrets_exists": config.secrets_exists,
                 "config": config_data,
-                "secrets": secrets_data,
+                "secrets": dict(config.secrets),
             }
         )
 
     elif request.method == "POST":
         data = request.json
 
-        # Save config file
-        config = configparser.ConfigParser()
-        config.add_section("packager")
-        config.set("packager", "mode", data.get("packager_mode", "sandbox"))
-
-        with open(".config", "w") as f:
-            config.write(f)
-
-        # Save secrets file
         secrets = {
             "T_NUMBER": data.get("t_number", ""),
             "AZURE_OPENAI_API_KEY": data.get("api_key", ""),
@@ -152,36 +519,49 @@ def handle_config():
             "MODEL_NAME": data.get("model_name", ""),
             "API_VERSION": data.get("api_version", ""),
         }
+        # The settings form only edits the single deployment; keep the others
+        current = config_service.snapshot().secrets
+        if "AI_ENDPOINTS" in current:
+            secrets["AI_ENDPOINTS"] = current["AI_ENDPOINTS"]
 
-        with open("secrets.json", "w") as f:
-            json.dump(secrets, f, indent=4)
+        # Save both files (keeping other .config sections) and reload the snapshot
+        config_service.save(data.get("packager_mode", "sandbox"), secrets)
 
         return jsonify({"success": True, "message": "Configuration saved successfully"})
 
 
+def requested_flag(value):
+    """A true/false request option, None when it is not given"""
+    if value is None or value == "":
+        return None
+    return str(value).lower() in ("1", "true", "yes")
+
+
 @app.route("/api/upload", methods=["POST"])
 def upload_files():
     """Handle file upload and create conversion session"""
-    print(f"\n🔄 [UPLOAD] New upload request received")
+    logger.info(f"🔄 [UPLOAD] New upload request received")
 
     if "files" not in request.files:
-        print("❌ [UPLOAD] No files provided in request")
+        logger.warning("❌ [UPLOAD] No files provided in request")
         return jsonify({"error": "No files provided"}), 400
 
     files = request.files.getlist("files")
     mode = request.form.get("mode", "single")
-    print(f"📁 [UPLOAD] {len(files)} file(s) received, mode: {mode}")
+    logger.info(f"📁 [UPLOAD] {len(files)} file(s) received, mode: {mode}")
 
     if not files or all(f.filename == "" for f in files):
-        print("❌ [UPLOAD] No files selected")
+        logger.warning("❌ [UPLOAD] No files selected")
         return jsonify({"error": "No files selected"}), 400
 
     uploaded_files = []
+    session_id = str(uuid.uuid4())
+    storage = SessionStorage(session_id, UPLOAD_FOLDER, OUTPUTS_FOLDER).create()
 
     for file in files:
         if file and allowed_file(file.filename):
             if not validate_pdf_filename(file.filename):
-                print(f"❌ [UPLOAD] Invalid filename format: {file.filename}")
+                logger.warning(f"❌ [UPLOAD] Invalid filename format: {file.filename}")
                 return (
                     jsonify(
                         {
@@ -192,21 +572,22 @@ def upload_files():
                 )
 
             filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
+            filepath = os.path.join(storage.uploads, filename)
             file.save(filepath)
             uploaded_files.append(filename)
-            print(f"✅ [UPLOAD] Saved file: {filename}")
+            logger.info(f"✅ [UPLOAD] Saved file: {filename}")
         else:
-            print(f"❌ [UPLOAD] Invalid file type: {file.filename}")
+            logger.warning(f"❌ [UPLOAD] Invalid file type: {file.filename}")
             return jsonify({"error": f"Invalid file type: {file.filename}"}), 400
 
     # Create conversion session
-    session_id = str(uuid.uuid4())
-    session = ConversionSession(session_id, uploaded_files, mode)
+    session = ConversionSession(session_id, uploaded_files, mode, storage=storage)
+    # false forces a fresh extraction of every section, true reuses the previous revision
+    session.requested_revision_reuse = requested_flag(request.form.get("reuse_revisions"))
     conversion_sessions[session_id] = session
 
-    print(f"🆔 [UPLOAD] Created session: {session_id}")
-    print(f"📋 [UPLOAD] Files to process: {uploaded_files}")
+    logger.info(f"🆔 [UPLOAD] Created session: {session_id}")
+    logger.info(f"📋 [UPLOAD] Files to process: {uploaded_files}")
 
     return jsonify({"session_id": session_id, "files": uploaded_files, "mode": mode})
 
@@ -214,47 +595,137 @@ def upload_files():
 @app.route("/api/process/<session_id>", methods=["POST"])
 def start_processing(session_id):
     """Start processing the uploaded files"""
-    print(f"\n🚀 [PROCESS] Start processing request for session: {session_id}")
+    logger.info(f"🚀 [PROCESS] Start processing request for session: {session_id}")
 
     if session_id not in conversion_sessions:
-        print(f"❌ [PROCESS] Session not found: {session_id}")
+        logger.warning(f"❌ [PROCESS] Session not found: {session_id}")
         return jsonify({"error": "Session not found"}), 404
 
     session = conversion_sessions[session_id]
-    print(f"📊 [PROCESS] Session status: {session.status}")
+    logger.debug(f"📊 [PROCESS] Session status: {session.status}")
 
     if session.status != "pending":
-        print(f"⚠️ [PROCESS] Session already processed or in progress: {session.status}")
+        logger.warning(f"⚠️ [PROCESS] Session already processed or in progress: {session.status}")
         return jsonify({"error": "Session already processed or in progress"}), 400
 
-    # Start processing in a separate thread
-    print(f"🧵 [PROCESS] Starting background thread for session: {session_id}")
-    thread = threading.Thread(target=process_files, args=(session,))
-    thread.daemon = True
-    thread.start()
+    if task_queue is not None:
+        # Any worker attached to the queue picks the files up
+        session.status = "queued"
+        session.distributed = True
+        task_queue.enqueue(
+            session_id,
+            session.mode,
+            session.files,
+            {
+                "created": session.storage.created.isoformat(),
+                "files": len(session.files),
+                "reuse_revisions": session.requested_revision_reuse,
+            },
+            priority=0 if lane_for_mode(session.mode) == "interactive" else 1,
+            sources=session.sources,
+        )
+        return jsonify({"success": True, "message": "Processing started"})
 
-    print(f"✅ [PROCESS] Background processing started for session: {session_id}")
+    # Hand the session to the scheduler, which starts it when its lane has capacity
+    if not session_scheduler.submit(session):
+        return jsonify({"error": "Session already processed or in progress"}), 400
+
+    logger.info(f"✅ [PROCESS] Session queued for processing: {session_id}")
     return jsonify({"success": True, "message": "Processing started"})
 
 
+def bulk_name_error(filename):
+    """Why the pipeline would reject a bulk file name, None if it is fine"""
+    if not allowed_file(filename):
+        return f"Invalid file type: {filename}"
+    if secure_filename(filename) != filename:
+        return f"Unsafe file name: {filename}"
+    if not validate_pdf_filename(filename):
+        return f"Invalid filename format: {filename}. First 4 characters must be alphabetic."
+    return None
+
+
+@app.route("/api/bulk", methods=["POST"])
+def submit_bulk():
+    """
+    Create a session for PDFs on a server-side volume, read in place without upload.
+    Body: one of directory, glob, files (inline manifest) or manifest (manifest path),
+    plus optional mode (default batch) and start (queue it right away).
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        sources = resolve_sources(data, BulkSettings.from_config(config_service.snapshot()), bulk_name_error)
+    except BulkSubmissionError as e:
+        logger.warning(f"❌ [BULK] Rejected bulk submission: {e}")
+        return jsonify({"error": str(e)}), e.status
+
+    mode = data.get("mode", "batch")
+    session_id = str(uuid.uuid4())
+    files = list(sources)
+    session = ConversionSession(session_id, files, mode, sources=sources)
+    session.requested_revision_reuse = requested_flag(data.get("reuse_revisions"))
+    conversion_sessions[session_id] = session
+    logger.info(f"🗃️ [BULK] Created session {session_id} for {len(files)} file(s) read in place")
+
+    response = {"session_id": session_id, "files": files, "mode": mode}
+    if data.get("start"):
+        started = start_processing(session_id)
+        if isinstance(started, tuple):
+            return started
+    response["status"] = session.status
+    return jsonify(response)
+
+
+@app.route("/api/process/<session_id>/cancel", methods=["POST"])
+def cancel_processing(session_id):
+    """Stop a session; files that already finished keep their results"""
+    if session_id not in conversion_sessions:
+        return jsonify({"error": "Session not found"}), 404
+
+    session = conversion_sessions[session_id]
+    if session.status not in ACTIVE_STATUSES:
+        return jsonify({"error": f"Session is already {session.status}"}), 400
+
+    logger.info(f"🛑 [CANCEL] Cancelling session: {session_id}")
+    session.cancel_token.cancel()
+    if session.distributed:
+        task_queue.cancel_session(session_id)
+    elif session_scheduler.cancel(session) or session.status == "pending":
+        # Never started, so no worker will see the token
+        finish_cancelled(session)
+    # A running worker stops at its next check and marks the session itself
+    return jsonify({"success": True, "status": session.status})
+
+
 @app.route("/api/progress/<session_id>", methods=["GET"])
 def get_progress(session_id):
     """Get the current progress of a conversion session"""
     if session_id not in conversion_sessions:
-        print(f"❌ [PROGRESS] Session not found: {session_id}")
+        logger.warning(f"❌ [PROGRESS] Session not found: {session_id}")
         return jsonify({"error": "Session not found"}), 404
 
     session = conversion_sessions[session_id]
+    if session.distributed:
+        session.sync_from_tasks(task_queue.session_tasks(session_id), task_queue.session_spend(session_id))
+
+    if request.args.get("summary", "").lower() in ("1", "true", "yes"):
+        # Only changes when the session does, so pollers mostly get 304s
+        # Spend is booked without a version bump, so it is part of the ETag too
+        budget = session.budget
+        etag = f"{session_id}-{session.version}-{session.queue_position()}-{budget.state}-{budget.tokens}-{budget.sections_done}"
+        return conditional_json(session.summary(), etag)
+
     progress_data = session.to_dict()
 
-    # Only print significant progress updates (not every poll)
-    if session.status == "processing" and session.current_step is not None:
-        step_name = session.steps[session.current_step] if session.current_step < len(session.steps) else "Unknown"
-        print(f"📈 [PROGRESS] {session_id[:8]}... | Step {session.current_step + 1}/{len(session.steps)}: {step_name} | Progress: {progress_data['progress']:.1f}%")
-    elif session.status == "completed":
-        print(f"🎉 [PROGRESS] {session_id[:8]}... | COMPLETED | 100%")
-    elif session.status == "error":
-        print(f"💥 [PROGRESS] {session_id[:8]}... | ERROR: {session.error_message}")
+    # Polls are frequent, so they are only logged at DEBUG level
+    if logger.isEnabledFor(logging.DEBUG):
+        if session.status == "processing" and session.current_step is not None:
+            step_name = session.steps[session.current_step] if session.current_step < len(session.steps) else "Unknown"
+            logger.debug(f"📈 [PROGRESS] {session_id[:8]}... | Step {session.current_step + 1}/{len(session.steps)}: {step_name} | Progress: {progress_data['progress']:.1f}%")
+        elif session.status == "completed":
+            logger.debug(f"🎉 [PROGRESS] {session_id[:8]}... | COMPLETED | 100%")
+        elif session.status == "error":
+            logger.debug(f"💥 [PROGRESS] {session_id[:8]}... | ERROR: {session.error_message}")
 
     return jsonify(progress_data)
 
@@ -266,6 +737,8 @@ def get_results(session_id):
         return jsonify({"error": "Session not found"}), 404
 
     session = conversion_sessions[session_id]
+    if session.distributed:
+        session.sync_from_tasks(task_queue.session_tasks(session_id), task_queue.session_spend(session_id))
 
     if session.status != "completed":
         return jsonify({"error": "Session not completed yet"}), 400
@@ -279,6 +752,110 @@ def get_results(session_id):
     )
 
 
+RESULTS_PAGE_LIMIT = 100
+RESULTS_PAGE_MAX_LIMIT = 1000
+
+
+def conditional_json(payload, etag):
+    """JSON response with an ETag, or 304 when the client already has it"""
+    response = jsonify(payload)
+    response.set_etag(etag)
+    # Always revalidate, so browsers send If-None-Match instead of using a stale copy
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
+@app.route("/api/sessions/<session_id>/results", methods=["GET"])
+def get_session_results(session_id):
+    """
+    One page of a session's file results, in the order files finished.
+    ?after=<next_cursor>&limit=<n>&fields=filename,status,...
+    """
+    if session_id not in conversion_sessions:
+        return jsonify({"error": "Session not found"}), 404
+
+    session = conversion_sessions[session_id]
+    if session.distributed:
+        session.sync_from_tasks(task_queue.session_tasks(session_id), task_queue.session_spend(session_id))
+
+    try:
+        start = int(request.args.get("after") or 0)
+        limit = int(request.args.get("limit") or RESULTS_PAGE_LIMIT)
+    except ValueError:
+        return jsonify({"error": "after and limit must be integers"}), 400
+    if start < 0 or limit < 1:
+        return jsonify({"error": "after must be >= 0 and limit >= 1"}), 400
+    limit = min(limit, RESULTS_PAGE_MAX_LIMIT)
+
+    fields = sorted({field for field in request.args.get("fields", "").split(",") if field})
+
+    # Results are append-only, so a page is fully described by the version
+    # and the normalized query
+    query = hashlib.sha1(f"{start}:{limit}:{','.join(fields)}".encode()).hexdigest()[:12]
+    etag = f"{session_id}-{session.version}-{query}"
+    if etag in request.if_none_match:
+        return conditional_json({}, etag)
+
+    results = session.results[start:start + limit]
+    if fields:
+        results = [{field: result[field] for field in fields if field in result} for result in results]
+    end = start + len(results)
+    return conditional_json(
+        {
+            "session_id": session_id,
+            "status": session.status,
+            "total": len(session.results),
+            "results": results,
+            # None once every result has been returned and no more can arrive
+            "next_cursor": (
+                None if end == len(session.results) and session.status not in ACTIVE_STATUSES else str(end)
+            ),
+            "version": session.version,
+        },
+        etag,
+    )
+
+
+@app.route("/api/storage", methods=["GET"])
+def get_storage():
+    """Disk usage of uploads/outputs and the last retention sweep"""
+    return jsonify(
+        {
+            "usage": retention_sweeper.disk_usage(),
+            "last_sweep": retention_sweeper.last_sweep,
+        }
+    )
+
+
+@app.route("/api/endpoints", methods=["GET"])
+def get_endpoints():
+    """Load, latency, token and circuit stats of each AI endpoint (without API keys)"""
+    return jsonify({"endpoints": ai_endpoints.stats()})
+
+
+@app.route("/api/artifacts/<path:container>", methods=["GET"])
+def get_artifact(container):
+    """Index of a packed artifact container, or one entry of it with ?entry=<name>"""
+    path = safe_join(OUTPUTS_FOLDER, container)
+    if path is None or not path.endswith(ARTIFACT_SUFFIX) or not os.path.isfile(path):
+        return jsonify({"error": "Artifact container not found"}), 404
+    try:
+        reader = ArtifactReader(path)
+        entry = request.args.get("entry")
+        if entry is None:
+            return jsonify(reader.listing())
+        data = reader.read(entry)
+    except ArtifactError as e:
+        return jsonify({"error": str(e)}), 404
+    return Response(data, mimetype=mimetypes.guess_type(entry)[0] or "application/octet-stream")
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus text exposition of the backend metrics"""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
 @app.route("/api/download/<path:filename>")
 def download_file(filename):
     """Download generated files"""
@@ -290,62 +867,475 @@ def download_file(filename):
 
 def process_files(session):
     """Process files in a conversion session"""
-    global global_stats
-
-    print(f"\n🔧 [WORKER] Starting file processing for session: {session.session_id}")
-    print(f"📂 [WORKER] Files to process: {session.files}")
+    bind_log_context(session_id=session.session_id)
+    logger.info(f"🔧 [WORKER] Starting file processing for session: {session.session_id}")
+    logger.debug(f"📂 [WORKER] Files to process: {session.files}")
 
     try:
         session.status = "processing"
-        print(f"🔄 [WORKER] Session status changed to: {session.status}")
-
-        # Load configuration
-        config = configparser.ConfigParser()
-        config.read(".config")
-        packager_mode = config.get("packager", "mode", fallback="sandbox")
-        print(f"⚙️ [WORKER] Packager mode: {packager_mode}")
+        logger.debug(f"🔄 [WORKER] Session status changed to: {session.status}")
 
-        # Load secrets
-        with open("secrets.json", "r") as f:
-            secrets = json.load(f)
-        t_number = secrets.get("T_NUMBER")
-        print(f"👤 [WORKER] T-Number: {t_number}")
+        packager_mode, pretty_json, t_number = configure_session(session)
+        session.cancel_token.set_timeout(session.deadlines.session_seconds)
 
         for file_index, filename in enumerate(session.files):
-            print(f"\n📄 [WORKER] Processing file {file_index + 1}/{len(session.files)}: {filename}")
+            if session.cancel_token.cancelled:
+                break
+            logger.info(f"📄 [WORKER] Processing file {file_index + 1}/{len(session.files)}: {filename}")
             session.current_file_index = file_index
             session.current_file = filename
 
-            filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-            print(f"📍 [WORKER] File path: {filepath}")
+            filepath = session.file_path(filename)
+            logger.debug(f"📍 [WORKER] File path: {filepath}")
 
             # Process each step for this file
             result = process_single_file(
-                session, filename, filepath, packager_mode, t_number
+                session, filename, filepath, packager_mode, t_number,
+                pretty_json=pretty_json,
             )
-            session.results.append(result)
-            print(f"✅ [WORKER] File processing completed: {result['status']}")
+            session.add_result(result)
+            add_to_global_stats(result)
+            FILES_PROCESSED.inc(status=result["status"])
+            logger.info(f"✅ [WORKER] File processing completed: {result['status']}")
 
             # Update overall progress
             session.progress = ((file_index + 1) / len(session.files)) * 100
-            print(f"📊 [WORKER] Overall progress: {session.progress:.1f}%")
+            logger.debug(f"📊 [WORKER] Overall progress: {session.progress:.1f}%")
 
-        session.status = "completed"
-        print(f"🎯 [WORKER] All files processed! Session status: {session.status}")
+        if session.cancel_token.cancelled:
+            finish_cancelled(session)
+        else:
+            session.status = "completed"
+        logger.info(f"🎯 [WORKER] All files processed! Session status: {session.status}")
 
     except Exception as e:
-        print(f"💥 [WORKER] Error processing files: {str(e)}")
+        logger.error(f"💥 [WORKER] Error processing files: {str(e)}", exc_info=True)
         session.status = "error"
         session.error_message = str(e)
 
 
-def process_single_file(session, filename, filepath, packager_mode, t_number):
-    """Process a single PDF file through all steps"""
-    print(f"\n🔨 [FILE] Starting processing for: {filename}")
+def finish_cancelled(session):
+    """Mark files that never ran and stop the session as cancelled"""
+    done = {result["filename"] for result in session.results}
+    for filename in session.files:
+        if filename not in done:
+            session.add_result({"filename": filename, "status": CANCELLED, "error": "Not started"})
+    state = session.cancel_token.state() or (CANCELLED, "session")
+    session.error_message = describe(*state)
+    session.status = "cancelled"
+    logger.info(f"🛑 [WORKER] Session {session.session_id[:8]} stopped: {session.error_message}")
+
+
+def configure_session(session):
+    """
+    Take one immutable configuration snapshot for the whole session and apply it.
+    Returns (packager_mode, pretty_json, t_number).
+    """
+    config = session.config = config_service.snapshot()
+    packager_mode = config.packager_mode
+    pretty_json = config.getboolean("output", "pretty_json", fallback=False)
+    logger.info(f"⚙️ [WORKER] Packager mode: {packager_mode}")
+
+    ai_endpoints.configure(config)
+    session.budget.limits = BudgetLimits.from_config(config)
+    session.use_checkpoints = config.getboolean("checkpoints", "enabled", fallback=True)
+    session.speculative_title = config.getboolean("prefetch", "speculative_title", fallback=True)
+    session.page_parallel = config.getboolean("pages", "parallel", fallback=False)
+    session.deadlines = Deadlines.from_config(config)
+    session.text_layer = config.getboolean("text_layer", "enabled", fallback=True)
+    session.text_layer_min_confidence = config.getfloat("text_layer", "min_confidence", fallback=0.8)
+    session.text_layer_min_chars = config.getint("text_layer", "min_chars", fallback=200)
+    # Reuse is opt-in, in .config or per session; a session that asks for a
+    # fresh extraction is still indexed for the next revision
+    revisions_enabled = config.getboolean("revision", "enabled", fallback=False)
+    session.revisions = revisions_enabled or bool(session.requested_revision_reuse)
+    session.revision_reuse = (
+        revisions_enabled if session.requested_revision_reuse is None else session.requested_revision_reuse
+    )
+    session.revision_max_distance = config.getint("revision", "max_distance", fallback=8)
+    session.pruning = PruneSettings.from_config(config)
+    session.pack_artifacts = config.getboolean("artifacts", "enabled", fallback=True)
+    session.artifact_compression = config.get("artifacts", "compression", fallback="zstd")
+    session.artifact_level = config.getint("artifacts", "level", fallback=3)
+    session.keep_loose_artifacts = config.getboolean("artifacts", "keep_loose", fallback=True)
+
+    # Responses are only shared across files, so a single file has nothing to reuse
+    if (
+        config.getboolean("dedup", "enabled", fallback=False)
+        and session.mode != "single"
+        and len(session.files) > 1
+    ):
+        session.section_dedup = SectionDeduplicator(
+            fuzzy=config.getboolean("dedup", "fuzzy", fallback=False),
+            max_distance=config.getint("dedup", "max_distance", fallback=2),
+        )
 
+    if not config.secrets_exists:
+        raise FileNotFoundError("secrets.json not found, save the configuration first")
+    t_number = config.secrets.get("T_NUMBER")
+    logger.info(f"👤 [WORKER] T-Number: {t_number}")
+    return packager_mode, pretty_json, t_number
+
+
+def build_task_session(task):
+    """
+    A one-file ConversionSession for a leased task, using the shared storage
+    shard. Its budget counts the spend of every file of the session (see
+    run_task_session for the session deadline).
+    """
+    storage = SessionStorage(
+        task["session_id"],
+        UPLOAD_FOLDER,
+        OUTPUTS_FOLDER,
+        created=datetime.date.fromisoformat(task["payload"]["created"]),
+    )
+    source = task["payload"].get("source")
+    session = ConversionSession(
+        task["session_id"],
+        [task["filename"]],
+        task["mode"],
+        storage=storage,
+        sources={task["filename"]: source} if source else None,
+    )
+    session.status = "processing"
+    session.current_file = task["filename"]
+    session.budget.total_files = task["payload"].get("files", 1)
+    session.requested_revision_reuse = task["payload"].get("reuse_revisions")
+    session.budget.shared = SessionSpend(task_queue, task["session_id"])
+    return session
+
+
+def run_task_session(session, task):
+    """
+    Run the pipeline for a leased task and return the file result. The session
+    deadline counts from when the session was queued; a spent session budget
+    cancels the session's other tasks.
+    """
+    bind_log_context(session_id=session.session_id, task_id=task["id"])
+    packager_mode, pretty_json, t_number = configure_session(session)
+    if session.deadlines.session_seconds:
+        left = task["created_at"] + session.deadlines.session_seconds - time.time()
+        session.cancel_token.deadline = time.monotonic() + left
+    filepath = session.file_path(task["filename"])
+    try:
+        result = process_single_file(
+            session, task["filename"], filepath, packager_mode, t_number, pretty_json=pretty_json
+        )
+    except BudgetExceededError:
+        task_queue.cancel_session(session.session_id)
+        raise
+    finally:
+        budget_governor.sync(session.budget)
+    FILES_PROCESSED.inc(status=result["status"])
+    return result
+
+
+def start_local_workers(count):
+    """Run task_queue workers inside this process, e.g. for a single-node setup"""
+    workers = []
+    for index in range(count):
+        worker = Worker(
+            task_queue,
+            f"{socket.gethostname()}-{os.getpid()}-{index}",
+            build_task_session,
+            run_task_session,
+            poll_interval=_startup_config.getfloat("distributed", "poll_interval", fallback=2.0),
+        )
+        worker.start()
+        workers.append(worker)
+    return workers
+
+
+def call_ai(session, section_type, section_path):
+    """
+    Send one section to chat() on behalf of a session.
+    Applies the budget governor and the session's priority lane, and records metrics.
+    """
+    token = session.file_token
+    token.check("AI call")
+    # Throttle or pause before spending, then book the actual spend
+    budget_governor.before_call(session.budget, wait=lambda seconds: token.sleep(seconds, "budget pause"))
+
+    def book_abandoned(result):
+        # The request was paid for even though nobody waits for its answer
+        _response, tokens, cost = result
+        AI_TOKENS.inc(tokens)
+        AI_COST.inc(cost)
+        budget_governor.record(session.budget, tokens, cost)
+
+    with span("ai.chat", section_type=section_type, section=os.path.basename(section_path)) as call_span:
+        started = time.perf_counter()
+        try:
+            # Stops waiting, for a slot or for the answer, on cancel, on the
+            # file/session deadline or after section_seconds. The abandoned
+            # request keeps its AI slot until it returns (at most
+            # abandoned_grace_seconds) and its spend is booked then
+            response, tokens, cost = call_with_cancel(
+                lambda: ai_endpoints.call(
+                    lambda endpoint: chat(section_type, section_path, endpoint=endpoint)
+                ),
+                token,
+                session.deadlines.section_seconds,
+                hold=ai_limiter.slot(lane_for_mode(session.mode), token, session.deadlines.section_seconds),
+                on_abandoned=book_abandoned,
+                grace=session.deadlines.abandoned_grace_seconds,
+            )
+        except ConversionCancelled:
+            AI_CALLS.inc(section_type=section_type, outcome="cancelled")
+            raise
+        except SectionTimeoutError:
+            AI_CALLS.inc(section_type=section_type, outcome="timeout")
+            raise
+        except Exception:
+            AI_CALLS.inc(section_type=section_type, outcome="error")
+            raise
+        call_span.set_attribute("tokens", tokens)
+    AI_CALL_DURATION.observe(time.perf_counter() - started, section_type=section_type)
+    AI_CALLS.inc(section_type=section_type, outcome="ok")
+    AI_TOKENS.inc(tokens)
+    AI_COST.inc(cost)
+    budget_governor.record(session.budget, tokens, cost)
+    return response, tokens, cost
+
+
+def package_name_for(form_code, packager_mode):
+    return f"{form_code}_SANDBOX" if packager_mode == "sandbox" else f"{form_code}_DEV"
+
+
+_package_template = None
+
+
+def package_template():
+    """Bytes of blank_zipped_file.zip, read once per process (None when it is missing)"""
+    global _package_template
+    if _package_template is None:
+        try:
+            with open(resource_path("blank_zipped_file.zip"), "rb") as f:
+                _package_template = f.read()
+        except OSError:
+            _package_template = b""
+    return _package_template or None
+
+
+def prewarm_package(session, form_code, packager_mode):
+    """Build the package folders and template zip so step 7 only writes .content.xml"""
+    prepare_package_skeleton(form_code, packager_mode, session.storage.packages)
+    package_name = package_name_for(form_code, packager_mode)
+    template = package_template()
+    if template is None:
+        copy_and_rename_zip_file(
+            resource_path("blank_zipped_file.zip"), session.storage.packages, package_name
+        )
+        return
+    with open(os.path.join(session.storage.packages, f"{package_name}.zip"), "wb") as f:
+        f.write(template)
+
+
+def prefetch_title(session, filename, title_path, form_code, packager_mode):
+    """
+    Ask for the title as soon as the sections exist, then pre-build the package
+    skeleton. Runs on prefetch_executor alongside the rest of step 5.
+    """
+    bind_log_context(session_id=session.session_id, filename=filename)
+    with span("pipeline.prefetch_title", filename=filename):
+        result = call_ai(session, "title", title_path)
+        prewarm_package(session, form_code, packager_mode)
+    logger.debug(f"⚡ [PREFETCH] Title and package skeleton ready for {form_code}")
+    return result
+
+
+def pack_artifacts(session, filename, images_folder, answers, json_path, metadata):
+    """
+    Pack a finished file's page images, section crops, responses and form JSON
+    into one container, then drop the loose images unless keep_loose_artifacts
+    """
+    path = os.path.join(session.storage.artifacts, f"{os.path.splitext(filename)[0]}{ARTIFACT_SUFFIX}")
+    with ArtifactWriter(path, session.artifact_compression, session.artifact_level) as writer:
+        images = writer.add_tree(images_folder, kind="image") if os.path.isdir(images_folder) else 0
+        for page_number, _index, section, (response, tokens, cost, source) in answers:
+            writer.add_json(
+                f"responses/{os.path.splitext(section)[0]}.json",
+                {"page": page_number, "response": response, "tokens": tokens, "cost": cost, "source": source},
+                kind="response",
+            )
+        writer.add_file(os.path.basename(json_path), json_path, kind="form_json")
+        writer.metadata = dict(metadata, codec=writer.codec)
+    stored = os.path.getsize(path)
+    logger.info(
+        f"🗜️ [ARTIFACTS] Packed {images} images and {len(answers)} responses into {path} "
+        f"({writer.raw_bytes} -> {stored} bytes)"
+    )
+    if not session.keep_loose_artifacts:
+        shutil.rmtree(images_folder, ignore_errors=True)
+    return path
+
+
+# Section crops named after their page, as segment_page_image names them
+PAGE_SECTION_PATTERN = re.compile(r"^page_(\d+)_section_")
+PAGE_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+def prune_page(session, pruner, page_number, image_path, sections):
+    """
+    (reason, skipped sections) for a page the pruner rejects (blank or a
+    repeat), (None, ()) otherwise. The title is never pruned, it names the
+    whole form. Skipped sections are counted as done.
+    """
+    reason = pruner.page(page_number, image_path) if pruner is not None else None
+    if not reason:
+        return None, ()
+    skipped = [section for section in sections if "section_0_title" not in section]
+    pruner.page_sections(page_number, skipped)
+    budget_governor.count_sections(session.budget, len(skipped))
+    return reason, skipped
+
+
+def prune_rendered_pages(session, pruner, images_folder, sections):
+    """
+    The page check for a file rendered and segmented as a whole: each page
+    image in images_folder, in name order, is checked against the sections
+    named after it. {section: reason} for the sections to skip.
+    """
+    by_page = {}
+    for section in sections:
+        match = PAGE_SECTION_PATTERN.match(section)
+        if match:
+            by_page.setdefault(int(match.group(1)), []).append(section)
+    if not by_page or not os.path.isdir(images_folder):
+        # No section says which page it came from, a page verdict would skip nothing
+        return {}
+    pages = sorted(
+        name
+        for name in os.listdir(images_folder)
+        if name.lower().endswith(PAGE_IMAGE_EXTENSIONS) and os.path.isfile(os.path.join(images_folder, name))
+    )
+    skipped = {}
+    for page_number, name in enumerate(pages):
+        reason, page_skipped = prune_page(
+            session, pruner, page_number, os.path.join(images_folder, name), by_page.get(page_number, [])
+        )
+        skipped.update((section, reason) for section in page_skipped)
+    return skipped
+
+
+def process_page(
+    session, filename, filepath, images_folder, page_number, answer, pruner=None, on_segmented=None
+):
+    """
+    Render, segment and answer one page; returns [(page, section index, section, answer)].
+    The body sections of a page the pruner rejects (blank or a repeat) skip answer().
+    on_segmented(page_number, sections) runs before any of them is answered.
+    """
+    bind_log_context(session_id=session.session_id, filename=filename)
+    sections_dir = os.path.join(images_folder, "sections")
+    with span("pipeline.page", filename=filename, page=page_number):
+        if memory_limits.enabled:
+            # The bitmap only lives until its sections are cut out, the AI
+            # calls below work from the section files. The slot is taken for
+            # the estimated size and charged the real one once rasterized.
+            with page_budget.slot(memory_limits.page_bitmap_bytes) as charge:
+                data = rasterize_pdf_page(filepath, page_number)
+                charge(len(data))
+                image_path = render_pdf_page(filepath, images_folder, page_number, bitmap=data)
+                del data
+                sections = segment_page_image(image_path, sections_dir, page_number)
+        else:
+            image_path = render_pdf_page(filepath, images_folder, page_number)
+            sections = segment_page_image(image_path, sections_dir, page_number)
+        if on_segmented is not None:
+            on_segmented(page_number, sections)
+        reason, skipped = prune_page(session, pruner, page_number, image_path, sections)
+        # The title goes last: its prefetched call runs while the body sections are answered
+        order = sorted(range(len(sections)), key=lambda index: "section_0_title" in sections[index])
+        answers = {}
+        for index in order:
+            section = sections[index]
+            answers[index] = (
+                (None, 0, 0, reason)
+                if section in skipped
+                else answer(section, os.path.join(sections_dir, section))
+            )
+        return [(page_number, index, section, answers[index]) for index, section in enumerate(sections)]
+
+
+def process_pages(
+    session,
+    filename,
+    filepath,
+    images_folder,
+    page_count,
+    answer,
+    text_pages=None,
+    pruner=None,
+    on_segmented=None,
+):
+    """
+    Run the pages of a file on page_executor and merge the answers in page order.
+    Pages in text_pages are answered from their text layer instead.
+    In memory-bounded mode at most max_pages_in_flight pages are submitted at a time.
+    """
+    text_pages = text_pages or {}
+    window = memory_limits.max_pages_in_flight if memory_limits.enabled else max(page_count, 1)
+    answers = []
+    pending = set()
+    next_page = 0
+    try:
+        while next_page < page_count or pending:
+            while next_page < page_count and len(pending) < window:
+                if next_page in text_pages:
+                    answers.extend(page_answers(text_pages[next_page]))
+                    next_page += 1
+                    continue
+                pending.add(
+                    page_executor.submit(
+                        process_page,
+                        session,
+                        filename,
+                        filepath,
+                        images_folder,
+                        next_page,
+                        answer,
+                        pruner,
+                        on_segmented,
+                    )
+                )
+                next_page += 1
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                answers.extend(future.result())
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        raise
+    # Deterministic order whichever page finished first
+    answers.sort(key=lambda item: (item[0], item[1]))
+    return answers
+
+
+def process_single_file(session, filename, filepath, packager_mode, t_number, pretty_json=False):
+    """Process a single PDF file through all steps, reporting its peak RSS"""
+    # RSS is process-wide, so concurrent files show up in each other's peak
+    with RssMonitor() as rss:
+        result = _process_single_file(session, filename, filepath, packager_mode, t_number, pretty_json)
+    result["peak_rss_mb"] = rss.peak_mb
+    logger.debug(f"🧮 [FILE] Peak RSS while processing {filename}: {rss.peak_mb} MB")
+    return result
+
+
+def _process_single_file(session, filename, filepath, packager_mode, t_number, pretty_json=False):
+    bind_log_context(filename=filename)
+    logger.info(f"🔨 [FILE] Starting processing for: {filename}")
+
+    file_token = session.file_token = session.cancel_token.child(session.deadlines.file_seconds)
+    title_future = None
+    checkpoint = None
+    stage_span = None
+    failure = None
     try:
         form_code = filename[:4]
-        print(f"🏷️ [FILE] Extracted form code: {form_code}")
+        logger.debug(f"🏷️ [FILE] Extracted form code: {form_code}")
 
         # Initialize form JSON
         formatted_date = (
@@ -362,136 +1352,505 @@ def process_single_file(session, filename, filepath, packager_mode, t_number):
         total_cost = 0
         total_tokens = 0
         num_sections = 0
+        reused_sections = 0
+        resumed_sections = 0
+
+        # Resume from the last completed step of an earlier failed attempt
+        checkpoint = (
+            FileCheckpoint(CHECKPOINTS_FOLDER, filename, filepath, session.session_id)
+            if session.use_checkpoints
+            else None
+        )
+        resumed_from_step = checkpoint.completed_step + 1 if checkpoint else 0
+        if resumed_from_step > 0:
+            logger.info(f"⏯️ [FILE] Resuming {filename} after step {resumed_from_step}")
+        page_mode = session.page_parallel or memory_limits.enabled
+        step_durations = [0.0] * len(session.steps)
+        step_started = time.perf_counter()
+
+        def end_step(step_index, now):
+            duration = now - step_started
+            step_durations[step_index] = round(duration, 4)
+            STEP_DURATION.observe(duration, step=session.steps[step_index])
+            if stage_span is not None:
+                stage_span.end()
 
         def update_progress(step_index):
+            nonlocal step_started, stage_span
+            # Cooperative cancellation point between stages
+            file_token.check(session.steps[step_index])
+            # Close the timing and span of the previous step
+            now = time.perf_counter()
+            if step_index > 0:
+                end_step(step_index - 1, now)
+            step_started = now
+            stage_span = start_span(
+                "pipeline.step", step=session.steps[step_index], filename=filename
+            )
+
             # Calculate progress: (current_step + file_progress) / total_files
             file_progress = (step_index + 1) / len(session.steps)
             session.progress = ((session.current_file_index + file_progress) / len(session.files)) * 100
-            print(f"📊 [FILE] Step {step_index + 1}/{len(session.steps)} | Progress: {session.progress:.1f}%")
+            logger.debug(f"📊 [FILE] Step {step_index + 1}/{len(session.steps)} | Progress: {session.progress:.1f}%")
 
         # Step 1: Initialize
-        print(f"🚀 [STEP 1] Initializing conversion process...")
+        logger.debug(f"🚀 [STEP 1] Initializing conversion process...")
         session.current_step = 0
         update_progress(0)
         time.sleep(1)  # Simulate processing time
 
+        # Born-digital PDFs: pages with a usable text layer skip rendering and
+        # chat(), only the rest go through the page pipeline
+        text_pages = {}
+        text_page_count = None
+        if session.text_layer:
+            extracted = extract_text_layer(filepath, session.text_layer_min_chars)
+            if extracted:
+                text_page_count = len(extracted)
+                text_pages = {
+                    page.page_number: page
+                    for page in extracted
+                    if page.confidence >= session.text_layer_min_confidence
+                }
+                logger.info(f"📝 [TEXT] {len(text_pages)}/{text_page_count} pages have a usable text layer")
+            if text_pages:
+                page_mode = True
+
         # Step 2: Convert PDF to images
-        print(f"🖼️ [STEP 2] Converting PDF to high-quality images...")
+        logger.debug(f"🖼️ [STEP 2] Converting PDF to high-quality images...")
         session.current_step = 1
         update_progress(1)
-        images_folder, page_count = pdf_to_images(
-            filepath, os.path.join(OUTPUTS_FOLDER, "images_of_pdfs")
-        )
-        print(f"📄 [STEP 2] Converted {page_count} pages to images")
-        time.sleep(2)  # Simulate processing time
+        if page_mode:
+            images_folder = os.path.join(session.storage.images, os.path.splitext(filename)[0])
+            page_count = text_page_count or pdf_page_count(filepath)
+            logger.info(
+                f"📄 [STEP 2] {page_count - len(text_pages)} of {page_count} pages will be rendered in parallel"
+            )
+        elif (
+            checkpoint
+            and checkpoint.has_step(1)
+            # Copied into this session's shard when another session rendered them
+            and checkpoint.adopt_images(session.storage.images)
+        ):
+            images_folder = checkpoint.state["images_folder"]
+            page_count = checkpoint.state["page_count"]
+            logger.info(f"⏯️ [STEP 2] Reusing {page_count} page images from checkpoint")
+        else:
+            images_folder, page_count = pdf_to_images(
+                filepath, session.storage.images
+            )
+            logger.info(f"📄 [STEP 2] Converted {page_count} pages to images")
+            time.sleep(2)  # Simulate processing time
+            if checkpoint:
+                checkpoint.mark_step(1, images_folder=images_folder, page_count=page_count)
 
         # Step 3: Segment images
-        print(f"✂️ [STEP 3] Segmenting images into form sections...")
+        logger.debug(f"✂️ [STEP 3] Segmenting images into form sections...")
         session.current_step = 2
         update_progress(2)
-        sections_directory = process_form_images(images_folder, filename)
-        print(f"📁 [STEP 3] Created sections directory: {sections_directory}")
-        time.sleep(2)
+        if page_mode:
+            sections_directory = os.path.join(images_folder, "sections")
+            logger.debug(f"✂️ [STEP 3] Pages are segmented as they are rendered in step 5")
+        elif (
+            checkpoint
+            and checkpoint.has_step(2)
+            and checkpoint.state.get("sections_directory", "").startswith(images_folder)
+            and os.path.isdir(checkpoint.state["sections_directory"])
+        ):
+            sections_directory = checkpoint.state["sections_directory"]
+            logger.info(f"⏯️ [STEP 3] Reusing sections from checkpoint: {sections_directory}")
+        else:
+            sections_directory = process_form_images(images_folder, filename)
+            logger.info(f"📁 [STEP 3] Created sections directory: {sections_directory}")
+            time.sleep(2)
+            if checkpoint:
+                checkpoint.mark_step(2, sections_directory=sections_directory)
+
+        sections = (
+            os.listdir(sections_directory) if os.path.exists(sections_directory) else []
+        )
+        saved_responses = checkpoint.responses() if checkpoint else {}
+
+        # Sections unchanged since the last conversion of this form_code reuse
+        # its responses (when asked to); this revision is indexed for the next one
+        revision = None
+        if session.revisions:
+            revision = RevisionTracker(
+                latest_index(OUTPUTS_FOLDER, form_code) if session.revision_reuse else None,
+                session.revision_max_distance,
+            )
+            if revision.previous_path:
+                logger.info(f"🔁 [REVISION] Comparing {filename} against {revision.previous_path}")
+
+        # Blank crops and repeated pages are dropped before they reach chat()
+        pruner = PagePruner(session.pruning) if session.pruning.enabled else None
+
+        # Send the title first, right after segmentation, and pre-build the
+        # package once it is known so step 7 is off the critical path
+        title_section = None
+
+        def start_title_prefetch(segmented):
+            nonlocal title_section, title_future
+            title_section = next((s for s in sorted(segmented) if "section_0_title" in s), None)
+            if (
+                session.speculative_title
+                and title_section
+                and title_section not in saved_responses
+                and not (
+                    revision
+                    and revision.match(title_section, "title", os.path.join(sections_directory, title_section))
+                )
+            ):
+                title_future = prefetch_executor.submit(
+                    prefetch_title,
+                    session,
+                    filename,
+                    os.path.join(sections_directory, title_section),
+                    form_code,
+                    packager_mode,
+                )
+
+        if page_mode:
+            # Pages are segmented in step 5, the title is sent once page 1 is
+            def on_segmented(page_number, segmented):
+                if page_number == 0:
+                    start_title_prefetch(segmented)
+        else:
+            on_segmented = None
+            start_title_prefetch(sections)
 
         # Step 4: Extract form code
-        print(f"🔍 [STEP 4] Extracting form code from filename...")
+        logger.debug(f"🔍 [STEP 4] Extracting form code from filename...")
         session.current_step = 3
         update_progress(3)
-        print(f"🏷️ [STEP 4] Form code confirmed: {form_code}")
+        logger.debug(f"🏷️ [STEP 4] Form code confirmed: {form_code}")
         time.sleep(1)
 
         # Step 5: Process sections
-        print(f"🧠 [STEP 5] Processing individual form sections with AI...")
+        logger.debug(f"🧠 [STEP 5] Processing individual form sections with AI...")
         session.current_step = 4
         update_progress(4)
-        sections = (
-            os.listdir(sections_directory) if os.path.exists(sections_directory) else []
-        )
-        print(f"📋 [STEP 5] Found {len(sections)} sections to process")
 
-        for section in sorted(sections):
-            section_path = os.path.join(sections_directory, section)
+        def governed_chat(section_type, section_path):
+            return call_ai(session, section_type, section_path)
+
+        def answer(section, section_path):
+            """
+            (response, tokens, cost, source) for one section, source is ai, checkpoint,
+            revision, dedup or blank
+            """
             section_type = "title" if "section_0_title" in section else "section"
-            print(f"🎯 [STEP 5] Processing section: {section} (type: {section_type})")
+            logger.debug(f"🎯 [STEP 5] Processing section: {section} (type: {section_type})")
+            file_token.check(f"section {section}")
+            budget_governor.count_sections(session.budget)
+
+            saved = saved_responses.get(section)
+            if saved is not None:
+                # Answered before the previous attempt failed, no need to ask again
+                return saved["response"], saved["tokens"], saved["cost"], "checkpoint"
+            if pruner is not None and section_type != "title":
+                reason = pruner.section(section, section_path)
+                if reason:
+                    return None, 0, 0, reason
+            if revision is not None:
+                previous = revision.match(section, section_type, section_path)
+                if previous is not None:
+                    return previous["response"], 0, 0, "revision"
+            if title_future is not None and section == title_section:
+                # Already requested right after segmentation
+                response, tokens, cost = title_future.result()
+                source = "ai"
+            # Titles are form specific, only body sections are shared across forms
+            elif session.section_dedup is not None and section_type != "title":
+                response, tokens, cost, reused = session.section_dedup.get_or_call(
+                    section_type, section_path, governed_chat, owner=filename
+                )
+                source = "dedup" if reused else "ai"
+            else:
+                response, tokens, cost = governed_chat(section_type, section_path)
+                source = "ai"
+            if checkpoint:
+                checkpoint.record_response(section, response, tokens, cost)
+            return response, tokens, cost, source
+
+        # answers are (page, section index, section, answer); page is None
+        # when the whole file was segmented at once
+        if page_mode:
+            answers = process_pages(
+                session,
+                filename,
+                filepath,
+                images_folder,
+                page_count,
+                answer,
+                text_pages=text_pages,
+                pruner=pruner,
+                on_segmented=on_segmented,
+            )
+            logger.info(f"📋 [STEP 5] Answered {len(answers)} sections across {page_count} pages")
+            budget_governor.observe_file(session.budget, page_count, len(answers))
+        else:
+            logger.info(f"📋 [STEP 5] Found {len(sections)} sections to process")
+            budget_governor.observe_file(session.budget, page_count, len(sections))
+            pruned_pages = (
+                prune_rendered_pages(session, pruner, images_folder, sections) if pruner is not None else {}
+            )
+            answers = []
+            for index, section in enumerate(sorted(sections)):
+                answers.append(
+                    (
+                        None,
+                        index,
+                        section,
+                        (None, 0, 0, pruned_pages[section])
+                        if section in pruned_pages
+                        else answer(section, os.path.join(sections_directory, section)),
+                    )
+                )
 
-            response, tokens, cost = chat(section_type, section_path)
+        page_stats = {}
+        section_sources = []
+        text_layer_sections = 0
+        pruned = []
+        for page_number, _index, section, (response, tokens, cost, source) in answers:
+            section_type = "title" if "section_0_title" in section else "section"
             total_cost += cost
             total_tokens += tokens
             num_sections += 1
+            if page_number is not None:
+                stats = page_stats.setdefault(
+                    page_number, {"page": page_number + 1, "num_sections": 0, "total_tokens": 0, "total_cost": 0}
+                )
+                stats["num_sections"] += 1
+                stats["total_tokens"] += tokens
+                stats["total_cost"] += cost
+            section_sources.append(
+                {"section": section, "page": None if page_number is None else page_number + 1, "source": source}
+            )
 
-            print(f"💰 [STEP 5] Section cost: ${cost:.4f}, tokens: {tokens}")
-
-            if response and section_type == "title":
-                form_json["form_title"] = response.get("form_title", "")
-                print(f"📝 [STEP 5] Set form title: {form_json['form_title']}")
-            elif response:
-                form_json["sections"].append(response)
-                print(f"📄 [STEP 5] Added section to form data")
-
-        print(f"💵 [STEP 5] Total cost: ${total_cost:.4f}, total tokens: {total_tokens}")
+            if source in PRUNE_REASONS:
+                pruned.append(
+                    {"section": section, "page": section_sources[-1]["page"], **pruner.details(section)}
+                )
+                SECTIONS_SKIPPED_AI.inc(reason=source)
+                logger.debug(f"🧹 [STEP 5] Pruned {section} ({source}), no AI call")
+                continue
+            if source == "text_layer":
+                text_layer_sections += 1
+                SECTIONS_SKIPPED_AI.inc(reason="text_layer")
+                logger.debug(f"📝 [STEP 5] Taken from the PDF text layer")
+            elif source == "revision":
+                SECTIONS_SKIPPED_AI.inc(reason="revision")
+                logger.debug(f"🔁 [STEP 5] Unchanged since the previous revision, reused its response")
+            elif source == "checkpoint":
+                resumed_sections += 1
+                SECTIONS_SKIPPED_AI.inc(reason="checkpoint")
+                logger.debug(f"⏯️ [STEP 5] Restored response from checkpoint")
+            elif source == "dedup":
+                reused_sections += 1
+                SECTIONS_SKIPPED_AI.inc(reason="dedup")
+                logger.debug(f"♻️ [STEP 5] Reused response from an identical section in this batch")
+            else:
+                logger.debug(f"💰 [STEP 5] Section cost: ${cost:.4f}, tokens: {tokens}")
+
+            if not response:
+                logger.warning(f"⚠️ [STEP 5] Empty response for {section}, skipping...")
+                continue
+
+            # Validate once, in (page, section) order
+            try:
+                if section_type == "title":
+                    form_json["form_title"] = parse_title_response(response)
+                    headers = parse_title_headers(response)
+                    if headers:
+                        # The rest of a legacy list-form title response
+                        form_json["title_headers"] = headers
+                    logger.debug(f"📝 [STEP 5] Set form title: {form_json['form_title']}")
+                else:
+                    form_json["sections"].append(parse_section_response(response))
+                    logger.debug(f"📄 [STEP 5] Added section to form data")
+            except ResponseValidationError as e:
+                logger.warning(f"⚠️ [STEP 5] Invalid response for {section}, skipping: {e}")
+
+        logger.info(f"💵 [STEP 5] Total cost: ${total_cost:.4f}, total tokens: {total_tokens}")
         time.sleep(3)
+        if checkpoint:
+            checkpoint.mark_step(4)
 
         # Step 6: Write JSON
-        print(f"💾 [STEP 6] Writing structured JSON data...")
+        logger.debug(f"💾 [STEP 6] Writing structured JSON data...")
         session.current_step = 5
         update_progress(5)
         json_filename = f"{form_code}_input_for_af.json"
-        output_file_path = os.path.join(OUTPUTS_FOLDER, "json_outputs", json_filename)
-
-        form_json = process_json_strings(form_json)
-        with open(output_file_path, "w") as f:
-            json.dump(form_json, f, indent=4)
-
-        print(f"📂 [STEP 6] JSON written to: {output_file_path}")
+        output_file_path = os.path.join(session.storage.json, json_filename)
+
+        write_form_json(form_json, output_file_path, pretty=pretty_json)
+        if revision is not None:
+            for _page, _index, section, (response, _tokens, _cost, source) in answers:
+                if source != "text_layer" and response:
+                    section_type = "title" if "section_0_title" in section else "section"
+                    revision.record(section, section_type, os.path.join(sections_directory, section), response)
+            revision_index = index_path(session.storage.json, form_code)
+            revision.write(revision_index)
+            set_latest_index(OUTPUTS_FOLDER, form_code, revision_index)
+
+        logger.info(f"📂 [STEP 6] JSON written to: {output_file_path}")
         time.sleep(1)
 
         # Step 7: Generate AF package
-        print(f"📦 [STEP 7] Generating final AF package...")
+        logger.debug(f"📦 [STEP 7] Generating final AF package...")
         session.current_step = 6
         update_progress(6)
         content_xml = generate_af(output_file_path)
+        package_name = package_name_for(form_code, packager_mode)
+        if title_future is None:
+            # No speculative title ran, so the skeleton was not pre-built
+            prewarm_package(session, form_code, packager_mode)
 
         # Package based on mode
         if packager_mode == "sandbox":
-            print(f"🏖️ [STEP 7] Creating SANDBOX package...")
-            sandbox_packager(form_code, form_json["last_modified_date"])
-            package_name = f"{form_code}_SANDBOX"
+            logger.debug(f"🏖️ [STEP 7] Creating SANDBOX package...")
+            package_dir = sandbox_packager(
+                form_code, form_json["last_modified_date"], session.storage.packages, content_xml
+            )
         else:
-            print(f"🔧 [STEP 7] Creating DEV package...")
-            dev_packager(form_code, form_json["last_modified_date"])
-            package_name = f"{form_code}_DEV"
+            logger.debug(f"🔧 [STEP 7] Creating DEV package...")
+            package_dir = dev_packager(
+                form_code, form_json["last_modified_date"], session.storage.packages, content_xml
+            )
+        move_folder_to_zip(package_dir, os.path.join(session.storage.packages, f"{package_name}.zip"))
+        artifacts_path = None
+        if session.pack_artifacts:
+            artifacts_path = pack_artifacts(
+                session,
+                filename,
+                images_folder,
+                answers,
+                output_file_path,
+                {"filename": filename, "form_code": form_code, "page_count": page_count},
+            )
 
-        print(f"📦 [STEP 7] Package created: {package_name}")
+        logger.info(f"📦 [STEP 7] Package created: {package_name}")
         time.sleep(2)
-
-        # Update global statistics
-        global_stats["total_tokens_all_forms"] += total_tokens
-        global_stats["total_cost_all_forms"] += total_cost
-        global_stats["total_pages_all_forms"] += page_count
-        global_stats["total_sections_all_forms"] += num_sections
-
-        print(f"📊 [FILE] Global stats updated - Total tokens: {global_stats['total_tokens_all_forms']}, Total cost: ${global_stats['total_cost_all_forms']:.4f}")
+        end_step(len(session.steps) - 1, time.perf_counter())
 
         result = {
             "filename": filename,
             "form_code": form_code,
             "page_count": page_count,
             "num_sections": num_sections,
+            "reused_sections": reused_sections,
+            "text_layer_sections": text_layer_sections,
+            "pruned_sections": len(pruned),
+            "pruned": pruned,
+            "revision": (
+                {
+                    "previous_json": os.path.relpath(
+                        os.path.join(
+                            os.path.dirname(revision.previous_path), f"{form_code}_input_for_af.json"
+                        ),
+                        OUTPUTS_FOLDER,
+                    ).replace(os.sep, "/"),
+                    "reused_sections": sorted(set(revision.reused)),
+                    "requeried_sections": [
+                        item["section"] for item in section_sources if item["source"] in ("ai", "dedup")
+                    ],
+                }
+                if revision is not None and revision.previous_path
+                else None
+            ),
+            "section_sources": section_sources,
+            "resumed_from_step": resumed_from_step,
+            "resumed_sections": resumed_sections,
             "total_tokens": total_tokens,
             "total_cost": total_cost,
             "package_name": package_name,
             "json_file": json_filename,
+            "json_path": session.storage.relative(output_file_path),
+            "package_path": session.storage.relative(
+                os.path.join(session.storage.packages, f"{package_name}.zip")
+            ),
+            "artifacts_path": session.storage.relative(artifacts_path) if artifacts_path else None,
+            "step_durations": step_durations,
+            "pages": [page_stats[page] for page in sorted(page_stats)] if page_mode else None,
             "status": "completed",
         }
 
-        print(f"✅ [FILE] Processing completed successfully for: {filename}")
+        if checkpoint:
+            checkpoint.clear()
+
+        logger.info(f"✅ [FILE] Processing completed successfully for: {filename}")
         return result
 
+    except BudgetExceededError as e:
+        # A spent budget stops the whole session, not just this file
+        failure = e
+        raise
+    except ConversionCancelled as e:
+        failure = e
+        if title_future is not None:
+            title_future.cancel()
+        logger.warning(f"🛑 [FILE] {filename} stopped: {e}")
+        # The checkpoint is kept, so a later attempt resumes from here
+        return {
+            "filename": filename,
+            "status": e.reason,
+            "error": str(e),
+            "stopped_at_step": session.steps[session.current_step],
+            "resumable": session.use_checkpoints,
+        }
     except Exception as e:
-        print(f"💥 [FILE] Error processing {filename}: {str(e)}")
+        failure = e
+        logger.error(f"💥 [FILE] Error processing {filename}: {str(e)}", exc_info=True)
         return {"filename": filename, "status": "error", "error": str(e)}
+    finally:
+        # The span of the step that raised (a no-op once the last step ended)
+        if stage_span is not None:
+            stage_span.end(error=failure)
+        if checkpoint is not None:
+            checkpoint.release()
+
+
+_background_lock = threading.Lock()
+_background_started = False
+
+
+def start_background():
+    """
+    Start the threads of the API process: the retention sweeper and any
+    local_workers. Called by whatever serves the app, never at import, so
+    worker.py can fork the imported backend with no threads running.
+    """
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    if _startup_config.getboolean("retention", "enabled", fallback=True):
+        retention_sweeper.start()
+    if task_queue is not None:
+        start_local_workers(_startup_config.getint("distributed", "local_workers", fallback=0))
+
+
+def preload():
+    """
+    Load what every worker process would otherwise load on first use, in the
+    prefork parent so the forks share it: the current config snapshot and the
+    AI endpoints built from it, the package template and Pillow's image format
+    plugins. Starts no threads, like importing the module.
+    """
+    config = config_service.snapshot()
+    ai_endpoints.configure(config)
+    template = package_template()
+    if PILImage is not None:
+        PILImage.init()
+    logger.info(
+        f"📦 [PRELOAD] Config version {config.version}, {len(ai_endpoints.endpoints)} AI endpoint(s), "
+        f"package template {'loaded' if template else 'missing'}"
+    )
 
 
 if __name__ == "__main__":
+    start_background()
     port = int(os.environ.get('FLASK_PORT', 5001))
     app.run(debug=True, port=port, host='0.0.0.0')
@@ -0,0 +1,191 @@
+"""
+Packed per-file artifact containers
+
+All intermediates of one converted PDF (page images, section crops, AI responses
+and metadata) go into a single <stem>.fca file instead of a tree of loose files:
+
+    b"FCA1" | entry data ... | index (JSON) | index offset, index size, b"FCA1"
+
+The index at the end maps each entry name to its offset, sizes, codec and CRC-32,
+so any entry can be read without scanning the file. Entries are compressed with
+zstd (zstandard, optional) or zlib, and stored as is when that does not help,
+e.g. for PNGs that are already compressed.
+"""
+import json
+import logging
+import os
+import struct
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zlib is used instead
+    zstandard = None
+
+logger = logging.getLogger("form_conversion")
+
+MAGIC = b"FCA1"
+SUFFIX = ".fca"
+_FOOTER = struct.Struct("<QQ4s")
+CODECS = ("zstd", "zlib", "none")
+
+
+class ArtifactError(Exception):
+    """Not an artifact container, a damaged one, or an unknown entry"""
+
+
+def resolve_codec(codec):
+    """The codec to write with, zlib when zstd is asked for but not installed"""
+    if codec not in CODECS:
+        logger.warning(f"⚠️ [ARTIFACTS] Unknown compression {codec!r}, using zlib")
+        return "zlib"
+    if codec == "zstd" and zstandard is None:
+        return "zlib"
+    return codec
+
+
+def _compress(data, codec, level):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    if codec == "zlib":
+        return zlib.compress(data, min(level, 9))
+    return data
+
+
+def _decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise ArtifactError("Entry is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    return data
+
+
+class ArtifactWriter:
+    """
+    Builds a container in a temp file and moves it into place on close(),
+    so readers never see a half-written one.
+    """
+
+    def __init__(self, path, codec="zstd", level=3):
+        self.path = path
+        self.codec = resolve_codec(codec)
+        self.level = level
+        self.entries = {}
+        self.metadata = {}
+        self.raw_bytes = 0
+        self._tmp_path = f"{path}.tmp"
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(MAGIC)
+
+    def add(self, name, data, kind="blob"):
+        if name in self.entries:
+            raise ArtifactError(f"Duplicate entry {name}")
+        codec = self.codec
+        stored = _compress(data, codec, self.level)
+        if len(stored) >= len(data):
+            codec, stored = "none", data
+        self.entries[name] = {
+            "offset": self._file.tell(),
+            "size": len(data),
+            "stored_size": len(stored),
+            "codec": codec,
+            "kind": kind,
+            "crc32": zlib.crc32(data),
+        }
+        self._file.write(stored)
+        self.raw_bytes += len(data)
+
+    def add_file(self, name, path, kind="blob"):
+        with open(path, "rb") as f:
+            self.add(name, f.read(), kind)
+
+    def add_json(self, name, value, kind="json"):
+        self.add(name, json.dumps(value, separators=(",", ":")).encode("utf-8"), kind)
+
+    def add_tree(self, root, kind="image"):
+        """Every file under root, named by its path relative to root"""
+        count = 0
+        for directory, _dirs, files in os.walk(root):
+            for filename in sorted(files):
+                path = os.path.join(directory, filename)
+                self.add_file(os.path.relpath(path, root).replace(os.sep, "/"), path, kind)
+                count += 1
+        return count
+
+    def close(self):
+        index = json.dumps({"metadata": self.metadata, "entries": self.entries}).encode("utf-8")
+        offset = self._file.tell()
+        self._file.write(index)
+        self._file.write(_FOOTER.pack(offset, len(index), MAGIC))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ArtifactReader:
+    """Random access to the entries of a container through its index"""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ArtifactError(f"{path} is not an artifact container")
+                f.seek(-_FOOTER.size, os.SEEK_END)
+                offset, size, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+                if magic != MAGIC:
+                    raise ArtifactError(f"{path} has no index (incomplete write?)")
+                f.seek(offset)
+                index = json.loads(f.read(size))
+        except (OSError, ValueError, struct.error) as e:
+            raise ArtifactError(f"Cannot read {path}: {e}") from e
+        self.metadata = index["metadata"]
+        self.entries = index["entries"]
+
+    def names(self, kind=None):
+        return [name for name, entry in self.entries.items() if kind is None or entry["kind"] == kind]
+
+    def read(self, name):
+        entry = self.entries.get(name)
+        if entry is None:
+            raise ArtifactError(f"No entry {name} in {self.path}")
+        with open(self.path, "rb") as f:
+            f.seek(entry["offset"])
+            data = _decompress(f.read(entry["stored_size"]), entry["codec"])
+        if zlib.crc32(data) != entry["crc32"]:
+            raise ArtifactError(f"Entry {name} in {self.path} is corrupt")
+        return data
+
+    def read_json(self, name):
+        return json.loads(self.read(name))
+
+    def listing(self):
+        """Index summary for debug viewers"""
+        return {
+            "metadata": self.metadata,
+            "entries": [
+                {"name": name, **{key: entry[key] for key in ("kind", "size", "stored_size", "codec")}}
+                for name, entry in self.entries.items()
+            ],
+        }
@@ -0,0 +1,317 @@
+"""
+Token and cost budget governor for the AI stage
+"""
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: the ledger file is written without a lock
+    fcntl = None
+
+logger = logging.getLogger("form_conversion")
+
+
+class BudgetExceededError(Exception):
+    """Raised on a spent session ceiling or when a daily pause lasts too long"""
+
+
+class BudgetLimits:
+    """Ceilings read from the [budget] section of .config (0 means unlimited)"""
+
+    def __init__(
+        self,
+        session_max_tokens=0,
+        session_max_cost=0.0,
+        daily_max_tokens=0,
+        daily_max_cost=0.0,
+        throttle_at=0.8,
+        throttle_delay=2.0,
+        pause_timeout=600.0,
+    ):
+        self.session_max_tokens = session_max_tokens
+        self.session_max_cost = session_max_cost
+        self.daily_max_tokens = daily_max_tokens
+        self.daily_max_cost = daily_max_cost
+        self.throttle_at = throttle_at
+        self.throttle_delay = throttle_delay
+        self.pause_timeout = pause_timeout
+
+    @classmethod
+    def from_config(cls, config):
+        section = "budget"
+        return cls(
+            session_max_tokens=config.getint(section, "session_max_tokens", fallback=0),
+            session_max_cost=config.getfloat(section, "session_max_cost", fallback=0.0),
+            daily_max_tokens=config.getint(section, "daily_max_tokens", fallback=0),
+            daily_max_cost=config.getfloat(section, "daily_max_cost", fallback=0.0),
+            throttle_at=config.getfloat(section, "throttle_at", fallback=0.8),
+            throttle_delay=config.getfloat(section, "throttle_delay", fallback=2.0),
+            pause_timeout=config.getfloat(section, "pause_timeout", fallback=600.0),
+        )
+
+
+def _usage(spent, ceiling):
+    """Fraction of a ceiling used, 0 when the ceiling is unlimited"""
+    return spent / ceiling if ceiling else 0.0
+
+
+def _remaining(spent, ceiling):
+    return max(ceiling - spent, 0) if ceiling else None
+
+
+class SessionBudget:
+    """Spend and projection for one ConversionSession"""
+
+    def __init__(self, total_files, limits=None):
+        self.limits = limits or BudgetLimits()
+        self.total_files = total_files
+        self.tokens = 0
+        self.cost = 0.0
+        self.files_seen = 0
+        self.pages_seen = 0
+        self.sections_seen = 0
+        self.sections_done = 0
+        self.state = "ok"  # ok, throttled, paused, exceeded
+        # Spend of the whole session when its files run on several workers
+        # (task_queue.SessionSpend), None when this process runs all of them
+        self.shared = None
+
+    def observe_file(self, page_count, section_count):
+        """Record the pages and sections of a file once it has been segmented"""
+        self.files_seen += 1
+        self.pages_seen += page_count
+        self.sections_seen += section_count
+
+    def projection(self):
+        """Projected (tokens, cost) for the whole session from what has been seen so far"""
+        if not self.sections_done:
+            return self.tokens, self.cost
+
+        tokens_per_section = self.tokens / self.sections_done
+        cost_per_section = self.cost / self.sections_done
+        remaining_sections = max(self.sections_seen - self.sections_done, 0)
+
+        unseen_files = max(self.total_files - self.files_seen, 0)
+        if unseen_files and self.files_seen and self.pages_seen:
+            pages_per_file = self.pages_seen / self.files_seen
+            sections_per_page = self.sections_seen / self.pages_seen
+            remaining_sections += unseen_files * pages_per_file * sections_per_page
+
+        return (
+            int(self.tokens + remaining_sections * tokens_per_section),
+            self.cost + remaining_sections * cost_per_section,
+        )
+
+    def to_dict(self, daily=None):
+        projected_tokens, projected_cost = self.projection()
+        limits = self.limits
+        data = {
+            "state": self.state,
+            "tokens": self.tokens,
+            "cost": round(self.cost, 6),
+            "projected_tokens": projected_tokens,
+            "projected_cost": round(projected_cost, 6),
+            "session_remaining_tokens": _remaining(self.tokens, limits.session_max_tokens),
+            "session_remaining_cost": _remaining(self.cost, limits.session_max_cost),
+        }
+        if daily is not None:
+            data["daily_tokens"] = daily["tokens"]
+            data["daily_cost"] = round(daily["cost"], 6)
+            data["daily_remaining_tokens"] = _remaining(daily["tokens"], limits.daily_max_tokens)
+            data["daily_remaining_cost"] = _remaining(daily["cost"], limits.daily_max_cost)
+        return data
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on path + ".lock", held across processes"""
+    with open(f"{path}.lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+class BudgetGovernor:
+    """
+    Daily ledger shared by every process plus per-session ceilings.
+    Call before_call() ahead of each chat() request and record() afterwards.
+
+    The ledger lives in the task queue database (TaskQueue.add_daily_spend)
+    when one is given, otherwise in a JSON file that is re-read and added to
+    under a file lock, so processes sharing it never overwrite each other.
+    """
+
+    def __init__(self, ledger_path=None, poll_interval=5.0, queue=None):
+        self.ledger_path = ledger_path
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._daily = {"date": self._today(), "tokens": 0, "cost": 0.0}
+        with self._lock:
+            self._refresh()
+
+    @staticmethod
+    def _today():
+        return datetime.date.today().isoformat()
+
+    def _read_file(self, date):
+        try:
+            with open(self.ledger_path, "r") as f:
+                ledger = json.load(f)
+        except (OSError, ValueError):
+            return 0, 0.0
+        if ledger.get("date") != date:
+            return 0, 0.0
+        return ledger.get("tokens", 0), ledger.get("cost", 0.0)
+
+    def _add_to_file(self, date, tokens, cost):
+        with _file_lock(self.ledger_path):
+            spent_tokens, spent_cost = self._read_file(date)
+            totals = spent_tokens + tokens, spent_cost + cost
+            tmp_path = f"{self.ledger_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"date": date, "tokens": totals[0], "cost": totals[1]}, f)
+            os.replace(tmp_path, self.ledger_path)
+        return totals
+
+    def _refresh(self):
+        """Take over today's totals booked by every process"""
+        date = self._daily["date"]
+        try:
+            if self.queue is not None:
+                tokens, cost = self.queue.daily_spend(date)
+            elif self.ledger_path:
+                tokens, cost = self._read_file(date)
+            else:
+                return
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ [BUDGET] Could not read the daily ledger: {e}")
+            return
+        self._daily.update(tokens=tokens, cost=cost)
+
+    def _book(self, tokens, cost):
+        """Add to today's totals in the ledger and take over the new totals"""
+        date = self._daily["date"]
+        try:
+            if self.queue is not None:
+                totals = self.queue.add_daily_spend(date, tokens, cost)
+            elif self.ledger_path:
+                totals = self._add_to_file(date, tokens, cost)
+            else:
+                totals = None
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"⚠️ [BUDGET] Could not book spend in the daily ledger: {e}")
+            totals = None
+        if totals is None:
+            self._daily["tokens"] += tokens
+            self._daily["cost"] += cost
+        else:
+            self._daily.update(tokens=totals[0], cost=totals[1])
+
+    def _roll_day(self):
+        today = self._today()
+        if self._daily["date"] != today:
+            self._daily = {"date": today, "tokens": 0, "cost": 0.0}
+
+    def daily(self):
+        with self._lock:
+            self._roll_day()
+            self._refresh()
+            return dict(self._daily)
+
+    @staticmethod
+    def _session_usage(budget, next_tokens=0, next_cost=0.0):
+        """Highest fraction of a session ceiling used once the next call is counted"""
+        limits = budget.limits
+        return max(
+            _usage(budget.tokens + next_tokens, limits.session_max_tokens),
+            _usage(budget.cost + next_cost, limits.session_max_cost),
+        )
+
+    def _daily_usage(self, budget, next_tokens=0, next_cost=0.0):
+        """Highest fraction of a daily ceiling used once the next call is counted"""
+        limits = budget.limits
+        return max(
+            _usage(self._daily["tokens"] + next_tokens, limits.daily_max_tokens),
+            _usage(self._daily["cost"] + next_cost, limits.daily_max_cost),
+        )
+
+    def before_call(self, budget, wait=None):
+        """
+        Throttle once a ceiling is near, stop on a spent session ceiling and
+        pause while a daily one is reached (it frees up at midnight).
+        The estimate of the next call is the session's average per section.
+        wait(seconds) is used for sleeping so callers can make it interruptible,
+        e.g. CancelToken.sleep to stop on cancel or a deadline.
+        """
+        wait = wait or time.sleep
+        paused_since = None
+        while True:
+            self.sync(budget)
+            with self._lock:
+                self._roll_day()
+                self._refresh()
+                next_tokens = next_cost = 0
+                if budget.sections_done:
+                    next_tokens = budget.tokens / budget.sections_done
+                    next_cost = budget.cost / budget.sections_done
+                session_usage = self._session_usage(budget, next_tokens, next_cost)
+                daily_usage = self._daily_usage(budget, next_tokens, next_cost)
+
+            # Session spend never goes down, so waiting would not help
+            if session_usage > 1.0:
+                budget.state = "exceeded"
+                raise BudgetExceededError("Session token/cost budget exhausted")
+            if daily_usage <= 1.0:
+                break
+            budget.state = "paused"
+            paused_since = paused_since or time.monotonic()
+            if time.monotonic() - paused_since >= budget.limits.pause_timeout:
+                raise BudgetExceededError("Daily token/cost budget exhausted")
+            wait(self.poll_interval)
+
+        if max(session_usage, daily_usage) >= budget.limits.throttle_at:
+            budget.state = "throttled"
+            wait(budget.limits.throttle_delay)
+        else:
+            budget.state = "ok"
+
+    def record(self, budget, tokens, cost):
+        """Add the spend of a finished chat() call"""
+        with self._lock:
+            self._roll_day()
+            self._book(tokens, cost)
+            budget.tokens += tokens
+            budget.cost += cost
+            if budget.shared is not None:
+                budget.shared.add(tokens, cost)
+
+    def count_sections(self, budget, count=1):
+        """Count sections as done; pages of a file may be answered from several threads"""
+        with self._lock:
+            budget.sections_done += count
+            if budget.shared is not None:
+                budget.shared.add(sections=count)
+
+    def sync(self, budget):
+        """Write a distributed session's spend to its queue and take over the totals of all workers"""
+        if budget.shared is None:
+            return
+        tokens, cost, sections = budget.shared.flush()
+        with self._lock:
+            # Spend booked since the flush is still pending, count it too
+            pending_tokens, pending_cost, pending_sections = budget.shared.pending()
+            budget.tokens = tokens + pending_tokens
+            budget.cost = cost + pending_cost
+            budget.sections_done = sections + pending_sections
+
+    def observe_file(self, budget, page_count, section_count):
+        with self._lock:
+            budget.observe_file(page_count, section_count)
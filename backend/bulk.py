@@ -0,0 +1,166 @@
+"""
+Bulk submission of PDFs that already sit on a server-side volume
+
+A batch is named by a directory, a glob or a JSON manifest of paths. Files are
+checked and read in place, never copied into uploads/, and must resolve (after
+symlinks) to a path under one of the allow-listed roots in [bulk] allowed_roots.
+"""
+import glob
+import json
+import logging
+import os
+
+logger = logging.getLogger("form_conversion")
+
+
+class BulkSubmissionError(ValueError):
+    """The request names no files, a path outside the allowed roots or an invalid file"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class BulkSettings:
+    """The [bulk] section of .config"""
+
+    def __init__(self, allowed_roots=(), max_files=10000):
+        self.allowed_roots = [os.path.realpath(root) for root in allowed_roots]
+        self.max_files = max_files
+
+    @classmethod
+    def from_config(cls, config):
+        section = "bulk"
+        roots = config.get(section, "allowed_roots", fallback="") or ""
+        return cls(
+            allowed_roots=[root.strip() for root in roots.split(",") if root.strip()],
+            max_files=config.getint(section, "max_files", fallback=10000),
+        )
+
+    def allowed(self, real_path):
+        return any(
+            real_path == root or real_path.startswith(root.rstrip(os.sep) + os.sep)
+            for root in self.allowed_roots
+        )
+
+    def check(self, path):
+        """
+        The absolute path, or BulkSubmissionError when it resolves (following
+        symlinks and "..") to somewhere outside every allowed root
+        """
+        if not self.allowed(os.path.realpath(path)):
+            # The caller only learns that it was refused, not what exists where
+            logger.warning(f"⚠️ [BULK] Refused {path}: not under an allowed bulk root")
+            raise BulkSubmissionError("Path is not under an allowed bulk root", status=403)
+        return os.path.abspath(path)
+
+
+def _glob_base(pattern):
+    """The leading directories of an absolute pattern before its first wildcard"""
+    base = []
+    for part in pattern.split(os.sep):
+        if glob.has_magic(part):
+            break
+        base.append(part)
+    return os.sep.join(base) or os.sep
+
+
+def _directory_files(directory, settings):
+    """PDFs directly inside directory; only symlinks need resolving, the rest stay under it"""
+    paths = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.name.lower().endswith(".pdf"):
+                continue
+            if entry.is_symlink():
+                if os.path.isfile(settings.check(entry.path)):
+                    paths.append(entry.path)
+            elif entry.is_file():
+                paths.append(entry.path)
+    return sorted(paths, key=os.path.basename)
+
+
+def _manifest_paths(manifest, base_dir):
+    if isinstance(manifest, dict):
+        manifest = manifest.get("files", [])
+    if not isinstance(manifest, list):
+        raise BulkSubmissionError("A manifest is a list of paths or {\"files\": [...]}")
+    paths = []
+    for item in manifest:
+        path = item.get("path") if isinstance(item, dict) else item
+        if not isinstance(path, str) or not path:
+            raise BulkSubmissionError(f"Invalid manifest entry: {item!r}")
+        if not os.path.isabs(path):
+            if base_dir is None:
+                raise BulkSubmissionError(f"Relative path {path} needs a directory to resolve against")
+            path = os.path.join(base_dir, path)
+        paths.append(path)
+    return paths
+
+
+def _existing(paths):
+    missing = [path for path in paths if not os.path.isfile(path)]
+    if missing:
+        raise BulkSubmissionError(f"{len(missing)} file(s) not found, e.g. {missing[0]}")
+    return paths
+
+
+def resolve_sources(data, settings, check_name):
+    """
+    {filename: absolute path} in processing order for a bulk request body with one of
+    directory, glob, files (an inline manifest) or manifest (a manifest file path).
+    check_name(filename) returns an error message for a name the pipeline rejects.
+    """
+    if not settings.allowed_roots:
+        raise BulkSubmissionError("Bulk submission is disabled, set [bulk] allowed_roots", status=403)
+
+    directory = data.get("directory")
+    if directory is not None:
+        directory = settings.check(directory)
+
+    if data.get("glob"):
+        pattern = data["glob"]
+        if not os.path.isabs(pattern):
+            if directory is None:
+                raise BulkSubmissionError("A relative glob needs a directory")
+            pattern = os.path.join(directory, pattern)
+        # ".." is folded away first, then nothing is listed unless the part
+        # before the first wildcard is under an allowed root
+        pattern = os.path.normpath(pattern)
+        settings.check(_glob_base(pattern))
+        candidates = sorted(glob.glob(pattern, recursive=True), key=os.path.basename)
+        paths = [settings.check(path) for path in candidates if os.path.isfile(path)]
+    elif data.get("files") is not None:
+        paths = _existing([settings.check(path) for path in _manifest_paths(data["files"], directory)])
+    elif data.get("manifest"):
+        manifest_path = settings.check(data["manifest"])
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise BulkSubmissionError(f"Cannot read manifest {data['manifest']}: {e}")
+        base_dir = directory or os.path.dirname(manifest_path)
+        paths = _existing([settings.check(path) for path in _manifest_paths(manifest, base_dir)])
+    elif directory is not None:
+        if not os.path.isdir(directory):
+            raise BulkSubmissionError(f"{data['directory']} is not a directory")
+        paths = _directory_files(directory, settings)
+    else:
+        raise BulkSubmissionError("Give one of directory, glob, files or manifest")
+
+    if not paths:
+        raise BulkSubmissionError("No PDF files matched")
+    if settings.max_files and len(paths) > settings.max_files:
+        raise BulkSubmissionError(f"{len(paths)} files exceed [bulk] max_files = {settings.max_files}")
+
+    # Outputs are keyed by file name, so names must be unique within a batch
+    sources = {}
+    for path in paths:
+        filename = os.path.basename(path)
+        error = check_name(filename)
+        if error:
+            raise BulkSubmissionError(error)
+        if filename in sources:
+            raise BulkSubmissionError(f"Duplicate file name {filename}: {sources[filename]} and {path}")
+        sources[filename] = path
+    return sources
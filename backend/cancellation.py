@@ -0,0 +1,189 @@
+"""
+Cooperative cancellation and deadlines for sessions, files and AI calls
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+CANCELLED = "cancelled"
+TIMED_OUT = "timed_out"
+
+
+class ConversionCancelled(Exception):
+    """Raised at a cancellation check once a session is cancelled or a deadline passed"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason  # CANCELLED or TIMED_OUT
+
+
+class SectionTimeoutError(TimeoutError):
+    """A single chat() call ran past its per-section deadline"""
+
+
+class Deadlines:
+    """Time limits in seconds from the [deadlines] section of .config, 0 disables one"""
+
+    def __init__(self, session_seconds=0, file_seconds=0, section_seconds=0, abandoned_grace_seconds=60):
+        self.session_seconds = session_seconds
+        self.file_seconds = file_seconds
+        self.section_seconds = section_seconds
+        # How long an abandoned chat() may keep its AI slot before it is freed
+        self.abandoned_grace_seconds = abandoned_grace_seconds
+
+    @classmethod
+    def from_config(cls, config):
+        section = "deadlines"
+        return cls(
+            session_seconds=config.getfloat(section, "session_seconds", fallback=0),
+            file_seconds=config.getfloat(section, "file_seconds", fallback=0),
+            section_seconds=config.getfloat(section, "section_seconds", fallback=0),
+            abandoned_grace_seconds=config.getfloat(section, "abandoned_grace_seconds", fallback=60),
+        )
+
+
+def describe(reason, scope):
+    if reason == TIMED_OUT:
+        return f"{scope.capitalize()} deadline exceeded"
+    return f"{scope.capitalize()} cancelled"
+
+
+class CancelToken:
+    """
+    Cancellation flag plus an optional deadline. A child token (one per file)
+    has its own deadline and is also cancelled when its parent is.
+    """
+
+    def __init__(self, deadline=None, parent=None, scope="session"):
+        self.deadline = deadline
+        self.parent = parent
+        self.scope = scope
+        self._event = threading.Event()
+        self.reason = None
+
+    def child(self, seconds=0, scope="file"):
+        deadline = time.monotonic() + seconds if seconds else None
+        return CancelToken(deadline, parent=self, scope=scope)
+
+    def set_timeout(self, seconds):
+        self.deadline = time.monotonic() + seconds if seconds else None
+
+    def cancel(self, reason=CANCELLED):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def state(self):
+        """(reason, scope) if this token should stop, None otherwise"""
+        if self._event.is_set():
+            return self.reason, self.scope
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return TIMED_OUT, self.scope
+        return self.parent.state() if self.parent is not None else None
+
+    @property
+    def cancelled(self):
+        return self.state() is not None
+
+    def sleep(self, seconds, where="", poll_interval=0.2):
+        """Sleep for seconds, raising ConversionCancelled as soon as this token should stop"""
+        end = time.monotonic() + seconds
+        while True:
+            self.check(where)
+            left = end - time.monotonic()
+            if left <= 0:
+                return
+            # A parent's cancel does not set this event, so wake up to look at it
+            self._event.wait(min(left, poll_interval))
+
+    def check(self, where=""):
+        """Raise ConversionCancelled if cancelled or past a deadline"""
+        state = self.state()
+        if state is None:
+            return
+        reason, scope = state
+        detail = f" during {where}" if where else ""
+        raise ConversionCancelled(reason, f"{describe(reason, scope)}{detail}")
+
+
+# chat() calls run here so the caller can stop waiting on cancel or timeout.
+# An abandoned call keeps its thread until the request returns on its own, and
+# its AI slot until then or for at most the grace period.
+_ai_call_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="ai-call")
+
+
+def call_with_cancel(fn, token, timeout=0, poll_interval=0.2, hold=None, on_abandoned=None, grace=60):
+    """
+    Run fn() and return its result, giving up as soon as token is cancelled,
+    a token deadline passes or timeout seconds elapse (0 means no timeout).
+    hold is a context manager (an AI slot) entered before fn() is queued; its
+    wait stops on the same token. It is exited when fn() returns, or grace
+    seconds after the caller gave up on a call that still has not returned
+    (0 keeps it until then). on_abandoned(result) gets the result of a call
+    that finished after the caller gave up, with or without its slot.
+    """
+    token.check("AI call")
+    if hold is not None:
+        hold.__enter__()
+    lock = threading.Lock()
+    state = {"abandoned": False, "returned": False, "released": hold is None}
+
+    def release():
+        with lock:
+            if state["released"]:
+                return
+            state["released"] = True
+        hold.__exit__(None, None, None)
+
+    def run():
+        try:
+            result = fn()
+        finally:
+            release()
+        with lock:
+            state["returned"] = True
+            late = state["abandoned"]
+        if late and on_abandoned is not None:
+            on_abandoned(result)
+        return result
+
+    try:
+        future = _ai_call_executor.submit(run)
+    except BaseException:
+        release()
+        raise
+
+    def give_up():
+        with lock:
+            state["abandoned"] = True
+            returned = state["returned"]
+        if returned:
+            # Finished just now: the caller still stops, the spend is booked
+            if on_abandoned is not None:
+                on_abandoned(future.result())
+        elif future.cancel():
+            # Not started yet, so it never will: the slot is ours to give back
+            release()
+        elif grace:
+            # A hung request must not hold its slot forever
+            timer = threading.Timer(grace, release)
+            timer.daemon = True
+            timer.start()
+
+    started = time.monotonic()
+    while True:
+        wait_for = poll_interval
+        if timeout:
+            left = timeout - (time.monotonic() - started)
+            if left <= 0:
+                give_up()
+                raise SectionTimeoutError(f"AI call exceeded the {timeout:g}s section deadline")
+            wait_for = min(wait_for, left)
+        try:
+            return future.result(timeout=wait_for)
+        except FutureTimeoutError:
+            pass
+        if token.cancelled:
+            give_up()
+            token.check("AI call")
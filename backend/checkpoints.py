@@ -0,0 +1,180 @@
+"""
+Per-file checkpoints so a failed conversion resumes from its last completed step
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+
+def file_digest(filepath):
+    """SHA-256 of a file's contents, used to tie a checkpoint to one exact upload"""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Checkpoint directories in use by a running file in this process
+_active = set()
+_active_lock = threading.Lock()
+
+
+class FileCheckpoint:
+    """
+    Checkpoint directory for one PDF in one session, <name>-<digest>/<owner>/:
+      state.json      - last completed step and the outputs of steps 2-3
+      responses.jsonl - one line per section, appended as each AI response arrives
+
+    A new session adopts a copy of the furthest checkpoint another session left
+    for the same upload, so concurrent sessions never write to or clear each
+    other's checkpoint.
+    """
+
+    def __init__(self, root, filename, filepath, owner):
+        self.key = f"{os.path.splitext(filename)[0]}-{file_digest(filepath)[:16]}"
+        self.parent = os.path.join(root, self.key)
+        self.directory = os.path.join(self.parent, owner)
+        self.state_path = os.path.join(self.directory, "state.json")
+        self.responses_path = os.path.join(self.directory, "responses.jsonl")
+        self.adopted_from = None
+        with _active_lock:
+            _active.add(self.directory)
+        if not os.path.isdir(self.directory):
+            self._adopt()
+        self.state = self._load_state()
+        # Page-parallel mode records responses from several threads
+        self._append_lock = threading.Lock()
+
+    def _adopt(self):
+        """Copy the checkpoint of an earlier attempt, the one that got furthest"""
+        best, best_rank = None, None
+        try:
+            others = os.listdir(self.parent)
+        except OSError:
+            return
+        for name in others:
+            directory = os.path.join(self.parent, name)
+            if not os.path.isdir(directory):
+                continue
+            try:
+                with open(os.path.join(directory, "state.json"), "r") as f:
+                    step = json.load(f).get("completed_step", -1)
+            except (OSError, ValueError):
+                step = -1
+            try:
+                answered = os.path.getsize(os.path.join(directory, "responses.jsonl"))
+            except OSError:
+                answered = 0
+            rank = (step, answered)
+            if rank > (-1, 0) and (best_rank is None or rank > best_rank):
+                best, best_rank = directory, rank
+        if best is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for name in ("state.json", "responses.jsonl"):
+            try:
+                shutil.copyfile(os.path.join(best, name), os.path.join(self.directory, name))
+            except OSError:
+                pass
+        self.adopted_from = best
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"completed_step": -1}
+
+    @property
+    def completed_step(self):
+        return self.state.get("completed_step", -1)
+
+    def has_step(self, step_index):
+        return self.completed_step >= step_index
+
+    def mark_step(self, step_index, **data):
+        """Record step_index as completed along with any outputs needed to resume"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.state.update(data)
+        self.state["completed_step"] = max(self.completed_step, step_index)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def adopt_images(self, images_root):
+        """
+        Images folder of the checkpoint, copied under images_root when it lives
+        elsewhere (another session's output shard, which that session may
+        remove). The sections directory inside it moves along. None if the
+        images are gone.
+        """
+        images_folder = self.state.get("images_folder", "")
+        if not os.path.isdir(images_folder):
+            return None
+        if os.path.dirname(os.path.abspath(images_folder)) == os.path.abspath(images_root):
+            return images_folder
+        target = os.path.join(images_root, os.path.basename(images_folder))
+        try:
+            shutil.copytree(images_folder, target, dirs_exist_ok=True)
+        except (OSError, shutil.Error):
+            # Removed while copying, e.g. packed by the session that made it
+            return None
+        data = {"images_folder": target}
+        sections_directory = self.state.get("sections_directory", "")
+        if sections_directory.startswith(images_folder):
+            data["sections_directory"] = target + sections_directory[len(images_folder):]
+        self.mark_step(self.completed_step, **data)
+        return target
+
+    def responses(self):
+        """Section responses saved so far, keyed by section file name"""
+        saved = {}
+        try:
+            with open(self.responses_path, "r") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn last line from a crash mid-write
+                        continue
+                    saved[entry["section"]] = entry
+        except OSError:
+            pass
+        return saved
+
+    def record_response(self, section, response, tokens, cost):
+        """Append one section's response durably as soon as it arrives"""
+        os.makedirs(self.directory, exist_ok=True)
+        line = json.dumps(
+            {"section": section, "response": response, "tokens": tokens, "cost": cost}
+        )
+        with self._append_lock, open(self.responses_path, "a") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def release(self):
+        """Leave the checkpoint on disk for a later attempt"""
+        with _active_lock:
+            _active.discard(self.directory)
+
+    def clear(self):
+        """
+        Remove this checkpoint once the file is done, along with the one it was
+        adopted from unless a running file here still uses that one
+        """
+        self.release()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        if self.adopted_from:
+            with _active_lock:
+                in_use = self.adopted_from in _active
+            if not in_use:
+                shutil.rmtree(self.adopted_from, ignore_errors=True)
+        try:
+            os.rmdir(self.parent)
+        except OSError:
+            pass
@@ -0,0 +1,131 @@
+"""
+Adaptive concurrency for the AI stage
+
+AIMD control of how many chat() calls run at once, like TCP congestion control:
+every round (one completed call per slot of the current limit), the limit grows by
+one while the round's median latency stays close to the baseline (the lowest
+recent round median) and the slots were actually in use. It is cut by `backoff`
+when latency rises and by `throttle_backoff` on a 429.
+"""
+import logging
+import statistics
+import threading
+import time
+from collections import deque
+
+from endpoints import THROTTLED, UNAVAILABLE
+
+logger = logging.getLogger("form_conversion")
+
+
+class AdaptiveLimit:
+    """
+    The current limit is pushed to on_change(limit), e.g. PriorityLimiter.set_capacity.
+    in_flight() returns the calls running right now, to tell a saturated round from
+    one limited by the work available.
+    """
+
+    def __init__(
+        self,
+        initial=8,
+        min_limit=2,
+        max_limit=64,
+        tolerance=1.5,
+        slack_seconds=0.05,
+        backoff=0.75,
+        throttle_backoff=0.5,
+        baseline_rounds=20,
+        on_change=None,
+        in_flight=None,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial, self.min_limit), self.max_limit)
+        self.tolerance = tolerance
+        self.slack_seconds = slack_seconds
+        self.backoff = backoff
+        self.throttle_backoff = throttle_backoff
+        self.on_change = on_change
+        self.in_flight = in_flight or (lambda: self.limit)
+        self.baseline = None
+        self.recent = None  # median latency of the last full round
+        self._round = []
+        self._round_peak = 0
+        self._medians = deque(maxlen=baseline_rounds)
+        self._last_cut = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, initial, **kwargs):
+        section = "adaptive_concurrency"
+        return cls(
+            initial=initial,
+            min_limit=config.getint(section, "min_limit", fallback=2),
+            max_limit=config.getint(section, "max_limit", fallback=64),
+            tolerance=config.getfloat(section, "tolerance", fallback=1.5),
+            slack_seconds=config.getfloat(section, "slack_seconds", fallback=0.05),
+            backoff=config.getfloat(section, "backoff", fallback=0.75),
+            throttle_backoff=config.getfloat(section, "throttle_backoff", fallback=0.5),
+            **kwargs,
+        )
+
+    def _set(self, limit, why):
+        limit = min(max(int(limit), self.min_limit), self.max_limit)
+        if limit == self.limit:
+            return None
+        previous, self.limit = self.limit, limit
+        self._round = []
+        self._round_peak = 0
+        log = logger.info if limit < previous else logger.debug
+        log(f"🎚️ [ADAPTIVE] AI concurrency {previous} -> {limit}: {why}")
+        return limit
+
+    def _cut(self, factor, why):
+        # At most one cut per baseline latency (one round trip), so the burst of
+        # 429s from a single overload does not collapse the limit to the minimum
+        now = time.monotonic()
+        if now - self._last_cut < (self.baseline or 0):
+            return None
+        self._last_cut = now
+        return self._set(self.limit * factor, why)
+
+    def _end_round(self):
+        median = statistics.median(self._round)
+        saturated = self._round_peak >= max(1, int(self.limit * 0.8))
+        self._round = []
+        self._round_peak = 0
+        self.recent = median
+        self._medians.append(median)
+        self.baseline = min(self._medians)
+        threshold = self.baseline * self.tolerance + self.slack_seconds
+        if median > threshold:
+            return self._cut(self.backoff, f"latency {median:.2f}s over {threshold:.2f}s")
+        if saturated:
+            return self._set(self.limit + 1, f"latency flat at {median:.2f}s")
+        return None
+
+    def observe(self, duration, outcome):
+        """Record one finished chat() attempt; outcome is ok, throttled, unavailable or error"""
+        with self._lock:
+            changed = None
+            if outcome == THROTTLED:
+                changed = self._cut(self.throttle_backoff, "rate limited")
+            elif outcome == UNAVAILABLE:
+                changed = self._cut(self.backoff, "endpoint unavailable")
+            elif outcome == "ok":
+                self._round.append(duration)
+                self._round_peak = max(self._round_peak, self.in_flight())
+                if len(self._round) >= self.limit:
+                    changed = self._end_round()
+        if changed is not None and self.on_change is not None:
+            self.on_change(changed)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "baseline_latency_s": round(self.baseline, 4) if self.baseline is not None else None,
+                "recent_latency_s": round(self.recent, 4) if self.recent is not None else None,
+            }
@@ -0,0 +1,214 @@
+"""
+Cached .config and secrets.json, reloaded only when the files change on disk
+"""
+import configparser
+import json
+import logging
+import os
+import re
+import threading
+from types import MappingProxyType
+
+logger = logging.getLogger("form_conversion")
+
+PACKAGER_MODES = ("sandbox", "dev")
+
+_BOOLEAN_STATES = configparser.ConfigParser.BOOLEAN_STATES
+
+
+class ConfigSnapshot:
+    """
+    Immutable view of .config and secrets.json at one point in time.
+    Offers the configparser getters (get/getint/getfloat/getboolean with fallback)
+    so the *.from_config() helpers work with it unchanged.
+    """
+
+    __slots__ = ("_sections", "secrets", "config_exists", "secrets_exists", "version")
+
+    def __init__(self, sections, secrets, config_exists, secrets_exists, version):
+        self._sections = MappingProxyType(
+            {name: MappingProxyType(dict(options)) for name, options in sections.items()}
+        )
+        self.secrets = MappingProxyType(dict(secrets))
+        self.config_exists = config_exists
+        self.secrets_exists = secrets_exists
+        self.version = version
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "version"):
+            raise AttributeError("ConfigSnapshot is immutable")
+        object.__setattr__(self, name, value)
+
+    def has_section(self, section):
+        return section in self._sections
+
+    def has_option(self, section, option):
+        return option in self._sections.get(section, {})
+
+    def get(self, section, option, fallback=None):
+        return self._sections.get(section, {}).get(option, fallback)
+
+    def _convert(self, section, option, fallback, convert):
+        value = self.get(section, option)
+        if value is None:
+            return fallback
+        try:
+            return convert(value)
+        except ValueError:
+            logger.warning(f"⚠️ [CONFIG] Invalid value for [{section}] {option}: {value!r}, using {fallback!r}")
+            return fallback
+
+    def getint(self, section, option, fallback=None):
+        return self._convert(section, option, fallback, int)
+
+    def getfloat(self, section, option, fallback=None):
+        return self._convert(section, option, fallback, float)
+
+    def getboolean(self, section, option, fallback=None):
+        def convert(value):
+            if value.lower() not in _BOOLEAN_STATES:
+                raise ValueError(value)
+            return _BOOLEAN_STATES[value.lower()]
+
+        return self._convert(section, option, fallback, convert)
+
+    @property
+    def packager_mode(self):
+        return self.get("packager", "mode", fallback="sandbox")
+
+
+def _file_identity(path):
+    """(inode, mtime, size) of a file, None when it does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def validate(snapshot):
+    """Return a list of problems with a snapshot (empty when it is usable as is)"""
+    problems = []
+    if snapshot.has_option("packager", "mode") and snapshot.packager_mode not in PACKAGER_MODES:
+        problems.append(f"[packager] mode must be one of {PACKAGER_MODES}, got {snapshot.packager_mode!r}")
+    if snapshot.secrets_exists and not isinstance(snapshot.secrets.get("T_NUMBER", ""), str):
+        problems.append("secrets.json T_NUMBER must be a string")
+    return problems
+
+
+_SECTION = re.compile(r"^\s*\[(?P<name>[^\]]+)\]")
+
+
+def set_option(text, section, option, value):
+    """
+    Return .config text with one option set, leaving every other line, comments
+    included, as it was. A missing option is added at the end of its section,
+    a missing section at the end of the file.
+    """
+    lines = text.splitlines(keepends=True)
+    option_line = re.compile(rf"^(\s*{re.escape(option)}\s*[=:]\s*)(.*?)(\r?\n)?$", re.IGNORECASE)
+    start = end = None
+    for index, line in enumerate(lines):
+        match = _SECTION.match(line)
+        if match:
+            if start is not None:
+                end = index
+                break
+            if match.group("name").strip() == section:
+                start = index + 1
+    if start is None:
+        if lines and not lines[-1].endswith("\n"):
+            lines[-1] += "\n"
+        if lines and lines[-1].strip():
+            lines.append("\n")
+        return "".join(lines) + f"[{section}]\n{option} = {value}\n"
+    end = len(lines) if end is None else end
+
+    for index in range(start, end):
+        match = option_line.match(lines[index])
+        if match:
+            lines[index] = f"{match.group(1)}{value}{match.group(3) or ''}"
+            return "".join(lines)
+
+    # After the section's last option, before the blank lines and comments of the next one
+    insert_at = start
+    for index in range(start, end):
+        stripped = lines[index].strip()
+        if stripped and not stripped.startswith(("#", ";")):
+            insert_at = index + 1
+    if insert_at and not lines[insert_at - 1].endswith("\n"):
+        lines[insert_at - 1] += "\n"
+    lines.insert(insert_at, f"{option} = {value}\n")
+    return "".join(lines)
+
+
+class ConfigService:
+    """
+    Loads .config and secrets.json once and hands out immutable snapshots.
+    Files are only re-read when their inode, mtime or size changes, or after save().
+    """
+
+    def __init__(self, config_path=".config", secrets_path="secrets.json"):
+        self.config_path = config_path
+        self.secrets_path = secrets_path
+        self._lock = threading.Lock()
+        self._identity = None
+        self._snapshot = None
+        self._version = 0
+
+    def _read(self):
+        sections = {}
+        config_exists = os.path.exists(self.config_path)
+        if config_exists:
+            parser = configparser.ConfigParser()
+            parser.read(self.config_path)
+            sections = {name: dict(parser.items(name)) for name in parser.sections()}
+
+        secrets = {}
+        secrets_exists = os.path.exists(self.secrets_path)
+        if secrets_exists:
+            with open(self.secrets_path, "r") as f:
+                secrets = json.load(f)
+
+        self._version += 1
+        return ConfigSnapshot(sections, secrets, config_exists, secrets_exists, self._version)
+
+    def snapshot(self):
+        """Current snapshot, reloading first if either file changed on disk"""
+        identity = (_file_identity(self.config_path), _file_identity(self.secrets_path))
+        with self._lock:
+            if self._snapshot is not None and identity == self._identity:
+                return self._snapshot
+            try:
+                snapshot = self._read()
+            except (OSError, ValueError, configparser.Error) as e:
+                if self._snapshot is None:
+                    raise
+                logger.error(f"💥 [CONFIG] Reload failed, keeping previous configuration: {e}")
+                return self._snapshot
+            for problem in validate(snapshot):
+                logger.warning(f"⚠️ [CONFIG] {problem}")
+            self._snapshot = snapshot
+            self._identity = identity
+            logger.info(f"⚙️ [CONFIG] Loaded configuration version {snapshot.version}")
+            return snapshot
+
+    def save(self, packager_mode, secrets):
+        """Write the packager mode into .config (in place, comments kept) and secrets.json, then reload"""
+        with self._lock:
+            try:
+                with open(self.config_path, "r") as f:
+                    text = f.read()
+            except FileNotFoundError:
+                text = ""
+            tmp_path = f"{self.config_path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(set_option(text, "packager", "mode", packager_mode))
+            os.replace(tmp_path, self.config_path)
+
+            with open(self.secrets_path, "w") as f:
+                json.dump(secrets, f, indent=4)
+
+            # Force a reload even if mtime granularity hides the change
+            self._identity = None
+        return self.snapshot()
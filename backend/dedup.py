@@ -0,0 +1,164 @@
+"""
+Batch-level deduplication of near-identical form sections
+"""
+import hashlib
+import threading
+
+try:
+    from PIL import Image
+except ImportError:  # perceptual hashing needs Pillow, fall back to exact hashing
+    Image = None
+
+HASH_SIZE = 8  # 8x8 difference hash -> 64 bit
+
+
+def content_hash(image_path):
+    """
+    sha256 of a section's pixels (of its bytes without Pillow), so only exact
+    copies match. None for an empty or undecodable crop, which is never shared.
+    """
+    digest = hashlib.sha256()
+    if Image is not None:
+        try:
+            with Image.open(image_path) as img:
+                img = img.convert("L")
+                digest.update(f"{img.size}".encode())
+                digest.update(img.tobytes())
+        except (OSError, ValueError):
+            return None
+        return "sha256", digest.hexdigest()
+
+    try:
+        with open(image_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+            if not f.tell():
+                return None
+    except OSError:
+        return None
+    return "sha256", digest.hexdigest()
+
+
+def perceptual_hash(image_path, hash_size=HASH_SIZE):
+    """
+    Compute a difference hash (dHash, hash_size**2 bits) for a section image.
+    Returns ("dhash", int), or None without Pillow or for an undecodable image.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(image_path) as img:
+            img = img.convert("L").resize((hash_size + 1, hash_size))
+            pixels = list(img.getdata())
+    except (OSError, ValueError):
+        return None
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return "dhash", value
+
+
+class _Group:
+    __slots__ = ("key", "owner", "ready", "response", "error", "members")
+
+    def __init__(self, key, owner):
+        self.key = key
+        self.owner = owner
+        self.ready = threading.Event()
+        self.response = None
+        self.error = None
+        self.members = 0
+
+
+class SectionDeduplicator:
+    """
+    Groups identical sections across the files of a ConversionSession.
+    The first section of a group is sent to the model (the representative);
+    sections of other files wait for it and reuse its response. Sections of
+    the representative's own file are always sent. With fuzzy, sections within
+    max_distance bits of difference hash match too.
+    """
+
+    def __init__(self, fuzzy=False, max_distance=2):
+        self.fuzzy = fuzzy
+        self.max_distance = max_distance
+        self.groups = []
+        self.exact = {}
+        self.calls = 0
+        self.reused = 0
+        self._lock = threading.Lock()
+
+    def _find_group(self, key):
+        group = self.exact.get(key)
+        if group is not None or key[0] != "dhash" or self.max_distance <= 0:
+            return group
+        for candidate in self.groups:
+            if candidate.key[2] != key[2]:
+                continue
+            if bin(candidate.key[1] ^ key[1]).count("1") <= self.max_distance:
+                return candidate
+        return None
+
+    def get_or_call(self, section_type, section_path, call, owner=None):
+        """
+        Return (response, tokens, cost, reused) for a section of file owner,
+        calling call(section_type, section_path) only for a group's
+        representative or when the section cannot be shared.
+        """
+        key = (perceptual_hash if self.fuzzy else content_hash)(section_path)
+        if key is None:
+            response, tokens, cost = call(section_type, section_path)
+            with self._lock:
+                self.calls += 1
+            return response, tokens, cost, False
+        key += (section_type,)
+        with self._lock:
+            group = self._find_group(key)
+            if group is not None and group.owner == owner:
+                # A repeat within one file is asked again, it may sit in another context
+                group, shared = None, False
+            else:
+                shared = True
+            is_representative = group is None
+            if is_representative and shared:
+                group = _Group(key, owner)
+                self.exact[key] = group
+                if key[0] == "dhash":
+                    self.groups.append(group)
+            if is_representative:
+                self.calls += 1
+            else:
+                self.reused += 1
+            if shared:
+                group.members += 1
+
+        if not shared:
+            response, tokens, cost = call(section_type, section_path)
+            return response, tokens, cost, False
+        if not is_representative:
+            group.ready.wait()
+            if group.error is None:
+                return group.response, 0, 0, True
+            # The representative failed, so this member asks for itself
+            response, tokens, cost = call(section_type, section_path)
+            return response, tokens, cost, False
+
+        try:
+            response, tokens, cost = call(section_type, section_path)
+        except Exception as e:
+            group.error = e
+            with self._lock:
+                self.exact.pop(key, None)
+                if group in self.groups:
+                    self.groups.remove(group)
+            group.ready.set()
+            raise
+        group.response = response
+        group.ready.set()
+        return response, tokens, cost, False
+
+    def stats(self):
+        with self._lock:
+            return {"ai_calls": self.calls, "reused_sections": self.reused, "groups": len(self.exact)}
@@ -0,0 +1,246 @@
+"""
+Load balancing and failover of chat() calls across several AI deployments
+
+secrets.json may list deployments under AI_ENDPOINTS; without it the single
+AZURE_OPENAI_ENDPOINT / MODEL_NAME / API_VERSION deployment is used. Each call
+goes to the endpoint with the lowest (in-flight + 1) x latency / weight whose
+circuit is closed, and moves on to the next one on a 429, a 5xx or a connection
+error. Repeated failures or a 429 open an endpoint's circuit for a cooldown.
+"""
+import logging
+import threading
+import time
+import urllib.error
+
+logger = logging.getLogger("form_conversion")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+THROTTLED = "throttled"
+UNAVAILABLE = "unavailable"
+
+
+def classify_error(error):
+    """THROTTLED, UNAVAILABLE (worth another endpoint) or None for request errors"""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status == 429 or status == "429":
+        return THROTTLED
+    if isinstance(status, int) and status >= 500:
+        return UNAVAILABLE
+    if isinstance(error, (urllib.error.URLError, ConnectionError, TimeoutError)):
+        return UNAVAILABLE
+    return None
+
+
+def _retry_after(error):
+    headers = getattr(error, "headers", None)
+    if headers is None and getattr(error, "response", None) is not None:
+        headers = getattr(error.response, "headers", None)
+    try:
+        return float(headers.get("Retry-After")) if headers is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class AIEndpoint:
+    """One deployment plus its live load, latency and circuit state"""
+
+    def __init__(self, name, url="", api_key="", model_name="", api_version="", weight=1.0, max_in_flight=0):
+        self.name = name
+        self.url = url
+        self.api_key = api_key
+        self.model_name = model_name
+        self.api_version = api_version
+        self.weight = max(float(weight), 0.01)
+        self.max_in_flight = int(max_in_flight)
+        self.in_flight = 0
+        self.latency = None  # moving average of successful calls, seconds
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+        self.tokens = 0
+        self.failures = 0  # consecutive
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.trial_running = False
+
+    @classmethod
+    def from_spec(cls, spec, index=0):
+        return cls(
+            name=spec.get("name") or f"endpoint-{index}",
+            url=spec.get("endpoint", ""),
+            api_key=spec.get("api_key", ""),
+            model_name=spec.get("model_name", ""),
+            api_version=spec.get("api_version", ""),
+            weight=spec.get("weight", 1),
+            max_in_flight=spec.get("max_in_flight", 0),
+        )
+
+    def same_deployment(self, other):
+        return (self.url, self.api_key, self.model_name, self.api_version) == (
+            other.url, other.api_key, other.model_name, other.api_version
+        )
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "endpoint": self.url,
+            "model_name": self.model_name,
+            "weight": self.weight,
+            "state": self.state,
+            "in_flight": self.in_flight,
+            "latency_s": round(self.latency, 3) if self.latency is not None else None,
+            "calls": self.calls,
+            "errors": self.errors,
+            "throttled": self.throttled,
+            "tokens": self.tokens,
+        }
+
+
+def endpoint_specs(secrets):
+    """AI_ENDPOINTS from secrets.json, or the single legacy deployment"""
+    specs = secrets.get("AI_ENDPOINTS")
+    if specs:
+        return [dict(spec) for spec in specs]
+    return [
+        {
+            "name": "default",
+            "endpoint": secrets.get("AZURE_OPENAI_ENDPOINT", ""),
+            "api_key": secrets.get("AZURE_OPENAI_API_KEY", ""),
+            "model_name": secrets.get("MODEL_NAME", ""),
+            "api_version": secrets.get("API_VERSION", ""),
+        }
+    ]
+
+
+class EndpointPool:
+    """Picks an endpoint for each chat() call and keeps per-endpoint stats"""
+
+    def __init__(self, failure_threshold=3, cooldown_seconds=30, max_failover=2, latency_alpha=0.2):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self.max_failover = max(0, max_failover)
+        self.latency_alpha = latency_alpha
+        self.endpoints = []
+        self.listeners = []  # listener(duration, outcome) after every attempt
+        self._config_version = None
+        self._lock = threading.Lock()
+
+    def configure(self, config):
+        """Apply a config snapshot's [endpoints] settings and deployments, once per version"""
+        with self._lock:
+            if config.version == self._config_version:
+                return
+            self._config_version = config.version
+            self.failure_threshold = max(1, config.getint("endpoints", "failure_threshold", fallback=3))
+            self.cooldown_seconds = config.getfloat("endpoints", "cooldown_seconds", fallback=30)
+            self.max_failover = max(0, config.getint("endpoints", "max_failover", fallback=2))
+            # Keep the stats of deployments that did not change
+            previous = {endpoint.name: endpoint for endpoint in self.endpoints}
+            endpoints = []
+            for index, spec in enumerate(endpoint_specs(config.secrets)):
+                endpoint = AIEndpoint.from_spec(spec, index)
+                old = previous.get(endpoint.name)
+                if old is not None and old.same_deployment(endpoint):
+                    old.weight, old.max_in_flight = endpoint.weight, endpoint.max_in_flight
+                    endpoint = old
+                endpoints.append(endpoint)
+            self.endpoints = endpoints
+        logger.info(f"🌐 [ENDPOINTS] {len(endpoints)} AI endpoint(s): {', '.join(e.name for e in endpoints)}")
+
+    def _available(self, endpoint, now):
+        if endpoint.state == OPEN and now >= endpoint.open_until:
+            endpoint.state = HALF_OPEN
+        if endpoint.state == OPEN:
+            return False
+        if endpoint.state == HALF_OPEN and endpoint.trial_running:
+            return False
+        return not endpoint.max_in_flight or endpoint.in_flight < endpoint.max_in_flight
+
+    def _score(self, endpoint, default_latency):
+        latency = endpoint.latency if endpoint.latency is not None else default_latency
+        return (endpoint.in_flight + 1) * latency / endpoint.weight
+
+    def acquire(self, exclude=()):
+        """Reserve the best endpoint not in exclude, None when every one was tried"""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+            if not candidates:
+                return None
+            available = [endpoint for endpoint in candidates if self._available(endpoint, now)]
+            if available:
+                known = [endpoint.latency for endpoint in self.endpoints if endpoint.latency is not None]
+                default_latency = sum(known) / len(known) if known else 1.0
+                endpoint = min(available, key=lambda e: self._score(e, default_latency))
+            else:
+                # Every circuit is open: use the one that reopens first rather than failing
+                endpoint = min(candidates, key=lambda e: e.open_until)
+            if endpoint.state == HALF_OPEN:
+                endpoint.trial_running = True
+            endpoint.in_flight += 1
+            return endpoint
+
+    def _open(self, endpoint, seconds, why):
+        endpoint.state = OPEN
+        endpoint.open_until = time.monotonic() + seconds
+        logger.warning(f"🔌 [ENDPOINTS] Circuit open for {endpoint.name} for {seconds:g}s: {why}")
+
+    def release(self, endpoint, duration, tokens=0, error=None):
+        self._release(endpoint, duration, tokens, error)
+        outcome = "ok" if error is None else classify_error(error) or "error"
+        for listener in self.listeners:
+            listener(duration, outcome)
+
+    def _release(self, endpoint, duration, tokens, error):
+        with self._lock:
+            endpoint.in_flight -= 1
+            endpoint.trial_running = False
+            endpoint.calls += 1
+            if error is None:
+                if endpoint.state != CLOSED:
+                    logger.info(f"🔌 [ENDPOINTS] Circuit closed for {endpoint.name}")
+                endpoint.state = CLOSED
+                endpoint.failures = 0
+                endpoint.tokens += tokens
+                if endpoint.latency is None:
+                    endpoint.latency = duration
+                else:
+                    endpoint.latency += self.latency_alpha * (duration - endpoint.latency)
+                return
+            kind = classify_error(error)
+            endpoint.errors += 1
+            if kind == THROTTLED:
+                endpoint.throttled += 1
+                self._open(endpoint, _retry_after(error) or self.cooldown_seconds, "rate limited")
+            elif kind == UNAVAILABLE:
+                endpoint.failures += 1
+                if endpoint.state == HALF_OPEN or endpoint.failures >= self.failure_threshold:
+                    self._open(endpoint, self.cooldown_seconds, f"{endpoint.failures} failure(s): {error}")
+
+    def call(self, fn):
+        """
+        Run fn(endpoint) -> (response, tokens, cost) on the best endpoint, failing
+        over to up to max_failover others on a 429, a 5xx or a connection error
+        """
+        tried = []
+        while True:
+            endpoint = self.acquire(exclude=tried)
+            tried.append(endpoint)
+            started = time.perf_counter()
+            try:
+                result = fn(endpoint)
+            except Exception as e:
+                self.release(endpoint, time.perf_counter() - started, error=e)
+                if classify_error(e) is None or len(tried) > self.max_failover or len(tried) == len(self.endpoints):
+                    raise
+                logger.warning(f"🔀 [ENDPOINTS] {endpoint.name} failed ({e}), failing over")
+                continue
+            self.release(endpoint, time.perf_counter() - started, tokens=result[1])
+            return result
+
+    def stats(self):
+        with self._lock:
+            return [endpoint.stats() for endpoint in self.endpoints]
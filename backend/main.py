@@ -21,28 +21,14 @@ from utils.image_splitter import *
 from utils.gpt_chat import chat
 from utils.form_creator import generate_af
 from utils.packager import sandbox_packager, dev_packager
+from config_service import ConfigService
 
-# Setting up .config file
-config_path = resource_path(".config")
-config = configparser.ConfigParser()
-config.read(config_path)
-
-try:
-    packager_mode = config.get("packager", "mode")
-    print(f"Packager mode: {packager_mode}")
-except configparser.NoSectionError:
-    print("No section 'packager' found in the configuration file.")
-except configparser.NoOptionError:
-    print("No option 'mode' found in the 'packager' section.")
-
-# reading secrets.json for designer's t_number
-secrets_path = resource_path("secrets.json")
-with open(secrets_path, "r") as t_info:
-    secrets = json.load(t_info)
+# .config and secrets.json are cached and re-read only when they change on disk
+config_service = ConfigService(resource_path(".config"), resource_path("secrets.json"))
+print(f"Packager mode: {config_service.snapshot().packager_mode}")
 
 
 # Initialize global variables for overall statistics
-t_number = secrets.get("T_NUMBER")
 total_tokens_all_forms = 0
 total_cost_all_forms = 0
 total_pages_all_forms = 0
@@ -387,13 +373,17 @@ def convertPDF(
     root=None,
     existing_window=None,
 ):
-    global t_number
     global total_tokens_all_forms
     global total_cost_all_forms
     global total_pages_all_forms
     global total_sections_all_forms
 
     if filename.endswith(".pdf") and filename[:4].isalpha():
+        # One configuration snapshot per conversion, so a mid-batch edit applies to the next file
+        config = config_service.snapshot()
+        packager_mode = config.packager_mode
+        t_number = config.secrets.get("T_NUMBER")
+
         # Create a new window or update existing one
         if is_batch and existing_window:
             # Update existing window for this file
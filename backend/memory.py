@@ -0,0 +1,147 @@
+"""
+Memory bounds for large PDFs: a shared page-bitmap budget and per-file peak
+RSS sampling
+"""
+import logging
+import os
+import resource
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger("form_conversion")
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_bytes():
+    """Resident set size of this process right now"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        # No /proc (e.g. macOS): fall back to the lifetime peak
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if usage > 1 << 32 else usage * 1024
+
+
+class MemoryLimits:
+    """The [memory] section of .config"""
+
+    def __init__(
+        self,
+        enabled=False,
+        max_pages_in_flight=4,
+        max_bitmap_mb=512,
+        page_bitmap_mb=25,
+    ):
+        self.enabled = enabled
+        self.max_pages_in_flight = max(1, max_pages_in_flight)
+        self.max_bitmap_bytes = int(max_bitmap_mb * 1024 * 1024)
+        self.page_bitmap_bytes = int(page_bitmap_mb * 1024 * 1024)
+
+    @classmethod
+    def from_config(cls, config):
+        section = "memory"
+        return cls(
+            enabled=config.getboolean(section, "enabled", fallback=False),
+            max_pages_in_flight=config.getint(section, "max_pages_in_flight", fallback=4),
+            max_bitmap_mb=config.getfloat(section, "max_bitmap_mb", fallback=512),
+            page_bitmap_mb=config.getfloat(section, "page_bitmap_mb", fallback=25),
+        )
+
+
+class PageBudget:
+    """
+    Caps page bitmaps held in memory across all sessions, by count and by bytes.
+    A page is admitted on an estimate of its size and then charged its real
+    size. A single page larger than the whole byte budget still runs, on its own.
+    """
+
+    def __init__(self, max_pages, max_bytes):
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.pages = 0
+        self.bytes = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def _fits(self, nbytes):
+        if self.pages == 0:
+            return True
+        return self.pages < self.max_pages and self.bytes + nbytes <= self.max_bytes
+
+    def acquire(self, nbytes):
+        with self._cond:
+            self.waiting += 1
+            try:
+                while not self._fits(nbytes):
+                    self._cond.wait()
+            finally:
+                self.waiting -= 1
+            self.pages += 1
+            self.bytes += nbytes
+
+    def release(self, nbytes):
+        with self._cond:
+            self.pages -= 1
+            self.bytes -= nbytes
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, nbytes):
+        """Hold one page of an estimated nbytes; yields charge(actual) to correct the estimate"""
+        held = [nbytes]
+
+        def charge(actual):
+            with self._cond:
+                self.bytes += actual - held[0]
+                held[0] = actual
+                self._cond.notify_all()
+
+        self.acquire(nbytes)
+        try:
+            yield charge
+        finally:
+            self.release(held[0])
+
+    def stats(self):
+        with self._cond:
+            return {
+                "pages_in_flight": self.pages,
+                "bytes_in_flight": self.bytes,
+                "waiting": self.waiting,
+                "max_pages": self.max_pages,
+                "max_bytes": self.max_bytes,
+            }
+
+
+class RssMonitor:
+    """Samples RSS in the background while a block runs and keeps the peak"""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.peak_bytes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        self.peak_bytes = max(self.peak_bytes, current_rss_bytes())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread = threading.Thread(target=self._run, name="rss-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+    @property
+    def peak_mb(self):
+        return round(self.peak_bytes / (1024 * 1024), 1)
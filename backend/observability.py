@@ -0,0 +1,322 @@
+"""
+Metrics (Prometheus text exposition), span-based tracing hooks and logging setup
+"""
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # tracing hooks still work without OpenTelemetry
+    otel_trace = None
+
+logger = logging.getLogger("form_conversion")
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, value, None) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for name, key, value, extra in self._samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A gauge set directly, or computed at scrape time by a callback returning {label tuple: value}"""
+
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        if self.callback is None:
+            return super()._samples()
+        try:
+            values = self.callback()
+        except Exception:
+            logger.exception("Gauge callback for %s failed", self.name)
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [(self.name, key, value, None) for key, value in values.items()]
+
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append(
+                        (f"{self.name}_bucket", key, cumulative, f'le="{_format_value(float(bound))}"')
+                    )
+                samples.append((f"{self.name}_sum", key, total, None))
+                samples.append((f"{self.name}_count", key, count, None))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STEP_DURATION = REGISTRY.register(
+    Histogram("form_conversion_step_duration_seconds", "Duration of each pipeline step", ["step"])
+)
+AI_CALL_DURATION = REGISTRY.register(
+    Histogram("form_conversion_ai_call_duration_seconds", "Latency of chat() calls", ["section_type"])
+)
+AI_CALLS = REGISTRY.register(
+    Counter("form_conversion_ai_calls_total", "chat() calls by outcome", ["section_type", "outcome"])
+)
+AI_TOKENS = REGISTRY.register(Counter("form_conversion_ai_tokens_total", "Tokens used by chat() calls"))
+AI_COST = REGISTRY.register(Counter("form_conversion_ai_cost_total", "Cost of chat() calls"))
+FILES_PROCESSED = REGISTRY.register(
+    Counter("form_conversion_files_total", "Files processed by final status", ["status"])
+)
+SECTIONS_SKIPPED_AI = REGISTRY.register(
+    Counter("form_conversion_sections_without_ai_total", "Sections answered without a chat() call", ["reason"])
+)
+
+
+# ---------------------------------------------------------------------------
+# Tracing
+# ---------------------------------------------------------------------------
+
+_span_hooks = []
+_tracing = {"enabled": False, "tracer": None}
+
+
+def configure_tracing(enabled):
+    """Turn span recording on; spans are also exported through OpenTelemetry when it is installed"""
+    _tracing["enabled"] = enabled
+    _tracing["tracer"] = otel_trace.get_tracer("form_conversion") if enabled and otel_trace else None
+
+
+def add_span_hook(hook):
+    """Register hook(span), called whenever a span ends"""
+    _span_hooks.append(hook)
+
+
+class Span:
+    __slots__ = ("name", "attributes", "start", "duration", "error", "_otel")
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+        tracer = _tracing["tracer"]
+        self._otel = tracer.start_span(name, attributes=attributes) if tracer else None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+        if self._otel is not None:
+            self._otel.set_attribute(key, value)
+
+    def end(self, error=None):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self.start
+        self.error = error
+        if self._otel is not None:
+            if error is not None:
+                self._otel.record_exception(error)
+            self._otel.end()
+        if _tracing["enabled"]:
+            for hook in _span_hooks:
+                try:
+                    hook(self)
+                except Exception:
+                    logger.exception("Span hook failed")
+
+
+def start_span(name, **attributes):
+    return Span(name, attributes)
+
+
+@contextmanager
+def span(name, **attributes):
+    current = Span(name, attributes)
+    try:
+        yield current
+    except BaseException as e:
+        current.end(error=e)
+        raise
+    current.end()
+
+
+# ---------------------------------------------------------------------------
+# Logging
+# ---------------------------------------------------------------------------
+
+_log_context = contextvars.ContextVar("log_context", default={})
+
+
+@contextmanager
+def log_context(**fields):
+    """Attach fields (session_id, filename, ...) to every log record in this block"""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def bind_log_context(**fields):
+    """Attach fields to every later log record in the current thread"""
+    _log_context.set({**_log_context.get(), **fields})
+
+
+class _ContextFilter(logging.Filter):
+    def filter(self, record):
+        record.context = _log_context.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        message = super().format(record)
+        context = getattr(record, "context", {})
+        session_id = context.get("session_id")
+        return f"{message} [session={session_id[:8]}]" if session_id else message
+
+
+def configure_logging(level="INFO", fmt="text"):
+    """Set up the form_conversion logger once; level and format come from [logging] in .config"""
+    handler = logging.StreamHandler()
+    handler.addFilter(_ContextFilter())
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter("%(asctime)s %(levelname)-7s %(message)s"))
+    logger.handlers[:] = [handler]
+    logger.propagate = False
+    try:
+        logger.setLevel(str(level).upper())
+    except ValueError:
+        logger.setLevel(logging.INFO)
+        logger.warning(f"⚠️ [LOGGING] Unknown log level {level!r} in [logging], using INFO")
+    if fmt not in ("text", "json"):
+        logger.warning(f"⚠️ [LOGGING] Unknown log format {fmt!r} in [logging], using text")
+    return logger
@@ -0,0 +1,112 @@
+"""
+Prefork pool of warm worker processes for distributed mode
+
+The parent imports the backend once (Flask, the optional numpy, Pillow, pypdf
+and zstandard modules, the config snapshot), runs the preload hook (app.preload)
+and forks worker processes that inherit it all. Nothing may start a thread before the fork: a child only gets the
+forking thread, and locks held by the others stay locked in it. Each worker process
+runs task_queue Workers until it has run max_tasks files or grown past max_rss_mb,
+then exits and the parent forks a fresh one in its place.
+"""
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from multiprocessing.connection import wait
+
+from memory import current_rss_bytes
+
+logger = logging.getLogger("form_conversion")
+
+
+class Recycler:
+    """
+    Counts the tasks run by the worker threads of one process and says when the
+    process is due to be replaced. 0 disables a limit.
+    """
+
+    def __init__(self, max_tasks=0, max_rss_mb=0):
+        self.max_tasks = max_tasks
+        self.max_rss_bytes = int(max_rss_mb * 1024 * 1024)
+        self.tasks = 0
+        self.reason = None
+        self._lock = threading.Lock()
+
+    def task_done(self):
+        with self._lock:
+            self.tasks += 1
+            if self.reason is not None:
+                return
+            if self.max_tasks and self.tasks >= self.max_tasks:
+                self.reason = f"{self.tasks} tasks"
+            elif self.max_rss_bytes and current_rss_bytes() > self.max_rss_bytes:
+                self.reason = f"RSS over {self.max_rss_bytes // (1024 * 1024)} MB"
+
+    @property
+    def due(self):
+        return self.reason is not None
+
+
+class WorkerPool:
+    """
+    Keeps `processes` forked children running child_main(slot, recycler).
+    A child that exits (recycled or crashed) is replaced until stop() is called.
+    preload() runs once in the parent before the first fork.
+    """
+
+    def __init__(self, processes, child_main, max_tasks=0, max_rss_mb=0, restart_delay=1.0, preload=None):
+        self.processes = max(1, processes)
+        self.child_main = child_main
+        self.preload = preload
+        self.max_tasks = max_tasks
+        self.max_rss_mb = max_rss_mb
+        self.restart_delay = restart_delay
+        self._context = multiprocessing.get_context("fork")
+        self._children = {}
+        self._stopping = threading.Event()
+
+    def _spawn(self, slot):
+        process = self._context.Process(
+            target=self._run_child, args=(slot,), name=f"worker-{slot}", daemon=False
+        )
+        process.start()
+        self._children[slot] = process
+        logger.info(f"🍴 [POOL] Forked worker process {slot} (pid {process.pid})")
+
+    def _run_child(self, slot):
+        # The parent handles signals for the pool and tells children via SIGTERM
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        recycler = Recycler(self.max_tasks, self.max_rss_mb)
+        self.child_main(slot, recycler)
+        if recycler.due:
+            logger.info(f"♻️ [POOL] Worker process {slot} (pid {os.getpid()}) recycled after {recycler.reason}")
+
+    def run(self):
+        """Fork the workers and supervise them until stop()"""
+        if self.preload is not None:
+            self.preload()
+        for slot in range(self.processes):
+            self._spawn(slot)
+        while not self._stopping.is_set():
+            sentinels = {process.sentinel: slot for slot, process in self._children.items()}
+            for sentinel in wait(list(sentinels), timeout=1.0):
+                slot = sentinels[sentinel]
+                process = self._children[slot]
+                process.join()
+                if self._stopping.is_set():
+                    break
+                if process.exitcode != 0:
+                    logger.warning(f"⚠️ [POOL] Worker process {slot} exited with {process.exitcode}")
+                    # Back off so a child that fails at start-up does not spin
+                    time.sleep(self.restart_delay)
+                self._spawn(slot)
+        for process in self._children.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+        for process in self._children.values():
+            process.join()
+
+    def stop(self):
+        self._stopping.set()
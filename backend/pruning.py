@@ -0,0 +1,202 @@
+"""
+Pre-filter of blank section crops and duplicate pages before chat()
+
+Scanned forms carry blank pages, blank back sides and near-empty crops
+(separators, whitespace strips). Each bitmap is decoded once at a reduced size
+into a NumPy array, then:
+
+- ink density: the share of pixels clearly darker than the paper (the bright
+  percentile of the image, so grey scans count as paper too), leaving out rows
+  and columns that are mostly ink, i.e. separator rules and empty box borders
+- standard deviation of the grey levels, near zero for a flat crop
+- a 16x16 difference hash per page, to find a page that repeats an earlier
+  page of the same PDF. A hash match is only a candidate: both pages are then
+  compared pixel by pixel at full resolution, so a copy of the same form with
+  one more tick box filled in is still sent.
+
+Needs numpy and Pillow; without either nothing is pruned.
+"""
+import logging
+import threading
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError:  # pruning is skipped
+    np = None
+    Image = None
+
+logger = logging.getLogger("form_conversion")
+
+BLANK = "blank"
+BLANK_PAGE = "blank_page"
+DUPLICATE_PAGE = "duplicate_page"
+REASONS = (BLANK, BLANK_PAGE, DUPLICATE_PAGE)
+
+_ANALYSIS_SIDE = 1024  # longest side a bitmap is reduced to, pen strokes stay a pixel or more
+_RULE_FILL = 0.5  # rows/columns with more ink than this are lines, not content
+
+
+def available():
+    return np is not None and Image is not None
+
+
+class PruneSettings:
+    """The [pruning] section of .config"""
+
+    def __init__(
+        self,
+        enabled=False,
+        ink_contrast=64,
+        max_ink_density=0.0003,
+        min_std=3.0,
+        duplicate_pages=True,
+        duplicate_max_distance=12,
+        duplicate_max_changed=0.00002,
+    ):
+        self.enabled = enabled and available()
+        self.ink_contrast = ink_contrast
+        self.max_ink_density = max_ink_density
+        self.min_std = min_std
+        self.duplicate_pages = duplicate_pages
+        self.duplicate_max_distance = duplicate_max_distance
+        self.duplicate_max_changed = duplicate_max_changed
+
+    @classmethod
+    def from_config(cls, config):
+        section = "pruning"
+        enabled = config.getboolean(section, "enabled", fallback=False)
+        if enabled and not available():
+            logger.debug("🧹 [PRUNE] numpy or Pillow not installed, blank and duplicate pruning is off")
+        return cls(
+            enabled=enabled,
+            ink_contrast=config.getint(section, "ink_contrast", fallback=64),
+            max_ink_density=config.getfloat(section, "max_ink_density", fallback=0.0003),
+            min_std=config.getfloat(section, "min_std", fallback=3.0),
+            duplicate_pages=config.getboolean(section, "duplicate_pages", fallback=True),
+            duplicate_max_distance=config.getint(section, "duplicate_max_distance", fallback=12),
+            duplicate_max_changed=config.getfloat(section, "duplicate_max_changed", fallback=0.00002),
+        )
+
+
+def load_gray(image_path, max_side=_ANALYSIS_SIDE):
+    """The image as a uint8 grey array no larger than max_side (if given), None if it cannot be decoded"""
+    try:
+        with Image.open(image_path) as img:
+            if max_side:
+                img.draft("L", (max_side, max_side))  # JPEG decodes at a fraction of full size
+            img = img.convert("L")
+            if max_side:
+                img.thumbnail((max_side, max_side))
+            return np.asarray(img, dtype=np.uint8)
+    except (OSError, ValueError):
+        return None
+
+
+def ink_stats(pixels, ink_contrast=64):
+    """(ink density, standard deviation) of a grey array, rule lines left out of the density"""
+    paper = np.percentile(pixels, 90)
+    ink = pixels < paper - ink_contrast
+    ink[ink.mean(axis=1) > _RULE_FILL, :] = False
+    ink[:, ink.mean(axis=0) > _RULE_FILL] = False
+    return float(np.count_nonzero(ink)) / ink.size, float(pixels.std())
+
+
+def difference_hash(pixels, hash_size=16):
+    """dHash of a grey array as an int, the same bit order as dedup.perceptual_hash"""
+    small = Image.fromarray(pixels).resize((hash_size + 1, hash_size), Image.BILINEAR)
+    small = np.asarray(small, dtype=np.int16)
+    bits = small[:, :-1] > small[:, 1:]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def changed_share(path_a, path_b, ink_contrast=64):
+    """Share of pixels that differ by more than ink_contrast grey levels, 1.0 if the sizes differ"""
+    a = load_gray(path_a, None)
+    b = load_gray(path_b, None)
+    if a is None or b is None or a.shape != b.shape:
+        return 1.0
+    return float(np.count_nonzero(np.abs(a.astype(np.int16) - b) > ink_contrast)) / a.size
+
+
+class PagePruner:
+    """
+    Per-file verdicts: section(name, path) and page(number, path) return a
+    pruning reason or None, and details(section) gives the measures behind it
+    for the file result. Pages may be checked from several threads; of two
+    identical pages the one checked first is kept, and the pixel comparisons
+    run one at a time.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self._details = {}  # section -> why it was pruned
+        self._pages = []  # (page number, hash, image path) of the pages kept so far
+        self._page_verdicts = {}
+        self._lock = threading.Lock()
+
+    def _blank(self, pixels):
+        density, std = ink_stats(pixels, self.settings.ink_contrast)
+        blank = density <= self.settings.max_ink_density or std < self.settings.min_std
+        return blank, {"ink_density": round(density, 5), "std": round(std, 2)}
+
+    def section(self, section, section_path):
+        """BLANK for a crop with next to no ink, otherwise None"""
+        pixels = load_gray(section_path)
+        if pixels is None or not pixels.size:
+            return None
+        blank, measures = self._blank(pixels)
+        if not blank:
+            return None
+        with self._lock:
+            self._details[section] = {"reason": BLANK, **measures}
+        return BLANK
+
+    def page(self, page_number, image_path):
+        """
+        BLANK_PAGE or DUPLICATE_PAGE for a page whose sections need no AI call,
+        otherwise None. Pages are reported 1-based, like the file result.
+        """
+        pixels = load_gray(image_path)
+        if pixels is None or not pixels.size:
+            return None
+        blank, measures = self._blank(pixels)
+        if blank:
+            verdict = {"reason": BLANK_PAGE, **measures}
+        elif self.settings.duplicate_pages:
+            verdict = self._duplicate(page_number, image_path, difference_hash(pixels))
+        else:
+            verdict = None
+        if verdict is not None:
+            with self._lock:
+                self._page_verdicts[page_number] = verdict
+            logger.info(
+                f"🧹 [PRUNE] Page {page_number + 1}: {verdict['reason']}"
+                + (f" of page {verdict['duplicate_of']}" if "duplicate_of" in verdict else "")
+            )
+        return verdict["reason"] if verdict else None
+
+    def _duplicate(self, page_number, image_path, page_hash):
+        # Matched and recorded under one lock: of two identical pages checked
+        # at the same time, one must see the other
+        with self._lock:
+            for other, other_hash, other_path in self._pages:
+                if bin(page_hash ^ other_hash).count("1") > self.settings.duplicate_max_distance:
+                    continue
+                # Confirm on pixels: forms share a layout, only their contents differ
+                changed = changed_share(image_path, other_path, self.settings.ink_contrast)
+                if changed <= self.settings.duplicate_max_changed:
+                    return {"reason": DUPLICATE_PAGE, "duplicate_of": other + 1, "changed": round(changed, 5)}
+            self._pages.append((page_number, page_hash, image_path))
+        return None
+
+    def page_sections(self, page_number, sections):
+        """Attach the verdict of a pruned page to each of its sections"""
+        with self._lock:
+            verdict = self._page_verdicts[page_number]
+            for section in sections:
+                self._details[section] = verdict
+
+    def details(self, section):
+        with self._lock:
+            return dict(self._details.get(section, {}))
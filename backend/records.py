@@ -0,0 +1,145 @@
+"""
+Typed records for chat() responses and compact form JSON serialisation
+"""
+import json
+from dataclasses import dataclass, field
+
+try:
+    import orjson
+except ImportError:  # optional fast encoder
+    orjson = None
+
+
+class ResponseValidationError(ValueError):
+    """Raised when a chat() response does not have the expected shape"""
+
+
+def _clean(value):
+    """Normalise a single response value (strings are stripped once, on arrival)"""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {str(k): _clean(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean(v) for v in value]
+    return value
+
+
+@dataclass(slots=True)
+class FieldRecord:
+    label: str = ""
+    type: str = ""
+    attrs: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_response(cls, data):
+        return cls._from_clean(_clean(data))
+
+    @classmethod
+    def _from_clean(cls, data):
+        """From a field already passed through _clean (it is consumed)"""
+        if not isinstance(data, dict):
+            raise ResponseValidationError(f"Field must be an object, got {type(data).__name__}")
+        label = data.pop("label", "")
+        field_type = data.pop("type", "")
+        if not isinstance(label, str) or not isinstance(field_type, str):
+            raise ResponseValidationError("Field 'label' and 'type' must be strings")
+        return cls(label=label, type=field_type, attrs=data)
+
+    def to_dict(self):
+        # label and type are always present, even when empty, so consumers see one schema
+        data = {"label": self.label, "type": self.type}
+        data.update(self.attrs)
+        return data
+
+
+@dataclass(slots=True)
+class SectionRecord:
+    section_id: str = ""
+    content: str = ""
+    fields: list = field(default_factory=list)
+    extra: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_response(cls, data):
+        if not isinstance(data, dict):
+            raise ResponseValidationError(f"Section must be an object, got {type(data).__name__}")
+        # Cleaned once here, fields included
+        data = _clean(data)
+        section_id = data.pop("section_id", "")
+        content = data.pop("content", "")
+        raw_fields = data.pop("fields", [])
+        if not isinstance(section_id, str) or not isinstance(content, str):
+            raise ResponseValidationError("Section 'section_id' and 'content' must be strings")
+        if not isinstance(raw_fields, list):
+            raise ResponseValidationError("Section 'fields' must be a list")
+        fields = [FieldRecord._from_clean(f) for f in raw_fields]
+        return cls(section_id=section_id, content=content, fields=fields, extra=data)
+
+    def to_dict(self):
+        data = {
+            "section_id": self.section_id,
+            "content": self.content,
+            "fields": [f.to_dict() for f in self.fields],
+        }
+        data.update(self.extra)
+        return data
+
+
+def parse_title_response(response):
+    """
+    Validate a title response and return the form title.
+    Accepts a dict or the legacy list form ([{"form_title": ...}, *headers]),
+    see parse_title_headers for the rest of a legacy response.
+    """
+    if isinstance(response, list):
+        if not response:
+            raise ResponseValidationError("Empty title response")
+        response = response[0]
+    if not isinstance(response, dict):
+        raise ResponseValidationError(f"Title must be an object, got {type(response).__name__}")
+    title = response.get("form_title", "")
+    if not isinstance(title, str):
+        raise ResponseValidationError("'form_title' must be a string")
+    return title.strip()
+
+
+def parse_title_headers(response):
+    """Header fields after the title in a legacy list-form title response ([] otherwise)"""
+    if not isinstance(response, list):
+        return []
+    headers = _clean(response[1:])
+    for header in headers:
+        if not isinstance(header, dict):
+            raise ResponseValidationError(f"Title header must be an object, got {type(header).__name__}")
+    return headers
+
+
+def parse_section_response(response):
+    """Validate a section response and return a SectionRecord"""
+    return SectionRecord.from_response(response)
+
+
+def _default(obj):
+    if isinstance(obj, (SectionRecord, FieldRecord)):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_form_json(form_json, pretty=False):
+    """Serialise form JSON (with records) to bytes, compact unless pretty is set"""
+    if orjson is not None:
+        # Records go through to_dict() rather than orjson's native dataclass output
+        option = orjson.OPT_PASSTHROUGH_DATACLASS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(form_json, default=_default, option=option)
+    if pretty:
+        return json.dumps(form_json, default=_default, indent=2).encode("utf-8")
+    return json.dumps(form_json, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def write_form_json(form_json, path, pretty=False):
+    """Write form JSON to path, compact unless pretty is set"""
+    with open(path, "wb") as f:
+        f.write(dumps_form_json(form_json, pretty=pretty))
@@ -0,0 +1,127 @@
+"""
+Revision-aware conversion: reuse the responses of sections that did not change
+since the previous conversion of the same form_code
+"""
+import json
+import logging
+import os
+import threading
+
+from dedup import content_hash, perceptual_hash
+
+logger = logging.getLogger("form_conversion")
+
+INDEX_SUFFIX = "_revision_index.json"
+# outputs/<LATEST_DIR>/<form_code>.json points at the newest index of each form
+LATEST_DIR = "revisions"
+
+
+def index_path(json_dir, form_code):
+    return os.path.join(json_dir, f"{form_code}{INDEX_SUFFIX}")
+
+
+def latest_pointer_path(outputs_root, form_code):
+    return os.path.join(outputs_root, LATEST_DIR, f"{form_code}.json")
+
+
+def latest_index(outputs_root, form_code):
+    """Revision index of the last conversion of form_code, None if there is none (or it was swept)"""
+    try:
+        with open(latest_pointer_path(outputs_root, form_code), "r") as f:
+            path = json.load(f)["index"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return path if os.path.isfile(path) else None
+
+
+def set_latest_index(outputs_root, form_code, path):
+    """Point the next conversion of form_code at the index at path"""
+    pointer = latest_pointer_path(outputs_root, form_code)
+    os.makedirs(os.path.dirname(pointer), exist_ok=True)
+    # Workers in other processes may write the same pointer
+    tmp_path = f"{pointer}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"index": path}, f)
+    os.replace(tmp_path, pointer)
+
+
+class RevisionTracker:
+    """
+    Matches the sections of a new revision against the previous revision index
+    by section type and image hash, and records the index for the next revision.
+    """
+
+    def __init__(self, previous_path=None, max_distance=8, hash_size=16):
+        self.previous_path = previous_path
+        self.max_distance = max_distance
+        self.hash_size = hash_size
+        self.previous = []
+        self.entries = []
+        self.reused = []
+        self._hashes = {}
+        self._lock = threading.Lock()
+        if previous_path:
+            try:
+                with open(previous_path, "r") as f:
+                    self.previous = json.load(f)["sections"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"⚠️ [REVISION] Ignoring unreadable index {previous_path}: {e}")
+                self.previous_path = None
+
+    def _hash(self, section_path):
+        with self._lock:
+            cached = self._hashes.get(section_path)
+        if cached is None:
+            # Exact hash without Pillow, ("none", None) for a crop that never matches
+            key = perceptual_hash(section_path, self.hash_size) or content_hash(section_path)
+            cached = list(key or ("none", None))
+            with self._lock:
+                self._hashes[section_path] = cached
+        return cached
+
+    def _distance(self, a, b):
+        if a[0] != b[0] or a[0] == "none":
+            return None
+        if a[0] == "dhash":
+            return bin(a[1] ^ b[1]).count("1")
+        return 0 if a[1] == b[1] else None
+
+    def match(self, section, section_type, section_path):
+        """The previous entry for an unchanged section, None if it is new or changed"""
+        if not self.previous:
+            return None
+        key = self._hash(section_path)
+        best = None
+        for entry in self.previous:
+            if entry["section_type"] != section_type:
+                continue
+            distance = self._distance(key, entry["hash"])
+            if distance is None or distance > self.max_distance:
+                continue
+            # Prefer the section in the same position, then the closest image
+            rank = (entry["section"] != section, distance)
+            if best is None or rank < best[0]:
+                best = (rank, entry)
+        if best is None:
+            return None
+        with self._lock:
+            self.reused.append(section)
+        return best[1]
+
+    def record(self, section, section_type, section_path, response):
+        """Keep a section of this revision for the next one to match against"""
+        entry = {
+            "section": section,
+            "section_type": section_type,
+            "hash": self._hash(section_path),
+            "response": response,
+        }
+        with self._lock:
+            self.entries.append(entry)
+
+    def write(self, path):
+        entries = sorted(self.entries, key=lambda entry: entry["section"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"sections": entries}, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,185 @@
+"""
+Priority lanes: interactive single-file sessions ahead of bulk batch sessions
+"""
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from cancellation import SectionTimeoutError
+
+logger = logging.getLogger("form_conversion")
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+LANES = (INTERACTIVE, BATCH)
+
+
+def lane_for_mode(mode):
+    """ConversionSession.mode 'single' is interactive, everything else is batch"""
+    return INTERACTIVE if mode == "single" else BATCH
+
+
+class PriorityLimiter:
+    """
+    Caps in-flight AI requests across all sessions.
+    reserved_interactive slots can only be used by the interactive lane, and
+    batch requests also wait while any interactive request is waiting, so a
+    single form overtakes running batches at the next section boundary.
+    A capacity of 0 disables the limit.
+    """
+
+    def __init__(self, capacity=8, reserved_interactive=2):
+        self.capacity = capacity
+        self.reserved_interactive = min(reserved_interactive, capacity)
+        self._reserved_config = reserved_interactive
+        self.in_flight = {lane: 0 for lane in LANES}
+        self.waiting = {lane: 0 for lane in LANES}
+        self._cond = threading.Condition()
+
+    def _can_run(self, lane):
+        if sum(self.in_flight.values()) >= self.capacity:
+            return False
+        if lane == INTERACTIVE:
+            return True
+        return (
+            self.waiting[INTERACTIVE] == 0
+            and self.in_flight[BATCH] < self.capacity - self.reserved_interactive
+        )
+
+    def acquire(self, lane, token=None, timeout=0, poll_interval=0.2):
+        """
+        Wait for a slot in lane. With a token the wait stops (ConversionCancelled)
+        as soon as it is cancelled or past a deadline, and after timeout seconds
+        (0 waits for as long as it takes) with SectionTimeoutError.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        with self._cond:
+            self.waiting[lane] += 1
+            try:
+                while self.capacity and not self._can_run(lane):
+                    if token is not None:
+                        token.check("AI slot wait")
+                    wait_for = poll_interval if token is not None else None
+                    if deadline is not None:
+                        left = deadline - time.monotonic()
+                        if left <= 0:
+                            raise SectionTimeoutError(f"No AI slot within the {timeout:g}s section deadline")
+                        wait_for = min(wait_for or left, left)
+                    self._cond.wait(wait_for)
+            finally:
+                self.waiting[lane] -= 1
+            self.in_flight[lane] += 1
+
+    def release(self, lane):
+        with self._cond:
+            self.in_flight[lane] -= 1
+            self._cond.notify_all()
+
+    def set_capacity(self, capacity):
+        """
+        Change the cap at runtime (adaptive concurrency). Calls over a lowered cap
+        finish normally and no new ones start until the total is below it.
+        At least one slot is always left to batches.
+        """
+        with self._cond:
+            self.capacity = capacity
+            self.reserved_interactive = min(self._reserved_config, max(capacity - 1, 0))
+            self._cond.notify_all()
+
+    def total_in_flight(self):
+        with self._cond:
+            return sum(self.in_flight.values())
+
+    @contextmanager
+    def slot(self, lane, token=None, timeout=0):
+        self.acquire(lane, token, timeout)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "reserved_interactive": self.reserved_interactive,
+                "in_flight": dict(self.in_flight),
+                "waiting": dict(self.waiting),
+            }
+
+
+class SessionScheduler:
+    """
+    Starts session worker threads per lane, up to max_sessions[lane] at a time.
+    Interactive sessions are always dispatched before queued batch sessions.
+    """
+
+    def __init__(self, run, max_interactive=4, max_batch=2):
+        self.run = run
+        self.max_sessions = {INTERACTIVE: max_interactive, BATCH: max_batch}
+        self.running = {lane: 0 for lane in LANES}
+        self.queues = {lane: deque() for lane in LANES}
+        self._lock = threading.Lock()
+
+    def submit(self, session):
+        """Queue a pending session; returns False if it was already submitted"""
+        lane = lane_for_mode(session.mode)
+        with self._lock:
+            if session.status != "pending":
+                return False
+            session.status = "queued"
+            self.queues[lane].append(session)
+        logger.info(f"🗂️ [SCHEDULER] Session {session.session_id[:8]} queued in {lane} lane")
+        self._dispatch()
+        return True
+
+    def cancel(self, session):
+        """Drop a session that is still waiting in its lane; False if it already started"""
+        with self._lock:
+            for queue in self.queues.values():
+                if session in queue:
+                    queue.remove(session)
+                    return True
+        return False
+
+    def _dispatch(self):
+        to_start = []
+        with self._lock:
+            for lane in LANES:
+                limit = self.max_sessions[lane]
+                while self.queues[lane] and (not limit or self.running[lane] < limit):
+                    self.running[lane] += 1
+                    to_start.append((self.queues[lane].popleft(), lane))
+        for session, lane in to_start:
+            thread = threading.Thread(
+                target=self._run_session, args=(session, lane), name=f"session-{session.session_id[:8]}"
+            )
+            thread.daemon = True
+            thread.start()
+
+    def _run_session(self, session, lane):
+        try:
+            self.run(session)
+        finally:
+            with self._lock:
+                self.running[lane] -= 1
+            self._dispatch()
+
+    def queue_position(self, session_id):
+        """1-based position of a queued session within its lane, None if it is not queued"""
+        with self._lock:
+            for queue in self.queues.values():
+                for index, session in enumerate(queue):
+                    if session.session_id == session_id:
+                        return index + 1
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": dict(self.running),
+                "queued": {lane: len(queue) for lane, queue in self.queues.items()},
+                "max_sessions": dict(self.max_sessions),
+            }
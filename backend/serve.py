@@ -0,0 +1,223 @@
+"""
+Production HTTP server for the API and the built UI
+
+    python serve.py --port 5001
+
+Serves the API and the ui/dist bundle (npm run build) from one process under
+gunicorn (gthread worker, POSIX) or waitress, with request threads sized from
+the CPU count. Sessions and their progress live in this process's memory, so
+it stays a single process; conversions scale out over processes through
+[distributed] and python worker.py. SIGHUP makes gunicorn reload the app
+gracefully: the old worker finishes its requests before exiting (sessions held
+in its memory go with it). .config and secrets.json changes need no reload.
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+
+from flask import abort, send_from_directory
+
+from config_service import ConfigService
+
+logger = logging.getLogger("form_conversion")
+
+SERVERS = ("gunicorn", "waitress")
+# Paths that always belong to the API, never to the UI's client-side routes
+API_PREFIXES = ("api/", "metrics")
+
+
+def default_threads(cpu_count=None):
+    """Request threads: mostly short progress polls that wait on I/O, 4 per CPU within 8-64"""
+    return min(max(8, (cpu_count or os.cpu_count() or 1) * 4), 64)
+
+
+def available_server():
+    """gunicorn where it can run (POSIX), otherwise waitress, None when neither is installed"""
+    for name in SERVERS:
+        if name == "gunicorn" and os.name != "posix":
+            continue
+        try:
+            __import__(name)
+        except ImportError:
+            continue
+        return name
+    return None
+
+
+class ServerSettings:
+    """The [server] section of .config"""
+
+    def __init__(
+        self,
+        host="0.0.0.0",
+        port=5001,
+        threads=0,
+        keepalive_seconds=75,
+        timeout_seconds=120,
+        graceful_timeout_seconds=30,
+        backlog=2048,
+        connection_limit=1000,
+        ui_dist="../ui/dist",
+        static_max_age=31536000,
+    ):
+        self.host = host
+        self.port = port
+        self.threads = threads or default_threads()
+        self.keepalive_seconds = keepalive_seconds
+        self.timeout_seconds = timeout_seconds
+        self.graceful_timeout_seconds = graceful_timeout_seconds
+        self.backlog = backlog
+        self.connection_limit = connection_limit
+        self.ui_dist = ui_dist
+        self.static_max_age = static_max_age
+
+    @classmethod
+    def from_config(cls, config, **overrides):
+        section = "server"
+        settings = {
+            "host": config.get(section, "host", fallback="0.0.0.0"),
+            "port": config.getint(section, "port", fallback=5001),
+            "threads": config.getint(section, "threads", fallback=0),
+            "keepalive_seconds": config.getint(section, "keepalive_seconds", fallback=75),
+            "timeout_seconds": config.getint(section, "timeout_seconds", fallback=120),
+            "graceful_timeout_seconds": config.getint(section, "graceful_timeout_seconds", fallback=30),
+            "backlog": config.getint(section, "backlog", fallback=2048),
+            "connection_limit": config.getint(section, "connection_limit", fallback=1000),
+            "ui_dist": config.get(section, "ui_dist", fallback="../ui/dist"),
+            "static_max_age": config.getint(section, "static_max_age", fallback=31536000),
+        }
+        settings.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(**settings)
+
+
+def register_ui(flask_app, dist_dir, max_age=31536000):
+    """
+    Serve the built UI next to the API. Vite fingerprints everything under
+    assets/, so those are cached for max_age and marked immutable; index.html
+    and the other files are revalidated on every load. Unknown paths get
+    index.html for the client-side routes.
+    """
+    dist_dir = os.path.abspath(dist_dir)
+    if not os.path.isfile(os.path.join(dist_dir, "index.html")):
+        logger.warning(f"⚠️ [SERVER] No UI build in {dist_dir}, serving the API only (run npm run build in ui/)")
+        return False
+
+    def index():
+        return send_from_directory(dist_dir, "index.html", max_age=0)
+
+    def ui_file(path):
+        if path.startswith(API_PREFIXES):
+            abort(404)
+        if not os.path.isfile(os.path.join(dist_dir, path)):
+            return index()
+        immutable = path.startswith("assets/")
+        response = send_from_directory(dist_dir, path, max_age=max_age if immutable else 0)
+        if immutable:
+            response.cache_control.immutable = True
+        return response
+
+    flask_app.add_url_rule("/", "ui_index", index)
+    flask_app.add_url_rule("/<path:path>", "ui_file", ui_file)
+    logger.info(f"🖥️ [SERVER] Serving the UI from {dist_dir}")
+    return True
+
+
+def run_gunicorn(load, settings):
+    """Block serving load() (called in the worker, so a reload re-imports the app)"""
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{settings.host}:{settings.port}",
+                # One process: sessions live in the app's memory
+                "workers": 1,
+                "worker_class": "gthread",
+                "threads": settings.threads,
+                "worker_connections": settings.connection_limit,
+                # Longer than the usual 60s idle timeout of load balancers, so they
+                # never reuse a connection the server has just closed
+                "keepalive": settings.keepalive_seconds,
+                "timeout": settings.timeout_seconds,
+                "graceful_timeout": settings.graceful_timeout_seconds,
+                "backlog": settings.backlog,
+                "loglevel": "warning",
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load()
+
+    Application().run()
+
+
+def run_waitress(load, settings):
+    import waitress
+
+    if hasattr(signal, "SIGHUP"):
+        # waitress cannot reload in place; do not let a reload request kill it
+        signal.signal(
+            signal.SIGHUP,
+            lambda _signum, _frame: logger.warning("⚠️ [SERVER] waitress cannot reload, restart it instead"),
+        )
+    waitress.serve(
+        load(),
+        host=settings.host,
+        port=settings.port,
+        threads=settings.threads,
+        connection_limit=settings.connection_limit,
+        # waitress closes idle keep-alive connections after channel_timeout
+        channel_timeout=max(settings.keepalive_seconds, settings.timeout_seconds),
+        backlog=settings.backlog,
+        ident="form-conversion",
+    )
+
+
+def run(server, load, settings):
+    if server == "gunicorn":
+        run_gunicorn(load, settings)
+    else:
+        run_waitress(load, settings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the form conversion API and UI in production")
+    parser.add_argument("--server", choices=("auto",) + SERVERS, default="auto")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None, help="request threads (default: 4 x CPUs, 8-64)")
+    parser.add_argument("--ui-dist", default=None, help="built UI to serve (default: ../ui/dist)")
+    args = parser.parse_args()
+
+    settings = ServerSettings.from_config(
+        ConfigService().snapshot(),
+        host=args.host,
+        port=args.port,
+        threads=args.threads,
+        ui_dist=args.ui_dist,
+    )
+    server = available_server() if args.server == "auto" else args.server
+    if server is None:
+        parser.error("Install a production server first: pip install gunicorn (or waitress)")
+
+    def load():
+        # Imported here so --help works without a configured backend
+        import app
+
+        register_ui(app.app, settings.ui_dist, settings.static_max_age)
+        app.start_background()
+        logger.info(
+            f"🚀 [SERVER] {server} on {settings.host}:{settings.port} with {settings.threads} threads "
+            f"(keep-alive {settings.keepalive_seconds}s, timeout {settings.timeout_seconds}s)"
+        )
+        return app.app
+
+    run(server, load, settings)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
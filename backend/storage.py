@@ -0,0 +1,247 @@
+"""
+Date/session sharded storage layout and retention sweeping for uploads/ and outputs/
+
+    uploads/<YYYY-MM-DD>/<session_id>/<file>.pdf
+    outputs/<YYYY-MM-DD>/<session_id>/images_of_pdfs/<stem>/...
+    outputs/<YYYY-MM-DD>/<session_id>/artifacts/<stem>.fca
+    outputs/<YYYY-MM-DD>/<session_id>/json_outputs/<form_code>_input_for_af.json
+    outputs/<YYYY-MM-DD>/<session_id>/generated_AF/...
+"""
+import datetime
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+
+logger = logging.getLogger("form_conversion")
+
+SHARD_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# Lower tiers are deleted first when over the size budget
+TIERS = {
+    "images_of_pdfs": 0,
+    "artifacts": 0,
+    "checkpoints": 0,
+    "uploads": 1,
+    "json_outputs": 2,
+    "generated_AF": 3,
+}
+
+
+class SessionStorage:
+    """Per-session directories, sharded by creation date"""
+
+    def __init__(self, session_id, uploads_root="uploads", outputs_root="outputs", created=None):
+        self.created = created = created or datetime.date.today()
+        self.shard = f"{created.isoformat()}/{session_id}"
+        self.outputs_root = outputs_root
+        self.uploads = os.path.join(uploads_root, self.shard)
+        self.outputs = os.path.join(outputs_root, self.shard)
+        self.images = os.path.join(self.outputs, "images_of_pdfs")
+        self.artifacts = os.path.join(self.outputs, "artifacts")
+        self.json = os.path.join(self.outputs, "json_outputs")
+        self.packages = os.path.join(self.outputs, "generated_AF")
+
+    def create(self):
+        for path in (self.uploads, self.images, self.json, self.packages):
+            os.makedirs(path, exist_ok=True)
+        return self
+
+    def relative(self, path):
+        """Path relative to outputs/, as served by /api/download"""
+        return os.path.relpath(path, self.outputs_root).replace(os.sep, "/")
+
+
+class RetentionPolicy:
+    """Age (days) and size (MB) limits from the [retention] section of .config, 0 disables one"""
+
+    def __init__(
+        self,
+        intermediates_max_age_days=7,
+        uploads_max_age_days=14,
+        json_max_age_days=30,
+        packages_max_age_days=90,
+        max_total_size_mb=0,
+        interval_seconds=3600,
+    ):
+        self.max_age_days = {
+            "images_of_pdfs": intermediates_max_age_days,
+            "artifacts": intermediates_max_age_days,
+            "checkpoints": intermediates_max_age_days,
+            "uploads": uploads_max_age_days,
+            "json_outputs": json_max_age_days,
+            "generated_AF": packages_max_age_days,
+        }
+        self.max_total_size_mb = max_total_size_mb
+        self.interval_seconds = interval_seconds
+
+    @classmethod
+    def from_config(cls, config):
+        section = "retention"
+        return cls(
+            intermediates_max_age_days=config.getfloat(section, "intermediates_max_age_days", fallback=7),
+            uploads_max_age_days=config.getfloat(section, "uploads_max_age_days", fallback=14),
+            json_max_age_days=config.getfloat(section, "json_max_age_days", fallback=30),
+            packages_max_age_days=config.getfloat(section, "packages_max_age_days", fallback=90),
+            max_total_size_mb=config.getfloat(section, "max_total_size_mb", fallback=0),
+            interval_seconds=config.getfloat(section, "interval_seconds", fallback=3600),
+        )
+
+
+def _tree_size(path):
+    """(bytes, file count) of a directory tree"""
+    total = 0
+    count = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+                count += 1
+            except OSError:
+                pass
+    return total, count
+
+
+class RetentionSweeper:
+    """
+    Deletes old shards in the background: intermediates first, final packages last.
+    active_sessions() returns the ids of sessions that must not be touched.
+    """
+
+    def __init__(self, uploads_root, outputs_root, checkpoints_root, policy=None, active_sessions=None):
+        self.uploads_root = uploads_root
+        self.outputs_root = outputs_root
+        self.checkpoints_root = checkpoints_root
+        self.policy = policy or RetentionPolicy()
+        self.active_sessions = active_sessions or (lambda: set())
+        self.last_usage = None
+        self.last_sweep = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _entries(self):
+        """Every deletable unit as (kind, session_id, path, mtime, size, files)"""
+        entries = []
+
+        def add(kind, session_id, path):
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                return
+            size, files = _tree_size(path)
+            entries.append((kind, session_id, path, mtime, size, files))
+
+        for root, is_uploads in ((self.uploads_root, True), (self.outputs_root, False)):
+            if not os.path.isdir(root):
+                continue
+            for shard in os.listdir(root):
+                shard_path = os.path.join(root, shard)
+                if not SHARD_PATTERN.match(shard) or not os.path.isdir(shard_path):
+                    continue
+                for session_id in os.listdir(shard_path):
+                    session_path = os.path.join(shard_path, session_id)
+                    if is_uploads:
+                        add("uploads", session_id, session_path)
+                        continue
+                    for kind in ("images_of_pdfs", "artifacts", "json_outputs", "generated_AF"):
+                        kind_path = os.path.join(session_path, kind)
+                        if os.path.isdir(kind_path):
+                            add(kind, session_id, kind_path)
+
+        # checkpoints/<file digest>/<session_id>/, one entry per session
+        if os.path.isdir(self.checkpoints_root):
+            for digest in os.listdir(self.checkpoints_root):
+                digest_path = os.path.join(self.checkpoints_root, digest)
+                if not os.path.isdir(digest_path):
+                    continue
+                for session_id in os.listdir(digest_path):
+                    add("checkpoints", session_id, os.path.join(digest_path, session_id))
+        return entries
+
+    @staticmethod
+    def _usage(entries):
+        usage = {kind: {"bytes": 0, "files": 0} for kind in TIERS}
+        for kind, _sid, _path, _mtime, size, files in entries:
+            usage[kind]["bytes"] += size
+            usage[kind]["files"] += files
+        return {
+            "total_bytes": sum(u["bytes"] for u in usage.values()),
+            "total_files": sum(u["files"] for u in usage.values()),
+            "by_kind": usage,
+            "measured_at": time.time(),
+        }
+
+    def disk_usage(self):
+        """Latest disk usage, measured now if no sweep has run yet"""
+        if self.last_usage is None:
+            self.last_usage = self._usage(self._entries())
+        return self.last_usage
+
+    def _remove(self, path):
+        shutil.rmtree(path, ignore_errors=True)
+        # Drop session and date directories left empty
+        parent = os.path.dirname(path)
+        for _ in range(2):
+            if parent in (self.uploads_root, self.outputs_root, self.checkpoints_root):
+                break
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+
+    def sweep(self):
+        """Apply the age and size policies once and return what was removed"""
+        with self._lock:
+            now = time.time()
+            active = set(self.active_sessions())
+            entries = [e for e in self._entries() if e[1] not in active]
+            removed = []
+
+            kept = []
+            for entry in entries:
+                kind, _sid, path, mtime, size, _files = entry
+                max_age = self.policy.max_age_days[kind]
+                if max_age and now - mtime > max_age * 86400:
+                    self._remove(path)
+                    removed.append({"path": path, "bytes": size, "reason": "age"})
+                else:
+                    kept.append(entry)
+
+            if self.policy.max_total_size_mb:
+                budget = self.policy.max_total_size_mb * 1024 * 1024
+                total = sum(e[4] for e in kept)
+                # Oldest intermediates first, final packages last
+                for kind, _sid, path, _mtime, size, _files in sorted(kept, key=lambda e: (TIERS[e[0]], e[3])):
+                    if total <= budget:
+                        break
+                    self._remove(path)
+                    total -= size
+                    removed.append({"path": path, "bytes": size, "reason": "size"})
+
+            self.last_usage = self._usage(self._entries())
+            self.last_sweep = {
+                "at": now,
+                "removed": len(removed),
+                "freed_bytes": sum(r["bytes"] for r in removed),
+            }
+            return removed
+
+    def _run(self):
+        while not self._stop.wait(self.policy.interval_seconds):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"💥 [RETENTION] Sweep failed: {e}", exc_info=True)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="retention-sweeper", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
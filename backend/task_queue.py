@@ -0,0 +1,478 @@
+"""
+Per-file task queue for distributed worker mode, backed by SQLite
+
+/api/process enqueues one task per file. Workers on any node that can reach the
+database file and the shared uploads/outputs roots lease tasks, heartbeat while
+they run them and report the result. A task whose lease runs out (the worker died
+or hung) goes back to the queue until max_attempts leases have been used.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("form_conversion")
+
+QUEUED = "queued"
+LEASED = "leased"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL_STATES = (COMPLETED, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    file_index INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    lease_expires REAL,
+    step INTEGER,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_pending ON tasks (status, priority, id);
+CREATE INDEX IF NOT EXISTS tasks_session ON tasks (session_id, file_index);
+CREATE TABLE IF NOT EXISTS session_spend (
+    session_id TEXT PRIMARY KEY,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0,
+    sections INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS daily_spend (
+    day TEXT PRIMARY KEY,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+class TaskQueue:
+    """
+    SQLite task queue shared by the API process and every worker.
+    Each call opens its own connection, so one instance is safe to use from any thread.
+    """
+
+    def __init__(self, path, lease_seconds=120, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(tasks)")}
+            if "cancel_requested" not in columns:
+                # Queue databases created before cancellation support
+                conn.execute("ALTER TABLE tasks ADD COLUMN cancel_requested INTEGER NOT NULL DEFAULT 0")
+
+    @classmethod
+    def from_config(cls, config, default_path):
+        section = "distributed"
+        return cls(
+            config.get(section, "queue_path", fallback=default_path),
+            lease_seconds=config.getfloat(section, "lease_seconds", fallback=120),
+            max_attempts=config.getint(section, "max_attempts", fallback=3),
+        )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            # Closing without COMMIT rolls back a half-done transaction
+            conn.close()
+
+    def _transaction(self, conn):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can
+        # never lease the same task
+        conn.execute("BEGIN IMMEDIATE")
+
+    @staticmethod
+    def _task(row):
+        task = dict(row)
+        task["payload"] = json.loads(task["payload"])
+        task["result"] = json.loads(task["result"]) if task["result"] else None
+        return task
+
+    def enqueue(self, session_id, mode, files, payload, priority=1, sources=None):
+        """
+        Add one task per file; lower priority values are leased first.
+        sources maps a filename to the server-side path it is read from in place.
+        """
+        now = time.time()
+        sources = sources or {}
+
+        def task_payload(filename):
+            if filename not in sources:
+                return json.dumps(payload)
+            return json.dumps(dict(payload, source=sources[filename]))
+
+        with self._connect() as conn:
+            self._transaction(conn)
+            conn.executemany(
+                "INSERT INTO tasks (session_id, file_index, filename, mode, priority, payload,"
+                " status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (session_id, index, filename, mode, priority, task_payload(filename), QUEUED, now, now)
+                    for index, filename in enumerate(files)
+                ],
+            )
+            conn.execute("COMMIT")
+        logger.info(f"📬 [QUEUE] Enqueued {len(files)} task(s) for session {session_id[:8]}")
+
+    def _requeue_expired(self, conn, now):
+        expired = conn.execute(
+            "SELECT id, filename, attempts, worker_id FROM tasks WHERE status = ? AND lease_expires < ?",
+            (LEASED, now),
+        ).fetchall()
+        for row in expired:
+            if row["attempts"] >= self.max_attempts:
+                error = f"Lease expired {row['attempts']} times, giving up"
+                result = {"filename": row["filename"], "status": "error", "error": error}
+                conn.execute(
+                    "UPDATE tasks SET status = ?, error = ?, result = ?, lease_expires = NULL,"
+                    " updated_at = ? WHERE id = ?",
+                    (FAILED, error, json.dumps(result), now, row["id"]),
+                )
+                logger.error(f"💥 [QUEUE] Task {row['id']} failed: {error}")
+            else:
+                conn.execute(
+                    "UPDATE tasks SET status = ?, worker_id = NULL, lease_expires = NULL, step = NULL,"
+                    " updated_at = ? WHERE id = ?",
+                    (QUEUED, now, row["id"]),
+                )
+                logger.warning(f"⚠️ [QUEUE] Lease of task {row['id']} by {row['worker_id']} expired, requeued")
+        return len(expired)
+
+    def requeue_expired(self):
+        """Return tasks whose worker stopped heartbeating to the queue"""
+        with self._connect() as conn:
+            self._transaction(conn)
+            count = self._requeue_expired(conn, time.time())
+            conn.execute("COMMIT")
+        return count
+
+    def lease(self, worker_id):
+        """Claim the next queued task for worker_id, or None if the queue is empty"""
+        now = time.time()
+        with self._connect() as conn:
+            self._transaction(conn)
+            self._requeue_expired(conn, now)
+            row = conn.execute(
+                "SELECT * FROM tasks WHERE status = ? ORDER BY priority, id LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = ?, worker_id = ?, lease_expires = ?, attempts = attempts + 1,"
+                " step = 0, updated_at = ? WHERE id = ?",
+                (LEASED, worker_id, now + self.lease_seconds, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+        task = self._task(row)
+        task.update(status=LEASED, worker_id=worker_id, attempts=task["attempts"] + 1)
+        return task
+
+    def heartbeat(self, task_id, worker_id, step=None):
+        """Extend a lease and report the current step; False if the lease was lost"""
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ?, step = COALESCE(?, step), updated_at = ?"
+                " WHERE id = ? AND worker_id = ? AND status = ?",
+                (now + self.lease_seconds, step, now, task_id, worker_id, LEASED),
+            )
+        return cursor.rowcount == 1
+
+    def cancel_requested(self, task_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT cancel_requested FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def cancel_session(self, session_id):
+        """Cancel a session's queued tasks and ask the workers running the others to stop"""
+        now = time.time()
+        with self._connect() as conn:
+            self._transaction(conn)
+            queued = conn.execute(
+                "SELECT id, filename FROM tasks WHERE session_id = ? AND status = ?", (session_id, QUEUED)
+            ).fetchall()
+            for row in queued:
+                result = {"filename": row["filename"], "status": CANCELLED, "error": "Cancelled before it started"}
+                conn.execute(
+                    "UPDATE tasks SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+                    (CANCELLED, json.dumps(result), result["error"], now, row["id"]),
+                )
+            conn.execute(
+                "UPDATE tasks SET cancel_requested = 1, updated_at = ? WHERE session_id = ? AND status = ?",
+                (now, session_id, LEASED),
+            )
+            conn.execute("COMMIT")
+        logger.info(f"🛑 [QUEUE] Cancelled {len(queued)} queued task(s) of session {session_id[:8]}")
+
+    def cancelled(self, task_id, worker_id, result):
+        """Store the partial result of a task its worker stopped on request"""
+        return self._finish(task_id, worker_id, CANCELLED, result, result.get("error"))
+
+    def complete(self, task_id, worker_id, result):
+        """Store a finished file's result; ignored if the lease was lost meanwhile"""
+        return self._finish(task_id, worker_id, COMPLETED, result, None)
+
+    def fail(self, task_id, worker_id, error, result=None, retry=True):
+        """Requeue a failed task, or mark it failed once max_attempts is reached"""
+        now = time.time()
+        with self._connect() as conn:
+            self._transaction(conn)
+            row = conn.execute(
+                "SELECT attempts FROM tasks WHERE id = ? AND worker_id = ? AND status = ?",
+                (task_id, worker_id, LEASED),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return False
+            if retry and row["attempts"] < self.max_attempts:
+                conn.execute(
+                    "UPDATE tasks SET status = ?, worker_id = NULL, lease_expires = NULL, step = NULL,"
+                    " error = ?, updated_at = ? WHERE id = ?",
+                    (QUEUED, error, now, task_id),
+                )
+                conn.execute("COMMIT")
+                logger.warning(f"🔁 [QUEUE] Task {task_id} failed (attempt {row['attempts']}), requeued: {error}")
+                return True
+            conn.execute("COMMIT")
+        return self._finish(task_id, worker_id, FAILED, result, error)
+
+    def _finish(self, task_id, worker_id, status, result, error):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = ?, result = ?, error = ?, lease_expires = NULL, updated_at = ?"
+                " WHERE id = ? AND worker_id = ? AND status = ?",
+                (status, json.dumps(result) if result is not None else None, error,
+                 time.time(), task_id, worker_id, LEASED),
+            )
+        if cursor.rowcount != 1:
+            logger.warning(f"⚠️ [QUEUE] Task {task_id} is no longer leased by {worker_id}, result dropped")
+            return False
+        return True
+
+    def add_spend(self, session_id, tokens=0, cost=0.0, sections=0):
+        """Add to a session's spend across all workers and return its (tokens, cost, sections)"""
+        with self._connect() as conn:
+            self._transaction(conn)
+            conn.execute(
+                "INSERT INTO session_spend (session_id, tokens, cost, sections) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (session_id) DO UPDATE SET tokens = tokens + excluded.tokens,"
+                " cost = cost + excluded.cost, sections = sections + excluded.sections",
+                (session_id, tokens, cost, sections),
+            )
+            row = conn.execute(
+                "SELECT tokens, cost, sections FROM session_spend WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            conn.execute("COMMIT")
+        return row["tokens"], row["cost"], row["sections"]
+
+    def session_spend(self, session_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT tokens, cost, sections FROM session_spend WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return (row["tokens"], row["cost"], row["sections"]) if row else (0, 0.0, 0)
+
+    def add_daily_spend(self, day, tokens=0, cost=0.0):
+        """Add to the spend of every process on day (an ISO date) and return its (tokens, cost)"""
+        with self._connect() as conn:
+            self._transaction(conn)
+            conn.execute(
+                "INSERT INTO daily_spend (day, tokens, cost) VALUES (?, ?, ?)"
+                " ON CONFLICT (day) DO UPDATE SET tokens = tokens + excluded.tokens,"
+                " cost = cost + excluded.cost",
+                (day, tokens, cost),
+            )
+            row = conn.execute("SELECT tokens, cost FROM daily_spend WHERE day = ?", (day,)).fetchone()
+            conn.execute("COMMIT")
+        return row["tokens"], row["cost"]
+
+    def daily_spend(self, day):
+        with self._connect() as conn:
+            row = conn.execute("SELECT tokens, cost FROM daily_spend WHERE day = ?", (day,)).fetchone()
+        return (row["tokens"], row["cost"]) if row else (0, 0.0)
+
+    def session_tasks(self, session_id):
+        """Every task of a session, in file order"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM tasks WHERE session_id = ? ORDER BY file_index", (session_id,)
+            ).fetchall()
+        return [self._task(row) for row in rows]
+
+    def active_session_ids(self):
+        """Sessions with at least one task still queued or running"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT session_id FROM tasks WHERE status IN (?, ?)", (QUEUED, LEASED)
+            ).fetchall()
+        return {row["session_id"] for row in rows}
+
+    def stats(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status").fetchall()
+            workers = conn.execute(
+                "SELECT COUNT(DISTINCT worker_id) FROM tasks WHERE status = ?", (LEASED,)
+            ).fetchone()[0]
+        counts = {state: 0 for state in (QUEUED, LEASED) + TERMINAL_STATES}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return {"tasks": counts, "busy_workers": workers}
+
+
+class SessionSpend:
+    """
+    The spend of one distributed session, summed over every worker in the
+    queue, so session budget ceilings hold across files. Set as
+    SessionBudget.shared: the governor adds to it as it books spend and
+    syncs the totals before each call.
+    """
+
+    def __init__(self, queue, session_id):
+        self.queue = queue
+        self.session_id = session_id
+        self._pending = [0, 0.0, 0]  # tokens, cost, sections not yet written
+        self._totals = (0, 0.0, 0)
+        self._lock = threading.Lock()
+
+    def add(self, tokens=0, cost=0.0, sections=0):
+        with self._lock:
+            self._pending[0] += tokens
+            self._pending[1] += cost
+            self._pending[2] += sections
+
+    def pending(self):
+        with self._lock:
+            return tuple(self._pending)
+
+    def flush(self):
+        """
+        Write what was added since the last flush and return the session totals
+        in the queue (the last known ones while the database is unavailable)
+        """
+        with self._lock:
+            tokens, cost, sections = self._pending
+            self._pending = [0, 0.0, 0]
+        try:
+            totals = self.queue.add_spend(self.session_id, tokens, cost, sections)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ [QUEUE] Could not record the spend of session {self.session_id[:8]}: {e}")
+            self.add(tokens, cost, sections)
+            return self._totals
+        self._totals = totals
+        return totals
+
+
+class Worker:
+    """
+    Pulls tasks from a TaskQueue and runs them one at a time.
+    build_session(task) returns a ConversionSession for the task's file and
+    run_session(session, task) runs the pipeline and returns the file result.
+    The lease is renewed every lease_seconds / 3 with the session's current step.
+    With a recycler (see prefork.Recycler), the worker stops once its process is due
+    to be replaced.
+    """
+
+    def __init__(self, queue, worker_id, build_session, run_session, poll_interval=2.0, recycler=None):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.build_session = build_session
+        self.run_session = run_session
+        self.poll_interval = poll_interval
+        self.recycler = recycler
+        self._stop = threading.Event()
+
+    def _heartbeat(self, task, session, done):
+        interval = max(self.queue.lease_seconds / 3, 0.1)
+        # Cancellation is checked more often than the lease is renewed
+        check_interval = min(interval, 2.0)
+        last_beat = time.monotonic()
+        while not done.wait(check_interval):
+            if self.queue.cancel_requested(task["id"]):
+                session.cancel_token.cancel()
+            if time.monotonic() - last_beat < interval:
+                continue
+            last_beat = time.monotonic()
+            if not self.queue.heartbeat(task["id"], self.worker_id, session.current_step):
+                logger.warning(f"⚠️ [WORKER] Lost the lease on task {task['id']}")
+                return
+
+    def run_task(self, task):
+        logger.info(f"🔧 [WORKER] {self.worker_id} running task {task['id']}: {task['filename']}")
+        try:
+            session = self.build_session(task)
+        except Exception as e:
+            logger.error(f"💥 [WORKER] Could not set up task {task['id']}: {e}", exc_info=True)
+            self.queue.fail(task["id"], self.worker_id, str(e),
+                            result={"filename": task["filename"], "status": "error", "error": str(e)})
+            return
+
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(task, session, done), name=f"heartbeat-{task['id']}", daemon=True
+        )
+        heartbeat.start()
+        try:
+            result = self.run_session(session, task)
+        except Exception as e:
+            # Errors that stop a whole session (e.g. a spent budget) are not retried
+            logger.error(f"💥 [WORKER] Task {task['id']} failed: {e}", exc_info=True)
+            result = {"filename": task["filename"], "status": "error", "error": str(e)}
+            self.queue.fail(task["id"], self.worker_id, str(e), result=result, retry=False)
+            return
+        finally:
+            done.set()
+            heartbeat.join()
+
+        if result.get("status") == "completed":
+            self.queue.complete(task["id"], self.worker_id, result)
+        elif result.get("status") == CANCELLED:
+            self.queue.cancelled(task["id"], self.worker_id, result)
+        elif result.get("status") == "timed_out":
+            # Ran out of its file deadline; another attempt would likely do the same
+            self.queue.fail(task["id"], self.worker_id, result.get("error"), result=result, retry=False)
+        else:
+            self.queue.fail(task["id"], self.worker_id, result.get("error", "unknown error"), result=result)
+
+    def run(self):
+        logger.info(f"👷 [WORKER] {self.worker_id} polling {self.queue.path}")
+        while not self._stop.is_set():
+            if self.recycler is not None and self.recycler.due:
+                break
+            task = self.queue.lease(self.worker_id)
+            if task is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self.run_task(task)
+            if self.recycler is not None:
+                self.recycler.task_done()
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name=f"worker-{self.worker_id}", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,56 @@
+import json
+import os
+import shutil
+import sys
+import time
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Backend modules import each other as top-level modules, as they do when run from backend/
+sys.path.insert(0, BACKEND_DIR)
+
+
+class _NoSleepTime:
+    """Stands in for the time module inside app.py to drop the simulated sleeps"""
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    @staticmethod
+    def sleep(_seconds):
+        pass
+
+
+@pytest.fixture(scope="session")
+def backend(tmp_path_factory):
+    """
+    The app module, imported once from a scratch working directory holding a
+    copy of .config and a secrets.json (its paths are relative to the cwd)
+    """
+    workdir = tmp_path_factory.mktemp("backend")
+    shutil.copy(os.path.join(BACKEND_DIR, ".config"), workdir / ".config")
+    (workdir / "secrets.json").write_text(json.dumps({"T_NUMBER": "t1"}))
+    previous = os.getcwd()
+    os.chdir(workdir)
+    import app
+
+    app.time = _NoSleepTime()
+    yield app
+    os.chdir(previous)
+
+
+@pytest.fixture
+def client(backend):
+    return backend.app.test_client()
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = predicate()
+        if value:
+            return value
+        time.sleep(0.02)
+    raise AssertionError("timed out waiting")
@@ -0,0 +1,86 @@
+import io
+import threading
+
+import pytest
+
+from conftest import wait_for
+
+
+@pytest.fixture
+def finished_session(client):
+    files = [(io.BytesIO(b"%PDF-1.4"), name) for name in ("ABCD_a.pdf", "EFGH_b.pdf", "IJKL_c.pdf")]
+    response = client.post(
+        "/api/upload", data={"mode": "batch", "files": files}, content_type="multipart/form-data"
+    )
+    session_id = response.json["session_id"]
+    assert client.post(f"/api/process/{session_id}").status_code == 200
+    wait_for(lambda: client.get(f"/api/progress/{session_id}").json["status"] == "completed")
+    return session_id
+
+
+def test_progress_summary_revalidates_with_304(client, finished_session):
+    url = f"/api/progress/{finished_session}?summary=1"
+    first = client.get(url)
+    assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+    again = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+
+
+def test_progress_summary_carries_the_budget(backend, client, finished_session):
+    url = f"/api/progress/{finished_session}?summary=1"
+    first = client.get(url)
+    assert first.json["budget"]["state"] in ("ok", "throttled")
+    assert {"projected_tokens", "projected_cost", "daily_tokens"} <= first.json["budget"].keys()
+
+    # Spend does not bump the session version, but it is a new summary
+    session = backend.conversion_sessions[finished_session]
+    backend.budget_governor.record(session.budget, 10, 0.01)
+    again = client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 200
+    assert again.json["budget"]["tokens"] == first.json["budget"]["tokens"] + 10
+
+
+def test_results_etag_depends_on_the_query(client, finished_session):
+    url = f"/api/sessions/{finished_session}/results"
+    page = client.get(f"{url}?limit=1")
+    assert len(page.json["results"]) == 1 and page.json["next_cursor"] == "1"
+    etag = page.headers["ETag"]
+
+    assert client.get(f"{url}?limit=1", headers={"If-None-Match": etag}).status_code == 304
+    for query in ("?limit=2", "?after=1&limit=1", "?limit=1&fields=filename"):
+        response = client.get(url + query, headers={"If-None-Match": etag})
+        assert response.status_code == 200, query
+        assert response.headers["ETag"] != etag
+
+    # The same fields in another order are the same page
+    a = client.get(f"{url}?fields=status,filename")
+    b = client.get(f"{url}?fields=filename,status", headers={"If-None-Match": a.headers["ETag"]})
+    assert b.status_code == 304
+    assert a.json["results"][0].keys() == {"filename", "status"}
+
+
+def test_results_pages_cover_every_file_once(client, finished_session):
+    url = f"/api/sessions/{finished_session}/results"
+    seen, cursor = [], "0"
+    while cursor is not None:
+        page = client.get(f"{url}?after={cursor}&limit=2").json
+        seen.extend(result["filename"] for result in page["results"])
+        cursor = page["next_cursor"]
+    assert sorted(seen) == ["ABCD_a.pdf", "EFGH_b.pdf", "IJKL_c.pdf"]
+    assert client.get(f"{url}?limit=0").status_code == 400
+
+
+def test_version_bumps_are_not_lost_across_threads(backend):
+    session = backend.ConversionSession("versions", ["ABCD_a.pdf"], "single")
+    start = session.version
+
+    def bump():
+        for index in range(1000):
+            session.progress = index
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert session.version == start + 4000
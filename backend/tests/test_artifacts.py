@@ -0,0 +1,83 @@
+import io
+import os
+
+import pytest
+
+import artifacts
+from artifacts import ArtifactError, ArtifactReader, ArtifactWriter
+from conftest import wait_for
+
+
+@pytest.mark.parametrize("codec", ["zstd", "zlib", "none"])
+def test_entries_read_back_one_at_a_time(tmp_path, codec):
+    path = str(tmp_path / "form.fca")
+    with ArtifactWriter(path, codec) as writer:
+        writer.add("sections/a.png", b"\x89PNG" + bytes(range(256)), kind="image")
+        writer.add("text.txt", b"repeat " * 1000)
+        writer.add_json("responses/a.json", {"response": {"content": "x"}, "tokens": 3}, kind="response")
+        writer.metadata = {"filename": "ABCD_form.pdf"}
+    reader = ArtifactReader(path)
+    assert reader.read("text.txt") == b"repeat " * 1000
+    assert reader.read_json("responses/a.json")["tokens"] == 3
+    assert reader.names(kind="image") == ["sections/a.png"]
+    assert reader.metadata == {"filename": "ABCD_form.pdf"}
+    # zstd falls back to zlib without zstandard; incompressible data is stored as is
+    stored = {entry["name"]: entry["codec"] for entry in reader.listing()["entries"]}
+    assert stored["text.txt"] == ("none" if codec == "none" else artifacts.resolve_codec(codec))
+    assert stored["sections/a.png"] == "none"
+
+
+def test_a_corrupt_entry_is_detected(tmp_path):
+    path = str(tmp_path / "form.fca")
+    with ArtifactWriter(path, "none") as writer:
+        writer.add("a", b"original data")
+    with open(path, "r+b") as f:
+        f.seek(4)
+        f.write(b"X")
+    with pytest.raises(ArtifactError, match="corrupt"):
+        ArtifactReader(path).read("a")
+
+
+def test_an_incomplete_container_is_not_read(tmp_path):
+    path = str(tmp_path / "form.fca")
+    with pytest.raises(RuntimeError):
+        with ArtifactWriter(path) as writer:
+            writer.add("a", b"data")
+            raise RuntimeError("conversion failed")
+    assert os.listdir(tmp_path) == []
+    (tmp_path / "other.fca").write_bytes(b"not a container")
+    with pytest.raises(ArtifactError):
+        ArtifactReader(str(tmp_path / "other.fca"))
+
+
+def test_unknown_and_duplicate_entries(tmp_path):
+    path = str(tmp_path / "form.fca")
+    with ArtifactWriter(path) as writer:
+        writer.add("a", b"data")
+        with pytest.raises(ArtifactError):
+            writer.add("a", b"again")
+    with pytest.raises(ArtifactError):
+        ArtifactReader(path).read("b")
+
+
+def test_finished_files_are_packed_and_keep_their_loose_images(client):
+    response = client.post(
+        "/api/upload",
+        data={"mode": "single", "files": [(io.BytesIO(b"%PDF-1.4"), "ARTS_form.pdf")]},
+        content_type="multipart/form-data",
+    )
+    session_id = response.json["session_id"]
+    client.post(f"/api/process/{session_id}")
+    wait_for(lambda: client.get(f"/api/progress/{session_id}").json["status"] == "completed")
+    result = client.get(f"/api/progress/{session_id}").json["results"][0]
+
+    listing = client.get(f"/api/artifacts/{result['artifacts_path']}").json
+    names = [entry["name"] for entry in listing["entries"]]
+    assert "ARTS_input_for_af.json" in names
+    section = next(name for name in names if name.startswith("sections/"))
+    entry = client.get(f"/api/artifacts/{result['artifacts_path']}?entry={section}")
+    assert entry.status_code == 200
+    # keep_loose defaults to true, so the outputs look as they did before packing
+    images = os.path.join("outputs", os.path.dirname(os.path.dirname(result["artifacts_path"])), "images_of_pdfs")
+    assert os.path.isdir(os.path.join(images, "ARTS_form", "sections"))
+    assert client.get("/api/artifacts/../.config").status_code == 404
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+import types
+
+BENCHMARKS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "benchmarks")
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from run_benchmark import percentile, shape_pipeline  # noqa: E402
+
+
+def test_pipeline_is_shaped_by_pages_and_sections(tmp_path):
+    backend = types.SimpleNamespace()
+    shape_pipeline(backend, pages=5, sections=4)
+
+    images_folder, page_count = backend.pdf_to_images(str(tmp_path / "ABCD_x.pdf"), str(tmp_path))
+    assert page_count == 5 and backend.pdf_page_count("ABCD_x.pdf") == 5
+    sections = sorted(os.listdir(backend.process_form_images(images_folder, "ABCD_x.pdf")))
+    assert len(sections) == 20
+    assert sum("title" in name for name in sections) == 1
+
+    first = backend.segment_page_image("page.png", str(tmp_path / "pages"), 0)
+    later = backend.segment_page_image("page.png", str(tmp_path / "pages"), 1)
+    assert len(first) == len(later) == 4
+    assert "title" in first[0] and not any("title" in name for name in later)
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile([], 50) is None
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile(list(range(1, 101)), 95) == 95
+
+
+def test_a_short_load_test_reports_percentiles(tmp_path):
+    # A subprocess: the load test forks the server and owns its signal handling
+    output = tmp_path / "load.json"
+    command = [
+        sys.executable, os.path.join(BENCHMARKS_DIR, "load_test.py"),
+        "--uploaders", "2", "--pollers", "2", "--pages", "1", "--sections", "2",
+        "--latency-ms", "5", "--jitter-ms", "0", "--poll-interval", "0.1", "--sample-interval", "0.2",
+        "--duration", "60", "--workdir", str(tmp_path / "work"), "--output", str(output),
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True, timeout=120)
+    assert completed.returncode == 0, completed.stderr[-2000:]
+
+    report = json.loads(output.read_text())
+    assert not report["timed_out"]
+    assert report["sessions"]["statuses"] == {"completed": 2}
+    assert {"p50_s", "p95_s"} <= report["sessions"].keys()
+    for route in ("POST /api/upload", "POST /api/process", "GET /api/progress"):
+        stats = report["routes"][route]
+        assert stats["errors"] == 0
+        assert {"p50_s", "p95_s", "p99_s", "max_s"} <= stats.keys()
+    assert report["fake_ai_server"]["requests"] > 0
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+
+from budget import BudgetExceededError, BudgetGovernor, BudgetLimits, SessionBudget
+from cancellation import CancelToken, ConversionCancelled
+from task_queue import TaskQueue
+
+
+def budget_with(**limits):
+    return SessionBudget(total_files=2, limits=BudgetLimits(**limits))
+
+
+def test_under_the_throttle_threshold_calls_go_straight_through():
+    governor = BudgetGovernor()
+    budget = budget_with(session_max_tokens=1000)
+    waits = []
+    governor.before_call(budget, wait=waits.append)
+    assert waits == [] and budget.state == "ok"
+
+
+def test_calls_are_throttled_near_a_ceiling():
+    governor = BudgetGovernor()
+    budget = budget_with(session_max_tokens=1000, throttle_at=0.5, throttle_delay=3)
+    governor.record(budget, 600, 0.1)
+    waits = []
+    governor.before_call(budget, wait=waits.append)
+    assert waits == [3] and budget.state == "throttled"
+
+
+def test_a_spent_session_ceiling_stops_without_pausing():
+    governor = BudgetGovernor(poll_interval=60)
+    budget = budget_with(session_max_tokens=100, pause_timeout=600)
+    governor.record(budget, 100, 0)
+    governor.count_sections(budget)
+    waits = []
+    with pytest.raises(BudgetExceededError):
+        governor.before_call(budget, wait=waits.append)
+    assert waits == [] and budget.state == "exceeded"
+
+
+def test_a_daily_pause_times_out_with_budget_exceeded():
+    governor = BudgetGovernor(poll_interval=0)
+    budget = budget_with(daily_max_tokens=100, pause_timeout=0)
+    governor.record(budget, 100, 0)
+    governor.count_sections(budget)
+    with pytest.raises(BudgetExceededError):
+        governor.before_call(budget, wait=lambda _seconds: None)
+    assert budget.state == "paused"
+
+
+def test_a_daily_pause_ends_when_spend_frees_up():
+    governor = BudgetGovernor(poll_interval=1)
+    budget = budget_with(daily_max_tokens=200)
+    governor.record(budget, 150, 0)
+    governor.count_sections(budget)
+    waits = []
+
+    def wait(seconds):
+        waits.append(seconds)
+        governor._daily["tokens"] = 0  # the ledger rolled over
+
+    governor.before_call(budget, wait=wait)
+    assert waits == [1] and budget.state == "ok"
+
+
+def test_cancel_ends_a_pause_right_away():
+    governor = BudgetGovernor(poll_interval=60)
+    budget = budget_with(daily_max_tokens=100, pause_timeout=600)
+    governor.record(budget, 100, 0)
+    governor.count_sections(budget)
+    session = CancelToken()
+    token = session.child()
+    threading.Timer(0.1, session.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(ConversionCancelled):
+        governor.before_call(budget, wait=lambda seconds: token.sleep(seconds, "budget pause"))
+    assert time.monotonic() - started < 5
+
+
+def test_spend_and_section_counts_are_not_lost_across_threads():
+    governor = BudgetGovernor()
+    budget = budget_with()
+
+    def work():
+        for _ in range(500):
+            governor.record(budget, 2, 0.5)
+            governor.count_sections(budget)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert budget.tokens == 8000 and budget.cost == 2000 and budget.sections_done == 4000
+    assert governor.daily()["tokens"] == 8000
+
+
+def test_projection_extrapolates_to_unseen_files():
+    governor = BudgetGovernor()
+    budget = budget_with()
+    governor.observe_file(budget, page_count=2, section_count=4)
+    governor.count_sections(budget, 4)
+    governor.record(budget, 400, 4.0)
+    assert budget.projection() == (800, 8.0)
+
+
+def test_daily_ledger_survives_a_restart(tmp_path):
+    ledger = str(tmp_path / "ledger.json")
+    BudgetGovernor(ledger_path=ledger).record(budget_with(), 50, 1.5)
+    assert BudgetGovernor(ledger_path=ledger).daily()["tokens"] == 50
+
+
+def test_governors_sharing_a_ledger_file_add_up(tmp_path):
+    ledger = str(tmp_path / "ledger.json")
+    governors = [BudgetGovernor(ledger_path=ledger) for _ in range(4)]
+
+    def work(governor):
+        for _ in range(50):
+            governor.record(budget_with(), 1, 0.5)
+
+    threads = [threading.Thread(target=work, args=(governor,)) for governor in governors]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert BudgetGovernor(ledger_path=ledger).daily()["tokens"] == 200
+    # Each one sees the spend of the others before its next call
+    assert governors[0].daily()["cost"] == 100
+
+
+def test_the_daily_ledger_lives_in_the_task_queue(tmp_path):
+    queue = TaskQueue(str(tmp_path / "queue.db"))
+    first, second = BudgetGovernor(queue=queue), BudgetGovernor(queue=queue)
+    first.record(budget_with(), 30, 0.25)
+    second.record(budget_with(), 20, 0.25)
+    assert first.daily()["tokens"] == 50 and second.daily()["cost"] == 0.5
+    assert queue.daily_spend(first.daily()["date"]) == (50, 0.5)
+
+    # A daily ceiling spent by another worker pauses this one too
+    budget = budget_with(daily_max_tokens=40, pause_timeout=0)
+    with pytest.raises(BudgetExceededError):
+        first.before_call(budget, wait=lambda _seconds: None)
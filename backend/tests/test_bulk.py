@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+import bulk
+from bulk import BulkSettings, BulkSubmissionError, resolve_sources
+
+
+def no_name_errors(_filename):
+    return None
+
+
+@pytest.fixture
+def volume(tmp_path):
+    root = tmp_path / "forms"
+    (root / "nightly").mkdir(parents=True)
+    for name in ("ABCD_1.pdf", "EFGH_2.pdf", "notes.txt"):
+        (root / "nightly" / name).write_bytes(b"%PDF-1.4")
+    outside = tmp_path / "private"
+    outside.mkdir()
+    (outside / "SECR_x.pdf").write_bytes(b"%PDF-1.4")
+    return root, outside
+
+
+def resolve(data, root, **settings):
+    return resolve_sources(data, BulkSettings([str(root)], **settings), no_name_errors)
+
+
+def test_a_directory_lists_its_pdfs(volume):
+    root, _outside = volume
+    sources = resolve({"directory": str(root / "nightly")}, root)
+    assert list(sources) == ["ABCD_1.pdf", "EFGH_2.pdf"]
+
+
+def test_a_relative_glob_resolves_against_the_directory(volume):
+    root, _outside = volume
+    sources = resolve({"directory": str(root), "glob": "**/EF*.pdf"}, root)
+    assert sources == {"EFGH_2.pdf": str(root / "nightly" / "EFGH_2.pdf")}
+
+
+@pytest.mark.parametrize("pattern", ["{outside}/*.pdf", "{root}/../private/*.pdf", "{root}/nightly/*/../../../private/*.pdf"])
+def test_a_glob_outside_the_roots_is_refused_before_listing(volume, monkeypatch, pattern):
+    root, outside = volume
+
+    def listed(*_args, **_kwargs):
+        raise AssertionError("globbed outside the allowed roots")
+
+    monkeypatch.setattr(bulk.glob, "glob", listed)
+    with pytest.raises(BulkSubmissionError) as raised:
+        resolve({"glob": pattern.format(root=root, outside=outside)}, root)
+    assert raised.value.status == 403
+    assert str(outside) not in str(raised.value) and str(root) not in str(raised.value)
+
+
+def test_a_symlink_out_of_a_root_is_refused(volume):
+    root, outside = volume
+    os.symlink(outside / "SECR_x.pdf", root / "nightly" / "LINK_x.pdf")
+    with pytest.raises(BulkSubmissionError) as raised:
+        resolve({"directory": str(root / "nightly")}, root)
+    assert raised.value.status == 403 and "SECR" not in str(raised.value)
+
+
+def test_manifest_paths_are_checked(volume):
+    root, outside = volume
+    with pytest.raises(BulkSubmissionError) as raised:
+        resolve({"files": [str(outside / "SECR_x.pdf")]}, root)
+    assert raised.value.status == 403
+    sources = resolve({"directory": str(root / "nightly"), "files": ["ABCD_1.pdf"]}, root)
+    assert list(sources) == ["ABCD_1.pdf"]
+
+
+def test_no_roots_disables_bulk_submission(volume):
+    root, _outside = volume
+    with pytest.raises(BulkSubmissionError) as raised:
+        resolve_sources({"directory": str(root)}, BulkSettings([]), no_name_errors)
+    assert raised.value.status == 403
+
+
+def test_max_files_caps_a_submission(volume):
+    root, _outside = volume
+    with pytest.raises(BulkSubmissionError, match="max_files"):
+        resolve({"directory": str(root / "nightly")}, root, max_files=1)
@@ -0,0 +1,147 @@
+import threading
+import time
+
+import pytest
+
+from cancellation import (
+    CANCELLED,
+    TIMED_OUT,
+    CancelToken,
+    ConversionCancelled,
+    SectionTimeoutError,
+    call_with_cancel,
+)
+from scheduler import INTERACTIVE, PriorityLimiter
+
+
+def test_a_file_token_stops_with_its_session():
+    session = CancelToken()
+    file_token = session.child(scope="file")
+    session.cancel()
+    with pytest.raises(ConversionCancelled) as raised:
+        file_token.check("step 5")
+    assert raised.value.reason == CANCELLED
+    assert str(raised.value) == "Session cancelled during step 5"
+
+
+def test_a_passed_deadline_times_out():
+    token = CancelToken().child(seconds=0.01, scope="file")
+    time.sleep(0.02)
+    with pytest.raises(ConversionCancelled) as raised:
+        token.check()
+    assert raised.value.reason == TIMED_OUT
+
+
+def test_sleep_wakes_up_on_a_parent_cancel():
+    session = CancelToken()
+    token = session.child()
+    threading.Timer(0.05, session.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(ConversionCancelled):
+        token.sleep(30, poll_interval=0.01)
+    assert time.monotonic() - started < 5
+
+
+def test_returns_the_result_and_releases_the_slot():
+    limiter = PriorityLimiter(capacity=1, reserved_interactive=0)
+    result = call_with_cancel(lambda: ("answer", 10, 0.1), CancelToken(), hold=limiter.slot(INTERACTIVE))
+    assert result == ("answer", 10, 0.1)
+    assert limiter.total_in_flight() == 0
+
+
+def test_an_abandoned_call_keeps_its_slot_and_is_booked_when_it_returns():
+    limiter = PriorityLimiter(capacity=1, reserved_interactive=0)
+    proceed = threading.Event()
+    booked = []
+
+    def hung_chat():
+        proceed.wait(10)
+        return "late answer", 250, 0.005
+
+    with pytest.raises(SectionTimeoutError):
+        call_with_cancel(
+            hung_chat, CancelToken(), timeout=0.05, poll_interval=0.01,
+            hold=limiter.slot(INTERACTIVE), on_abandoned=booked.append,
+        )
+    # The request is still running: it holds the only slot
+    assert limiter.total_in_flight() == 1 and booked == []
+    proceed.set()
+    deadline = time.monotonic() + 5
+    while (limiter.total_in_flight() or not booked) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert limiter.total_in_flight() == 0
+    assert booked == [("late answer", 250, 0.005)]
+
+
+def test_a_cancel_stops_the_wait_but_not_the_booking():
+    token = CancelToken()
+    proceed = threading.Event()
+    booked = []
+
+    def chat():
+        proceed.wait(10)
+        return "answer", 5, 0.01
+
+    threading.Timer(0.05, token.cancel).start()
+    with pytest.raises(ConversionCancelled):
+        call_with_cancel(chat, token, poll_interval=0.01, on_abandoned=booked.append)
+    proceed.set()
+    deadline = time.monotonic() + 5
+    while not booked and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert booked == [("answer", 5, 0.01)]
+
+
+def test_a_cancelled_token_never_takes_a_slot():
+    limiter = PriorityLimiter(capacity=1, reserved_interactive=0)
+    token = CancelToken()
+    token.cancel()
+    with pytest.raises(ConversionCancelled):
+        call_with_cancel(lambda: None, token, hold=limiter.slot(INTERACTIVE))
+    assert limiter.total_in_flight() == 0
+
+
+def test_a_slot_wait_stops_on_cancel():
+    limiter = PriorityLimiter(capacity=1, reserved_interactive=0)
+    limiter.acquire(INTERACTIVE)  # held by a hung call
+    token = CancelToken()
+    threading.Timer(0.05, token.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(ConversionCancelled):
+        call_with_cancel(lambda: None, token, hold=limiter.slot(INTERACTIVE, token), poll_interval=0.01)
+    assert time.monotonic() - started < 5
+    assert limiter.stats()["waiting"][INTERACTIVE] == 0 and limiter.total_in_flight() == 1
+
+
+def test_a_slot_wait_stops_at_the_section_deadline():
+    limiter = PriorityLimiter(capacity=1, reserved_interactive=0)
+    limiter.acquire(INTERACTIVE)
+    token = CancelToken()
+    with pytest.raises(SectionTimeoutError):
+        call_with_cancel(lambda: None, token, 0.05, hold=limiter.slot(INTERACTIVE, token, 0.05))
+
+
+def test_a_hung_call_gives_its_slot_back_after_the_grace_period():
+    limiter = PriorityLimiter(capacity=1, reserved_interactive=0)
+    proceed = threading.Event()
+    booked = []
+
+    def hung_chat():
+        proceed.wait(10)
+        return "late answer", 250, 0.005
+
+    token = CancelToken()
+    with pytest.raises(SectionTimeoutError):
+        call_with_cancel(
+            hung_chat, token, timeout=0.05, poll_interval=0.01,
+            hold=limiter.slot(INTERACTIVE, token), on_abandoned=booked.append, grace=0.1,
+        )
+    # The next call gets the slot once the grace period is over
+    assert call_with_cancel(lambda: "next", CancelToken(), hold=limiter.slot(INTERACTIVE, CancelToken(), 5)) == "next"
+    proceed.set()
+    deadline = time.monotonic() + 5
+    while not booked and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Booked without its slot, and the slot is not released twice
+    assert booked == [("late answer", 250, 0.005)]
+    assert limiter.total_in_flight() == 0
@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from checkpoints import FileCheckpoint
+
+
+@pytest.fixture
+def upload(tmp_path):
+    path = tmp_path / "ABCD_form.pdf"
+    path.write_bytes(b"%PDF-1.4 test")
+    return str(path)
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "checkpoints")
+
+
+def test_a_later_session_resumes_from_a_copy(root, upload):
+    first = FileCheckpoint(root, "ABCD_form.pdf", upload, "session-a")
+    first.mark_step(2, page_count=3)
+    first.record_response("section_1_content.png", {"content": "x"}, 10, 0.1)
+    first.release()
+
+    second = FileCheckpoint(root, "ABCD_form.pdf", upload, "session-b")
+    assert second.completed_step == 2
+    assert second.responses()["section_1_content.png"]["tokens"] == 10
+    assert second.directory != first.directory
+
+    second.clear()
+    # The adopted checkpoint is superseded once the file completes
+    assert not os.path.exists(first.directory)
+    assert not os.path.exists(second.directory)
+
+
+def test_finishing_first_does_not_clear_a_running_session(root, upload):
+    running = FileCheckpoint(root, "ABCD_form.pdf", upload, "session-a")
+    running.mark_step(1, page_count=3)
+
+    other = FileCheckpoint(root, "ABCD_form.pdf", upload, "session-b")
+    assert other.completed_step == 1
+    other.record_response("section_2_content.png", {}, 1, 0)
+    other.clear()
+
+    assert running.completed_step == 1
+    assert os.path.exists(running.state_path)
+    assert "section_2_content.png" not in running.responses()
+
+
+def test_a_different_upload_starts_fresh(root, upload, tmp_path):
+    FileCheckpoint(root, "ABCD_form.pdf", upload, "session-a").mark_step(3)
+    changed = tmp_path / "changed.pdf"
+    changed.write_bytes(b"%PDF-1.4 other")
+    assert FileCheckpoint(root, "ABCD_form.pdf", str(changed), "session-b").completed_step == -1
+
+
+def test_images_of_another_session_are_copied_into_this_shard(root, upload, tmp_path):
+    images = tmp_path / "shard-a" / "images" / "ABCD_form"
+    (images / "sections").mkdir(parents=True)
+    (images / "page_000.png").write_bytes(b"page")
+    (images / "sections" / "section_0_title.png").write_bytes(b"title")
+    first = FileCheckpoint(root, "ABCD_form.pdf", upload, "session-a")
+    first.mark_step(2, images_folder=str(images), page_count=1, sections_directory=str(images / "sections"))
+    first.release()
+
+    own_root = tmp_path / "shard-b" / "images"
+    own_root.mkdir(parents=True)
+    second = FileCheckpoint(root, "ABCD_form.pdf", upload, "session-b")
+    copied = second.adopt_images(str(own_root))
+
+    assert copied == str(own_root / "ABCD_form")
+    assert second.state["sections_directory"] == str(own_root / "ABCD_form" / "sections")
+    assert os.path.isfile(os.path.join(copied, "sections", "section_0_title.png"))
+    # Removing the first session's shard leaves this session's copy intact
+    assert os.path.isfile(images / "page_000.png")
+
+
+def test_missing_images_are_rendered_again(root, upload):
+    checkpoint = FileCheckpoint(root, "ABCD_form.pdf", upload, "session-a")
+    checkpoint.mark_step(1, images_folder="/nonexistent/ABCD_form", page_count=3)
+    assert checkpoint.adopt_images("/tmp") is None
@@ -0,0 +1,65 @@
+from concurrency import AdaptiveLimit
+from endpoints import THROTTLED, UNAVAILABLE
+
+
+def limit(**settings):
+    changes = []
+    adaptive = AdaptiveLimit(on_change=changes.append, **settings)
+    return adaptive, changes
+
+
+def run_round(adaptive, latency):
+    for _ in range(adaptive.limit):
+        adaptive.observe(latency, "ok")
+
+
+def test_flat_latency_with_busy_slots_grows_by_one_per_round():
+    adaptive, changes = limit(initial=4)
+    run_round(adaptive, 0.5)
+    run_round(adaptive, 0.5)
+    assert changes == [5, 6]
+    assert adaptive.stats()["baseline_latency_s"] == 0.5
+
+
+def test_idle_slots_do_not_grow_the_limit():
+    adaptive, changes = limit(initial=4, in_flight=lambda: 1)
+    run_round(adaptive, 0.5)
+    assert changes == [] and adaptive.limit == 4
+
+
+def test_rising_latency_backs_off():
+    adaptive, changes = limit(initial=8, backoff=0.75)
+    run_round(adaptive, 0.5)
+    run_round(adaptive, 2.0)
+    assert changes == [9, 6]
+    assert adaptive.stats()["recent_latency_s"] == 2.0
+
+
+def test_a_burst_of_429s_is_one_cut():
+    adaptive, changes = limit(initial=16, throttle_backoff=0.5)
+    run_round(adaptive, 10.0)  # baseline of 10s: one cut per 10s at most
+    changes.clear()
+    for _ in range(5):
+        adaptive.observe(0.1, THROTTLED)
+    assert changes == [8]
+    adaptive.observe(0.1, UNAVAILABLE)
+    assert changes == [8]
+
+
+def test_the_limit_stays_within_bounds():
+    adaptive, changes = limit(initial=3, min_limit=2, max_limit=4)
+    for _ in range(5):
+        run_round(adaptive, 0.5)
+    assert adaptive.limit == 4
+    adaptive._last_cut = -1e9
+    adaptive.observe(0.1, THROTTLED)
+    adaptive._last_cut = -1e9
+    adaptive.observe(0.1, THROTTLED)
+    assert adaptive.limit == 2 and changes[-1] == 2
+
+
+def test_errors_are_not_latency_samples():
+    adaptive, changes = limit(initial=2)
+    for _ in range(10):
+        adaptive.observe(30.0, "error")
+    assert changes == [] and adaptive.stats()["recent_latency_s"] is None
@@ -0,0 +1,67 @@
+import configparser
+
+from config_service import ConfigService, set_option
+
+CONFIG = """# Form conversion settings
+[packager]
+# sandbox or dev
+mode = sandbox
+
+[dedup]
+# Share responses across files
+enabled = false
+"""
+
+
+def parse(text):
+    parser = configparser.ConfigParser()
+    parser.read_string(text)
+    return parser
+
+
+def test_set_option_only_touches_the_changed_line():
+    updated = set_option(CONFIG, "packager", "mode", "dev")
+    assert updated == CONFIG.replace("mode = sandbox", "mode = dev")
+
+
+def test_set_option_adds_missing_options_and_sections():
+    added = set_option(CONFIG, "dedup", "fuzzy", "true")
+    assert "# Share responses across files\nenabled = false\nfuzzy = true\n" in added
+    appended = set_option(CONFIG, "server", "port", "8080")
+    assert appended.startswith(CONFIG) and parse(appended).get("server", "port") == "8080"
+    assert parse(set_option("", "packager", "mode", "dev")).get("packager", "mode") == "dev"
+
+
+def test_new_option_goes_before_the_next_sections_comments():
+    text = "[packager]\nmode = dev\n\n# Dedup\n[dedup]\nenabled = false\n"
+    updated = set_option(text, "packager", "extra", "1")
+    assert updated == "[packager]\nmode = dev\nextra = 1\n\n# Dedup\n[dedup]\nenabled = false\n"
+
+
+def test_save_keeps_comments_and_reloads(tmp_path):
+    config_path = tmp_path / ".config"
+    config_path.write_text(CONFIG)
+    service = ConfigService(str(config_path), str(tmp_path / "secrets.json"))
+    assert service.snapshot().packager_mode == "sandbox"
+
+    snapshot = service.save("dev", {"T_NUMBER": "t1"})
+    assert snapshot.packager_mode == "dev" and snapshot.secrets["T_NUMBER"] == "t1"
+    text = config_path.read_text()
+    assert "# sandbox or dev" in text and "# Share responses across files" in text
+
+
+def test_snapshot_is_cached_until_the_file_changes(tmp_path):
+    config_path = tmp_path / ".config"
+    config_path.write_text(CONFIG)
+    service = ConfigService(str(config_path), str(tmp_path / "secrets.json"))
+    first = service.snapshot()
+    assert service.snapshot() is first
+    config_path.write_text(CONFIG.replace("enabled = false", "enabled = true  "))
+    assert service.snapshot().getboolean("dedup", "enabled") is True
+
+
+def test_invalid_values_fall_back(tmp_path):
+    config_path = tmp_path / ".config"
+    config_path.write_text("[budget]\nthrottle_at = lots\n")
+    snapshot = ConfigService(str(config_path), str(tmp_path / "secrets.json")).snapshot()
+    assert snapshot.getfloat("budget", "throttle_at", fallback=0.8) == 0.8
@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+import dedup
+from dedup import SectionDeduplicator
+
+
+@pytest.fixture
+def crops(tmp_path):
+    def write(name, data):
+        path = tmp_path / name
+        path.write_bytes(data)
+        return str(path)
+
+    return write
+
+
+@pytest.fixture(autouse=True)
+def bytes_only(monkeypatch):
+    # Hash raw bytes whether or not Pillow is installed
+    monkeypatch.setattr(dedup, "Image", None)
+
+
+def counting_call():
+    calls = []
+
+    def call(section_type, section_path):
+        calls.append(section_path)
+        return {"path": section_path}, 10, 0.5
+
+    return call, calls
+
+
+def test_identical_section_of_another_file_reuses_the_response(crops):
+    first = crops("a.png", b"same pixels")
+    second = crops("b.png", b"same pixels")
+    deduper = SectionDeduplicator()
+    call, calls = counting_call()
+
+    assert deduper.get_or_call("section", first, call, owner="a.pdf") == ({"path": first}, 10, 0.5, False)
+    assert deduper.get_or_call("section", second, call, owner="b.pdf") == ({"path": first}, 0, 0, True)
+    assert calls == [first]
+    assert deduper.stats() == {"ai_calls": 1, "reused_sections": 1, "groups": 1}
+
+
+def test_repeats_within_one_file_are_sent_again(crops):
+    first = crops("a.png", b"same pixels")
+    second = crops("b.png", b"same pixels")
+    deduper = SectionDeduplicator()
+    call, calls = counting_call()
+
+    deduper.get_or_call("section", first, call, owner="a.pdf")
+    assert deduper.get_or_call("section", second, call, owner="a.pdf")[3] is False
+    assert calls == [first, second]
+    assert deduper.stats()["reused_sections"] == 0
+
+
+def test_empty_crops_are_never_shared(crops):
+    deduper = SectionDeduplicator()
+    call, calls = counting_call()
+    for index in range(3):
+        path = crops(f"{index}.png", b"")
+        assert deduper.get_or_call("section", path, call, owner=f"{index}.pdf")[3] is False
+    assert len(calls) == 3
+    assert deduper.stats() == {"ai_calls": 3, "reused_sections": 0, "groups": 0}
+
+
+def test_different_section_types_do_not_match(crops):
+    deduper = SectionDeduplicator()
+    call, calls = counting_call()
+    deduper.get_or_call("section", crops("a.png", b"x"), call, owner="a.pdf")
+    deduper.get_or_call("title", crops("b.png", b"x"), call, owner="b.pdf")
+    assert len(calls) == 2
+
+
+def test_member_asks_itself_when_the_representative_fails(crops):
+    first = crops("a.png", b"same")
+    second = crops("b.png", b"same")
+    deduper = SectionDeduplicator()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing(section_type, section_path):
+        started.set()
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    errors = []
+
+    def representative():
+        try:
+            deduper.get_or_call("section", first, failing, owner="a.pdf")
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=representative)
+    thread.start()
+    started.wait(5)
+    results = []
+    member = threading.Thread(
+        target=lambda: results.append(deduper.get_or_call("section", second, counting_call()[0], owner="b.pdf"))
+    )
+    member.start()
+    release.set()
+    thread.join(5)
+    member.join(5)
+
+    assert len(errors) == 1
+    assert results == [({"path": second}, 10, 0.5, False)]
+
+
+def test_undecodable_crops_are_never_shared_with_pillow(crops, monkeypatch):
+    image = pytest.importorskip("PIL.Image")
+    monkeypatch.setattr(dedup, "Image", image)
+    deduper = SectionDeduplicator()
+    call, calls = counting_call()
+    deduper.get_or_call("section", crops("a.png", b"not an image"), call, owner="a.pdf")
+    deduper.get_or_call("section", crops("b.png", b"not an image"), call, owner="b.pdf")
+    assert len(calls) == 2
@@ -0,0 +1,132 @@
+import time
+
+import pytest
+
+from endpoints import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    THROTTLED,
+    UNAVAILABLE,
+    AIEndpoint,
+    EndpointPool,
+    classify_error,
+    endpoint_specs,
+)
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def pool_of(*names, **settings):
+    pool = EndpointPool(**settings)
+    pool.endpoints = [AIEndpoint(name) for name in names]
+    return pool
+
+
+def by_name(pool, name):
+    return next(endpoint for endpoint in pool.endpoints if endpoint.name == name)
+
+
+def test_errors_worth_another_endpoint():
+    assert classify_error(HTTPError(429)) == THROTTLED
+    assert classify_error(HTTPError(503)) == UNAVAILABLE
+    assert classify_error(ConnectionError()) == UNAVAILABLE
+    assert classify_error(HTTPError(400)) is None
+    assert classify_error(ValueError("bad section")) is None
+
+
+def test_a_5xx_fails_over_to_the_next_endpoint():
+    pool = pool_of("a", "b")
+    used = []
+
+    def chat(endpoint):
+        used.append(endpoint.name)
+        if endpoint.name == used[0] and len(used) == 1:
+            raise HTTPError(503)
+        return "answer", 10, 0.1
+
+    assert pool.call(chat) == ("answer", 10, 0.1)
+    assert len(used) == 2 and used[0] != used[1]
+    assert all(endpoint.in_flight == 0 for endpoint in pool.endpoints)
+
+
+def test_request_errors_are_not_retried_elsewhere():
+    pool = pool_of("a", "b")
+    used = []
+
+    def chat(endpoint):
+        used.append(endpoint.name)
+        raise ValueError("bad section")
+
+    with pytest.raises(ValueError):
+        pool.call(chat)
+    assert len(used) == 1
+
+
+def test_repeated_failures_open_the_circuit_until_a_trial_succeeds():
+    pool = pool_of("a", "b", failure_threshold=2, cooldown_seconds=0.05, max_failover=0)
+    a = by_name(pool, "a")
+    for _ in range(2):
+        endpoint = pool.acquire(exclude=[by_name(pool, "b")])
+        pool.release(endpoint, 0.1, error=HTTPError(502))
+    assert a.state == OPEN
+    # While open, every call goes to b
+    assert {pool.call(lambda endpoint: (endpoint.name, 1, 0))[0] for _ in range(5)} == {"b"}
+
+    time.sleep(0.06)
+    trial = pool.acquire(exclude=[by_name(pool, "b")])
+    assert trial is a and a.state == HALF_OPEN
+    # Only one trial call at a time, the rest still go to b
+    other = pool.acquire()
+    assert other.name == "b"
+    pool.release(other, 0.1)
+    pool.release(a, 0.1)
+    assert a.state == CLOSED and a.failures == 0
+
+
+def test_a_429_opens_the_circuit_for_retry_after():
+    pool = pool_of("a", cooldown_seconds=1)
+    endpoint = pool.acquire()
+    before = time.monotonic()
+    pool.release(endpoint, 0.1, error=HTTPError(429, {"Retry-After": "30"}))
+    assert endpoint.state == OPEN and endpoint.throttled == 1
+    assert endpoint.open_until - before == pytest.approx(30, abs=1)
+    # Every circuit open: the call still goes out rather than failing
+    assert pool.acquire() is endpoint
+
+
+def test_faster_and_heavier_endpoints_get_the_calls():
+    pool = pool_of("slow", "fast")
+    by_name(pool, "slow").latency = 2.0
+    by_name(pool, "fast").latency = 0.5
+    assert pool.acquire().name == "fast"
+    heavy = pool_of("light", "heavy")
+    by_name(heavy, "heavy").weight = 4
+    assert heavy.acquire().name == "heavy"
+
+
+def test_listeners_hear_every_attempt():
+    pool = pool_of("a", "b")
+    heard = []
+    pool.listeners.append(lambda duration, outcome: heard.append(outcome))
+    calls = iter([HTTPError(429), None])
+
+    def chat(endpoint):
+        error = next(calls)
+        if error:
+            raise error
+        return "answer", 1, 0
+
+    pool.call(chat)
+    assert heard == [THROTTLED, "ok"]
+
+
+def test_secrets_without_endpoints_use_the_single_deployment():
+    specs = endpoint_specs({"AZURE_OPENAI_ENDPOINT": "https://x", "MODEL_NAME": "m"})
+    assert [(spec["name"], spec["endpoint"]) for spec in specs] == [("default", "https://x")]
+    assert len(endpoint_specs({"AI_ENDPOINTS": [{"name": "a"}, {"name": "b"}]})) == 2
@@ -0,0 +1,61 @@
+import threading
+
+from memory import MemoryLimits, PageBudget, RssMonitor
+
+
+def test_slot_is_charged_the_real_bitmap_size():
+    budget = PageBudget(max_pages=4, max_bytes=100)
+    with budget.slot(50) as charge:
+        assert budget.stats()["bytes_in_flight"] == 50
+        charge(10)
+        assert budget.stats()["bytes_in_flight"] == 10
+    assert budget.stats()["bytes_in_flight"] == 0 and budget.stats()["pages_in_flight"] == 0
+
+
+def test_pages_wait_for_room_by_count_and_bytes():
+    budget = PageBudget(max_pages=2, max_bytes=100)
+    budget.acquire(60)
+    admitted = threading.Event()
+
+    def second():
+        with budget.slot(60):
+            admitted.set()
+
+    thread = threading.Thread(target=second)
+    thread.start()
+    assert not admitted.wait(0.1)  # 120 bytes would not fit
+    budget.release(60)
+    assert admitted.wait(5)
+    thread.join()
+
+
+def test_a_page_larger_than_the_budget_runs_alone():
+    budget = PageBudget(max_pages=2, max_bytes=10)
+    with budget.slot(1000):
+        assert budget.stats()["pages_in_flight"] == 1
+
+
+def test_shrinking_a_charge_lets_waiting_pages_in():
+    budget = PageBudget(max_pages=4, max_bytes=100)
+    admitted = threading.Event()
+
+    def second():
+        with budget.slot(50):
+            admitted.set()
+
+    with budget.slot(90) as charge:
+        thread = threading.Thread(target=second)
+        thread.start()
+        assert not admitted.wait(0.1)
+        charge(20)
+        assert admitted.wait(5)
+        thread.join()
+
+
+def test_limits_and_rss_monitor():
+    limits = MemoryLimits(max_pages_in_flight=0, max_bitmap_mb=1, page_bitmap_mb=0.5)
+    assert limits.max_pages_in_flight == 1
+    assert limits.page_bitmap_bytes == 512 * 1024
+    with RssMonitor(interval=0.01) as rss:
+        pass
+    assert rss.peak_mb > 0
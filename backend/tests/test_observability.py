@@ -0,0 +1,50 @@
+import logging
+
+from observability import add_span_hook, configure_logging, configure_tracing, span
+
+
+def test_unknown_log_level_falls_back_to_info():
+    logger = configure_logging(level="LOUD")
+    assert logger.level == logging.INFO
+    configure_logging(level="debug")
+    assert logger.level == logging.DEBUG
+    configure_logging()
+
+
+def test_failed_stage_span_is_ended_with_its_error(backend, tmp_path, monkeypatch):
+    ended = []
+    add_span_hook(ended.append)
+    configure_tracing(True)
+    try:
+        def boom(*_args, **_kwargs):
+            raise RuntimeError("render failed")
+
+        monkeypatch.setattr(backend, "pdf_to_images", boom)
+        upload = tmp_path / "ABCD_form.pdf"
+        upload.write_bytes(b"%PDF-1.4")
+        session = backend.ConversionSession("span-test", ["ABCD_form.pdf"], "single")
+        session.text_layer = False
+        session.use_checkpoints = False
+        result = backend.process_single_file(session, "ABCD_form.pdf", str(upload), "sandbox", "t1")
+    finally:
+        configure_tracing(False)
+
+    assert result["status"] == "error"
+    steps = [s for s in ended if s.name == "pipeline.step"]
+    assert steps[-1].attributes["step"] == session.steps[1]
+    assert isinstance(steps[-1].error, RuntimeError)
+
+
+def test_span_context_records_errors():
+    ended = []
+    add_span_hook(ended.append)
+    configure_tracing(True)
+    try:
+        try:
+            with span("unit"):
+                raise ValueError("x")
+        except ValueError:
+            pass
+    finally:
+        configure_tracing(False)
+    assert isinstance(ended[-1].error, ValueError) and ended[-1].duration is not None
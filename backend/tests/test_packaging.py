@@ -0,0 +1,49 @@
+import zipfile
+
+import pytest
+
+from utils import copy_and_rename_zip_file, move_folder_to_zip, sandbox_packager
+
+
+def test_package_keeps_the_template_and_adds_the_content(tmp_path):
+    packages = str(tmp_path)
+    copy_and_rename_zip_file("blank_zipped_file.zip", packages, "ABCD_SANDBOX")
+    package_dir = sandbox_packager("ABCD", "2026-01-01", packages, content_xml="<jcr:root/>")
+    move_folder_to_zip(package_dir, str(tmp_path / "ABCD_SANDBOX.zip"))
+
+    with zipfile.ZipFile(tmp_path / "ABCD_SANDBOX.zip") as zf:
+        names = zf.namelist()
+    assert "ABCD_SANDBOX/README.txt" in names
+    assert any(name.endswith(".content.xml") for name in names)
+
+
+def run_file(backend, tmp_path, monkeypatch, page_parallel):
+    prefetched = []
+    real_prefetch = backend.prefetch_title
+
+    def recording_prefetch(session, filename, title_path, form_code, packager_mode):
+        prefetched.append(title_path)
+        return real_prefetch(session, filename, title_path, form_code, packager_mode)
+
+    monkeypatch.setattr(backend, "prefetch_title", recording_prefetch)
+    upload = tmp_path / "ABCD_form.pdf"
+    upload.write_bytes(b"%PDF-1.4")
+    session = backend.ConversionSession(f"prefetch-{page_parallel}", ["ABCD_form.pdf"], "single")
+    session.page_parallel = page_parallel
+    session.use_checkpoints = False
+    result = backend.process_single_file(session, "ABCD_form.pdf", str(upload), "sandbox", "t1")
+    return session, result, prefetched
+
+
+@pytest.mark.parametrize("page_parallel", [False, True])
+def test_title_is_prefetched_and_the_package_is_complete(backend, tmp_path, monkeypatch, page_parallel):
+    session, result, prefetched = run_file(backend, tmp_path, monkeypatch, page_parallel)
+
+    assert result["status"] == "completed"
+    assert len(prefetched) == 1 and "section_0_title" in prefetched[0]
+    sources = {item["section"]: item["source"] for item in result["section_sources"]}
+    assert all(source == "ai" for source in sources.values())
+    with zipfile.ZipFile(f"{session.storage.packages}/ABCD_SANDBOX.zip") as zf:
+        names = zf.namelist()
+    assert "ABCD_SANDBOX/README.txt" in names
+    assert any(name.endswith(".content.xml") for name in names)
@@ -0,0 +1,78 @@
+import json
+import os
+import threading
+import time
+
+from memory import MemoryLimits
+
+PAGES = 3
+
+
+def fake_render(filepath, images_folder, page_number, bitmap=None):
+    os.makedirs(images_folder, exist_ok=True)
+    path = os.path.join(images_folder, f"page_{page_number:03d}.png")
+    open(path, "wb").close()
+    return path
+
+
+def fake_segment(image_path, sections_dir, page_number):
+    os.makedirs(sections_dir, exist_ok=True)
+    names = [f"page_{page_number:03d}_section_1_body.png"]
+    if page_number == 0:
+        names.insert(0, "page_000_section_0_title.png")
+    for name in names:
+        open(os.path.join(sections_dir, name), "wb").close()
+    return names
+
+
+def fake_chat(section_type, section_path, endpoint=None):
+    page = int(os.path.basename(section_path)[5:8])
+    # Later pages answer first
+    time.sleep(0.05 * (PAGES - page))
+    if section_type == "title":
+        return {"form_title": "Permit"}, 5, 0.5
+    return {"section_id": f"page_{page + 1}", "content": "", "fields": []}, 10 * (page + 1), 0.25 * (page + 1)
+
+
+def test_pages_are_merged_in_order_and_rolled_up(backend, tmp_path, monkeypatch):
+    monkeypatch.setattr(backend, "pdf_page_count", lambda _path: PAGES)
+    monkeypatch.setattr(backend, "render_pdf_page", fake_render)
+    monkeypatch.setattr(backend, "segment_page_image", fake_segment)
+    monkeypatch.setattr(backend, "chat", fake_chat)
+    upload = tmp_path / "ABCD_form.pdf"
+    upload.write_bytes(b"%PDF-1.4")
+    session = backend.ConversionSession("pages", ["ABCD_form.pdf"], "single")
+    session.page_parallel = True
+    session.use_checkpoints = False
+
+    result = backend.process_single_file(session, "ABCD_form.pdf", str(upload), "sandbox", "t1")
+
+    assert result["status"] == "completed"
+    with open(os.path.join(session.storage.json, result["json_file"])) as f:
+        form_json = json.load(f)
+    assert form_json["form_title"] == "Permit"
+    assert [section["section_id"] for section in form_json["sections"]] == ["page_1", "page_2", "page_3"]
+    assert [(page["page"], page["total_tokens"]) for page in result["pages"]] == [(1, 15), (2, 20), (3, 30)]
+    assert result["total_tokens"] == 65 and result["total_cost"] == 2.0
+    assert (session.budget.tokens, session.budget.cost, session.budget.sections_done) == (65, 2.0, 4)
+
+
+def test_pages_in_flight_stay_within_the_window(backend, monkeypatch):
+    monkeypatch.setattr(backend, "memory_limits", MemoryLimits(enabled=True, max_pages_in_flight=2))
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def fake_process_page(session, filename, filepath, images_folder, page_number, answer, pruner, on_segmented):
+        with lock:
+            running.append(page_number)
+            peak.append(len(running))
+        time.sleep(0.02 * (6 - page_number))
+        with lock:
+            running.remove(page_number)
+        return [(page_number, 0, f"page_{page_number:03d}_section_1_body.png", (None, 0, 0, "ai"))]
+
+    monkeypatch.setattr(backend, "process_page", fake_process_page)
+    answers = backend.process_pages(None, "ABCD_form.pdf", "ABCD_form.pdf", "images", 6, answer=None)
+    assert [page for page, _index, _section, _answer in answers] == list(range(6))
+    assert max(peak) == 2
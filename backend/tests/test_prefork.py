@@ -0,0 +1,65 @@
+import threading
+
+from conftest import wait_for
+from prefork import Recycler, WorkerPool
+
+
+def sweeper_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "retention-sweeper"]
+
+
+def test_a_process_is_due_after_max_tasks():
+    recycler = Recycler(max_tasks=2)
+    recycler.task_done()
+    assert not recycler.due
+    recycler.task_done()
+    assert recycler.due and recycler.reason == "2 tasks"
+
+
+def test_no_limits_never_recycle():
+    recycler = Recycler()
+    for _ in range(100):
+        recycler.task_done()
+    assert not recycler.due
+
+
+def test_rss_limit(monkeypatch):
+    monkeypatch.setattr("prefork.current_rss_bytes", lambda: 300 * 1024 * 1024)
+    recycler = Recycler(max_rss_mb=256)
+    recycler.task_done()
+    assert recycler.reason == "RSS over 256 MB"
+
+
+def test_importing_the_app_starts_no_background_threads(backend):
+    # worker.py forks the imported backend, which is only safe with no threads running
+    assert sweeper_threads() == []
+    backend.start_background()
+    backend.start_background()
+    assert len(sweeper_threads()) == 1
+
+
+def test_forked_workers_reuse_what_the_parent_preloaded(backend, tmp_path, monkeypatch):
+    template = tmp_path / "blank_zipped_file.zip"
+    template.write_bytes(b"PK template")
+    monkeypatch.setattr(backend, "resource_path", lambda _name: str(template))
+    monkeypatch.setattr(backend, "_package_template", None)
+    report = tmp_path / "child"
+
+    def child_main(_slot, _recycler):
+        # The file is gone by now, only the parent's copy can answer
+        report.write_bytes(backend.package_template() or b"reloaded")
+
+    def preload():
+        backend.preload()
+        template.unlink()
+
+    pool = WorkerPool(1, child_main, preload=preload)
+    runner = threading.Thread(target=pool.run)
+    runner.start()
+    try:
+        wait_for(report.exists)
+    finally:
+        pool.stop()
+        runner.join(10)
+    assert report.read_bytes() == b"PK template"
+    assert not runner.is_alive()
@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+ImageDraw = pytest.importorskip("PIL.ImageDraw")
+
+from pruning import BLANK, BLANK_PAGE, DUPLICATE_PAGE, PagePruner, PruneSettings  # noqa: E402
+
+
+def form_page(path, lines=10, size=(850, 1100)):
+    img = Image.new("L", size, 240)
+    draw = ImageDraw.Draw(img)
+    for line in range(lines):
+        draw.text((40, 30 + 40 * line), f"Field {line}: value value value", fill=20)
+    img.save(path)
+    return str(path)
+
+
+def blank_page(path, size=(850, 1100)):
+    Image.new("L", size, 240).save(path)
+    return str(path)
+
+
+@pytest.fixture
+def pruner():
+    return PagePruner(PruneSettings(enabled=True))
+
+
+def test_pruning_is_off_by_default():
+    assert not PruneSettings().enabled
+
+
+def test_blank_crop_and_blank_page(pruner, tmp_path):
+    assert pruner.section("s1", blank_page(tmp_path / "crop.png", (850, 60))) == BLANK
+    assert pruner.details("s1")["reason"] == BLANK
+    assert pruner.section("s2", form_page(tmp_path / "text.png", 1, (850, 60))) is None
+    assert pruner.page(0, blank_page(tmp_path / "page.png")) == BLANK_PAGE
+
+
+def test_a_repeated_page_is_a_duplicate_but_a_changed_one_is_not(pruner, tmp_path):
+    assert pruner.page(0, form_page(tmp_path / "a.png")) is None
+    assert pruner.page(1, form_page(tmp_path / "b.png", lines=11)) is None
+    assert pruner.page(2, form_page(tmp_path / "c.png")) == DUPLICATE_PAGE
+    pruner.page_sections(2, ["page_002_section_0_content.png"])
+    assert pruner.details("page_002_section_0_content.png")["duplicate_of"] == 1
+
+
+def test_identical_pages_checked_at_once_keep_exactly_one(pruner, tmp_path):
+    paths = [form_page(tmp_path / f"page_{number}.png") for number in range(6)]
+    verdicts = {}
+    start = threading.Barrier(len(paths))
+
+    def check(number):
+        start.wait()
+        verdicts[number] = pruner.page(number, paths[number])
+
+    threads = [threading.Thread(target=check, args=(number,)) for number in range(len(paths))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(verdicts.values(), key=str) == [None] + [DUPLICATE_PAGE] * 5
+
+
+def test_pages_of_a_whole_file_are_checked_too(backend, pruner, tmp_path):
+    session = backend.ConversionSession("prune-serial", ["ABCD_form.pdf"], "batch")
+    images = tmp_path / "images"
+    images.mkdir()
+    form_page(images / "page_000.png")
+    blank_page(images / "page_001.png")
+    form_page(images / "page_002.png")
+    sections = [
+        "page_000_section_0_title.png",
+        "page_000_section_1_content.png",
+        "page_001_section_0_content.png",
+        "page_002_section_0_content.png",
+        "page_002_section_1_content.png",
+    ]
+    skipped = backend.prune_rendered_pages(session, pruner, str(images), sections)
+    assert skipped == {
+        "page_001_section_0_content.png": BLANK_PAGE,
+        "page_002_section_0_content.png": DUPLICATE_PAGE,
+        "page_002_section_1_content.png": DUPLICATE_PAGE,
+    }
+    assert session.budget.sections_done == 3
+    # Sections that do not name their page leave every page alone
+    assert backend.prune_rendered_pages(session, pruner, str(images), ["section_1_content.png"]) == {}
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from records import (
+    FieldRecord,
+    ResponseValidationError,
+    dumps_form_json,
+    parse_section_response,
+    parse_title_headers,
+    parse_title_response,
+)
+
+
+def test_field_keeps_label_and_type_when_empty():
+    record = FieldRecord.from_response({"name": " dob "})
+    assert record.to_dict() == {"label": "", "type": "", "name": "dob"}
+
+
+def test_section_round_trip_strips_strings():
+    section = parse_section_response(
+        {"section_id": " s1 ", "content": " text ", "fields": [{"label": " Name ", "type": "text"}], "page": 2}
+    )
+    assert section.to_dict() == {
+        "section_id": "s1",
+        "content": "text",
+        "fields": [{"label": "Name", "type": "text"}],
+        "page": 2,
+    }
+
+
+@pytest.mark.parametrize(
+    "response",
+    ["not a dict", {"section_id": 1}, {"fields": "x"}, {"fields": [{"label": 3}]}],
+)
+def test_invalid_section_is_rejected(response):
+    with pytest.raises(ResponseValidationError):
+        parse_section_response(response)
+
+
+def test_title_accepts_legacy_list_form():
+    response = [{"form_title": " Form A "}, {"label": " Ref ", "type": "text"}]
+    assert parse_title_response(response) == "Form A"
+    # The header fields after the title are kept, not dropped
+    assert parse_title_headers(response) == [{"label": "Ref", "type": "text"}]
+    assert parse_title_headers({"form_title": "Form A"}) == []
+    with pytest.raises(ResponseValidationError):
+        parse_title_response([])
+    with pytest.raises(ResponseValidationError):
+        parse_title_headers([{"form_title": "A"}, "x"])
+
+
+def test_nested_fields_are_cleaned_once(monkeypatch):
+    import records
+
+    calls = []
+    real_clean = records._clean
+
+    def counting_clean(value):
+        calls.append(value)
+        return real_clean(value)
+
+    monkeypatch.setattr(records, "_clean", counting_clean)
+    parse_section_response({"section_id": "s1", "fields": [{"label": " a "}, {"label": " b "}]})
+    # Each field is walked once, as part of its section
+    assert len([value for value in calls if isinstance(value, dict) and "label" in value]) == 2
+
+
+def test_compact_and_pretty_json_hold_the_same_data():
+    form_json = {"form_title": "T", "sections": [parse_section_response({"fields": [{}]})]}
+    compact = dumps_form_json(form_json)
+    pretty = dumps_form_json(form_json, pretty=True)
+    assert b"\n" not in compact
+    assert json.loads(compact) == json.loads(pretty)
+    assert json.loads(compact)["sections"][0]["fields"] == [{"label": "", "type": ""}]
+
+
+def test_pretty_json_has_the_same_indent_without_orjson(monkeypatch):
+    import records
+
+    form_json = {"form_title": "T", "sections": [parse_section_response({"fields": [{}]})]}
+    with_orjson = dumps_form_json(form_json, pretty=True)
+    monkeypatch.setattr(records, "orjson", None)
+    without = dumps_form_json(form_json, pretty=True)
+    for pretty in (with_orjson, without):
+        assert b'\n  "form_title"' in pretty and b'\n    "form_title"' not in pretty
@@ -0,0 +1,93 @@
+import io
+import json
+import os
+
+import pytest
+
+import dedup
+from conftest import wait_for
+from revisions import RevisionTracker, latest_index, latest_pointer_path, set_latest_index
+
+
+@pytest.fixture(autouse=True)
+def bytes_only(monkeypatch):
+    # Hash raw bytes whether or not Pillow is installed
+    monkeypatch.setattr(dedup, "Image", None)
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def test_latest_index_follows_the_pointer(tmp_path):
+    assert latest_index(str(tmp_path), "ABCD") is None
+    index = tmp_path / "2026-01-01" / "s1" / "json_outputs" / "ABCD_revision_index.json"
+    index.parent.mkdir(parents=True)
+    index.write_text(json.dumps({"sections": []}))
+    set_latest_index(str(tmp_path), "ABCD", str(index))
+    assert latest_index(str(tmp_path), "ABCD") == str(index)
+    assert latest_index(str(tmp_path), "EFGH") is None
+    # A swept shard leaves the pointer dangling
+    index.unlink()
+    assert latest_index(str(tmp_path), "ABCD") is None
+
+
+def test_an_unreadable_pointer_is_no_previous_revision(tmp_path):
+    pointer = latest_pointer_path(str(tmp_path), "ABCD")
+    os.makedirs(os.path.dirname(pointer))
+    with open(pointer, "w") as f:
+        f.write("{")
+    assert latest_index(str(tmp_path), "ABCD") is None
+
+
+def test_unchanged_sections_match_the_previous_revision(tmp_path):
+    old = write(tmp_path / "old.png", b"same crop")
+    first = RevisionTracker()
+    first.record("section_1.png", "section", old, {"content": "answer"})
+    index = str(tmp_path / "index.json")
+    first.write(index)
+
+    second = RevisionTracker(index)
+    same = write(tmp_path / "same.png", b"same crop")
+    changed = write(tmp_path / "changed.png", b"other crop")
+    assert second.match("section_1.png", "section", same)["response"] == {"content": "answer"}
+    assert second.match("section_2.png", "section", changed) is None
+    assert second.match("section_3.png", "title", same) is None
+    assert second.reused == ["section_1.png"]
+
+
+def convert(client, name, **form):
+    response = client.post(
+        "/api/upload",
+        data={"mode": "single", "files": [(io.BytesIO(b"%PDF-1.4"), name)], **form},
+        content_type="multipart/form-data",
+    )
+    session_id = response.json["session_id"]
+    client.post(f"/api/process/{session_id}")
+    wait_for(lambda: client.get(f"/api/progress/{session_id}").json["status"] == "completed")
+    return client.get(f"/api/progress/{session_id}").json["results"][0]
+
+
+def test_reuse_is_opt_in_per_session(backend, client, monkeypatch):
+    # The simulated crops are empty files, which never match; give them content
+    segment = backend.process_form_images
+
+    def segment_with_content(images_folder, filename):
+        sections_dir = segment(images_folder, filename)
+        for name in os.listdir(sections_dir):
+            write(os.path.join(sections_dir, name), name.encode())
+        return sections_dir
+
+    monkeypatch.setattr(backend, "process_form_images", segment_with_content)
+
+    first = convert(client, "REVA_form.pdf")
+    assert first["revision"] is None and first["reused_sections"] == 0
+    # Not indexed while reuse is off, so there is nothing to reuse yet
+    assert convert(client, "REVA_form.pdf", reuse_revisions="true")["revision"] is None
+
+    reused = convert(client, "REVA_form.pdf", reuse_revisions="true")
+    assert len(reused["revision"]["reused_sections"]) == 3
+    fresh = convert(client, "REVA_form.pdf", reuse_revisions="false")
+    assert fresh["revision"] is None and fresh["reused_sections"] == 0
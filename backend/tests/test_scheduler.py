@@ -0,0 +1,93 @@
+import threading
+
+from conftest import wait_for
+from scheduler import BATCH, INTERACTIVE, PriorityLimiter, SessionScheduler, lane_for_mode
+
+
+class FakeSession:
+    def __init__(self, session_id, mode):
+        self.session_id = session_id
+        self.mode = mode
+        self.status = "pending"
+
+
+def test_single_uploads_are_interactive():
+    assert lane_for_mode("single") == INTERACTIVE
+    assert lane_for_mode("batch") == BATCH
+
+
+def test_batches_cannot_take_the_reserved_slots():
+    limiter = PriorityLimiter(capacity=3, reserved_interactive=1)
+    limiter.acquire(BATCH)
+    limiter.acquire(BATCH)
+    blocked = threading.Event()
+    got = threading.Event()
+
+    def third_batch():
+        blocked.set()
+        limiter.acquire(BATCH)
+        got.set()
+
+    threading.Thread(target=third_batch, daemon=True).start()
+    blocked.wait(5)
+    assert not got.wait(0.1)
+    limiter.acquire(INTERACTIVE)  # the reserved slot is still free
+    assert limiter.stats()["in_flight"] == {INTERACTIVE: 1, BATCH: 2}
+    limiter.release(BATCH)
+    assert got.wait(5)
+
+
+def test_waiting_interactive_calls_go_before_batches():
+    limiter = PriorityLimiter(capacity=1, reserved_interactive=0)
+    limiter.acquire(BATCH)
+    order = []
+
+    def call(lane):
+        with limiter.slot(lane):
+            order.append(lane)
+
+    batch = threading.Thread(target=call, args=(BATCH,))
+    batch.start()
+    wait_for(lambda: limiter.stats()["waiting"][BATCH] == 1)
+    interactive = threading.Thread(target=call, args=(INTERACTIVE,))
+    interactive.start()
+    wait_for(lambda: limiter.stats()["waiting"][INTERACTIVE] == 1)
+    limiter.release(BATCH)
+    batch.join(5)
+    interactive.join(5)
+    assert order == [INTERACTIVE, BATCH]
+
+
+def test_a_lowered_capacity_lets_running_calls_finish():
+    limiter = PriorityLimiter(capacity=4, reserved_interactive=2)
+    for _ in range(3):
+        limiter.acquire(INTERACTIVE)
+    limiter.set_capacity(2)
+    assert limiter.total_in_flight() == 3
+    # One slot is always left to batches
+    assert limiter.stats()["reserved_interactive"] == 1
+
+
+def test_sessions_start_up_to_each_lane_limit():
+    release = threading.Event()
+    started = []
+
+    def run(session):
+        started.append(session.session_id)
+        release.wait(5)
+
+    scheduler = SessionScheduler(run, max_interactive=1, max_batch=1)
+    sessions = [FakeSession(f"b{i}", "batch") for i in range(2)] + [FakeSession("i0", "single")]
+    for session in sessions:
+        assert scheduler.submit(session)
+    assert not scheduler.submit(sessions[0])
+    wait_for(lambda: len(started) == 2)
+    assert sorted(started) == ["b0", "i0"]
+    assert scheduler.queue_position("b1") == 1
+
+    assert scheduler.cancel(sessions[1])
+    assert scheduler.queue_position("b1") is None
+    release.set()
+    wait_for(lambda: scheduler.stats()["running"] == {INTERACTIVE: 0, BATCH: 0})
+    # The cancelled session never ran
+    assert sorted(started) == ["b0", "i0"]
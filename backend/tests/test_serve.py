@@ -0,0 +1,64 @@
+import configparser
+
+import pytest
+from flask import Flask
+
+from serve import ServerSettings, default_threads, register_ui
+
+
+def test_threads_scale_with_cpus_within_bounds():
+    assert default_threads(1) == 8
+    assert default_threads(4) == 16
+    assert default_threads(64) == 64
+
+
+def test_settings_from_config_with_overrides():
+    config = configparser.ConfigParser()
+    config.read_string("[server]\nport = 8080\nthreads = 12\nkeepalive_seconds = 90\n")
+    settings = ServerSettings.from_config(config, port=9000, threads=None)
+    assert (settings.port, settings.threads, settings.keepalive_seconds) == (9000, 12, 90)
+    assert ServerSettings.from_config(configparser.ConfigParser()).port == 5001
+
+
+@pytest.fixture
+def ui_client(tmp_path):
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "index.html").write_text("<div id=root></div>")
+    (tmp_path / "assets" / "index-3f2a.js").write_text("console.log(1)")
+    (tmp_path / "favicon.ico").write_bytes(b"ico")
+    flask_app = Flask("ui")
+
+    @flask_app.route("/api/health")
+    def health():
+        return {"ok": True}
+
+    assert register_ui(flask_app, str(tmp_path), max_age=600)
+    return flask_app.test_client()
+
+
+def test_fingerprinted_assets_are_immutable(ui_client):
+    response = ui_client.get("/assets/index-3f2a.js")
+    assert response.status_code == 200
+    assert "immutable" in response.headers["Cache-Control"]
+    assert "max-age=600" in response.headers["Cache-Control"]
+
+
+def test_index_and_other_files_are_revalidated(ui_client):
+    for path in ("/", "/favicon.ico"):
+        response = ui_client.get(path)
+        assert response.status_code == 200
+        assert "immutable" not in response.headers.get("Cache-Control", "")
+        response.close()
+
+
+def test_client_routes_get_index_but_the_api_does_not(ui_client):
+    assert b"root" in ui_client.get("/sessions/abc").data
+    assert ui_client.get("/api/health").json == {"ok": True}
+    assert ui_client.get("/api/missing").status_code == 404
+    assert ui_client.get("/metrics").status_code == 404
+
+
+def test_no_build_serves_the_api_only(tmp_path):
+    flask_app = Flask("api")
+    assert not register_ui(flask_app, str(tmp_path / "missing"))
+    assert flask_app.test_client().get("/").status_code == 404
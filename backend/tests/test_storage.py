@@ -0,0 +1,96 @@
+import datetime
+import os
+import time
+
+import pytest
+
+from storage import RetentionPolicy, RetentionSweeper, SessionStorage
+
+DAY = 86400
+
+
+@pytest.fixture
+def roots(tmp_path):
+    uploads, outputs = tmp_path / "uploads", tmp_path / "outputs"
+    return str(uploads), str(outputs), str(outputs / "checkpoints")
+
+
+def write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+
+
+def age(path, days):
+    stamp = time.time() - days * DAY
+    os.utime(path, (stamp, stamp))
+
+
+def session(roots, session_id, age_days=0, size=100):
+    """A session with one file of every kind, last changed age_days ago"""
+    uploads, outputs, _checkpoints = roots
+    storage = SessionStorage(session_id, uploads, outputs, created=datetime.date(2026, 1, 2))
+    write(os.path.join(storage.uploads, "ABCD_form.pdf"), size)
+    write(os.path.join(storage.images, "ABCD_form", "page_000.png"), size)
+    write(os.path.join(storage.json, "ABCD_input_for_af.json"), size)
+    write(os.path.join(storage.packages, "ABCD.zip"), size)
+    for path in (storage.uploads, storage.images, storage.json, storage.packages):
+        age(path, age_days)
+    return storage
+
+
+def checkpoint(roots, session_id, age_days=0):
+    path = os.path.join(roots[2], "digest", session_id)
+    write(os.path.join(path, "state.json"), 10)
+    age(path, age_days)
+    return path
+
+
+def sweeper(roots, active=(), **policy):
+    return RetentionSweeper(*roots, policy=RetentionPolicy(**policy), active_sessions=lambda: set(active))
+
+
+def test_sessions_are_sharded_by_date(tmp_path):
+    storage = SessionStorage("abc", str(tmp_path / "uploads"), str(tmp_path / "outputs"),
+                             created=datetime.date(2026, 1, 2)).create()
+    assert storage.uploads == str(tmp_path / "uploads" / "2026-01-02" / "abc")
+    for path in (storage.images, storage.json, storage.packages):
+        assert os.path.isdir(path) and path.startswith(str(tmp_path / "outputs" / "2026-01-02" / "abc"))
+    assert storage.relative(os.path.join(storage.json, "x.json")) == "2026-01-02/abc/json_outputs/x.json"
+
+
+def test_each_kind_expires_at_its_own_age(roots):
+    storage = session(roots, "old", age_days=10)
+    removed = sweeper(roots, intermediates_max_age_days=7, uploads_max_age_days=14).sweep()
+    assert {entry["path"] for entry in removed} == {storage.images}
+    assert all(entry["reason"] == "age" for entry in removed)
+    assert os.path.isdir(storage.uploads) and os.path.isdir(storage.json)
+
+
+def test_over_the_size_budget_intermediates_go_first(roots):
+    old = session(roots, "old", age_days=3, size=400 * 1024)
+    new = session(roots, "new", age_days=1, size=400 * 1024)
+    # 3200 KB in total, 1.7 MB allowed: both image folders, then both uploads, oldest first
+    removed = sweeper(roots, max_total_size_mb=1.7).sweep()
+    assert [entry["path"] for entry in removed] == [old.images, new.images, old.uploads, new.uploads]
+    assert all(entry["reason"] == "size" for entry in removed)
+    assert os.path.isdir(old.json) and os.path.isdir(old.packages)
+
+
+def test_active_sessions_and_their_checkpoints_are_kept(roots):
+    running = session(roots, "running", age_days=100)
+    kept = checkpoint(roots, "running", age_days=100)
+    finished = checkpoint(roots, "finished", age_days=100)
+    removed = sweeper(roots, active={"running"}, packages_max_age_days=90).sweep()
+    assert [entry["path"] for entry in removed] == [finished]
+    assert os.path.isdir(running.packages) and os.path.isdir(kept)
+
+
+def test_emptied_session_and_date_directories_are_removed(roots):
+    uploads, outputs, checkpoints = roots
+    session(roots, "old", age_days=100)
+    checkpoint(roots, "old", age_days=100)
+    removed = sweeper(roots, packages_max_age_days=90).sweep()
+    assert len(removed) == 5
+    assert os.listdir(uploads) == [] and os.listdir(checkpoints) == []
+    assert os.listdir(outputs) == ["checkpoints"]
@@ -0,0 +1,123 @@
+import pytest
+
+from budget import BudgetExceededError, BudgetGovernor, BudgetLimits, SessionBudget
+from task_queue import CANCELLED, COMPLETED, FAILED, LEASED, QUEUED, SessionSpend, TaskQueue, Worker
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return TaskQueue(str(tmp_path / "queue.db"), lease_seconds=60, max_attempts=2)
+
+
+def statuses(queue, session_id):
+    return [task["status"] for task in queue.session_tasks(session_id)]
+
+
+def test_interactive_tasks_are_leased_first_and_only_once(queue):
+    queue.enqueue("batch", "batch", ["AAAA_1.pdf", "AAAA_2.pdf"], {}, priority=1)
+    queue.enqueue("single", "single", ["BBBB_1.pdf"], {}, priority=0)
+
+    first = queue.lease("w1")
+    second = queue.lease("w2")
+    assert (first["session_id"], first["status"], first["attempts"]) == ("single", LEASED, 1)
+    assert second["filename"] == "AAAA_1.pdf"
+    assert queue.lease("w3")["filename"] == "AAAA_2.pdf"
+    assert queue.lease("w4") is None
+
+
+def test_expired_leases_are_requeued_until_max_attempts(queue):
+    queue.lease_seconds = -1  # every lease is already expired
+    queue.enqueue("s", "batch", ["AAAA_1.pdf"], {})
+    assert queue.lease("w1")["attempts"] == 1
+    assert queue.requeue_expired() == 1
+    assert statuses(queue, "s") == [QUEUED]
+    assert queue.lease("w2")["attempts"] == 2
+    queue.requeue_expired()
+    assert statuses(queue, "s") == [FAILED]
+
+
+def test_a_result_from_a_lost_lease_is_dropped(queue):
+    queue.enqueue("s", "batch", ["AAAA_1.pdf"], {})
+    task = queue.lease("w1")
+    assert queue.heartbeat(task["id"], "w1", step=3)
+    assert not queue.complete(task["id"], "someone-else", {"status": "completed"})
+    assert queue.complete(task["id"], "w1", {"status": "completed"})
+    assert queue.session_tasks("s")[0]["result"] == {"status": "completed"}
+    assert not queue.heartbeat(task["id"], "w1")
+
+
+def test_failures_are_retried_then_marked_failed(queue):
+    queue.enqueue("s", "batch", ["AAAA_1.pdf"], {})
+    task = queue.lease("w1")
+    queue.fail(task["id"], "w1", "boom")
+    assert statuses(queue, "s") == [QUEUED]
+    task = queue.lease("w1")
+    queue.fail(task["id"], "w1", "boom again")
+    assert statuses(queue, "s") == [FAILED]
+
+
+def test_cancel_session_stops_queued_and_flags_running_tasks(queue):
+    queue.enqueue("s", "batch", ["AAAA_1.pdf", "AAAA_2.pdf"], {})
+    running = queue.lease("w1")
+    queue.cancel_session("s")
+    assert statuses(queue, "s") == [LEASED, CANCELLED]
+    assert queue.cancel_requested(running["id"])
+    assert queue.active_session_ids() == {"s"}
+
+
+def test_worker_reports_results_through_the_queue(queue):
+    queue.enqueue("s", "batch", ["AAAA_1.pdf", "AAAA_2.pdf"], {})
+
+    class Session:
+        current_step = 0
+        cancel_token = None
+
+    def run(session, task):
+        if task["filename"] == "AAAA_2.pdf":
+            raise RuntimeError("budget spent")
+        return {"filename": task["filename"], "status": "completed"}
+
+    worker = Worker(queue, "w1", lambda task: Session(), run, poll_interval=0)
+    worker.run_task(queue.lease("w1"))
+    worker.run_task(queue.lease("w1"))
+    assert statuses(queue, "s") == [COMPLETED, FAILED]
+
+
+def test_session_spend_is_shared_by_every_worker(queue):
+    governor = BudgetGovernor()
+    limits = BudgetLimits(session_max_tokens=100, pause_timeout=0)
+    budgets = []
+    for _ in range(2):
+        budget = SessionBudget(2, limits)
+        budget.shared = SessionSpend(queue, "s")
+        budgets.append(budget)
+
+    governor.before_call(budgets[0], wait=lambda _seconds: None)
+    governor.record(budgets[0], 100, 1.0)
+    governor.count_sections(budgets[0])
+    governor.sync(budgets[0])
+    assert queue.session_spend("s") == (100, 1.0, 1)
+
+    # The other file of the session sees the ceiling reached
+    with pytest.raises(BudgetExceededError):
+        governor.before_call(budgets[1], wait=lambda _seconds: None)
+    assert (budgets[1].tokens, budgets[1].sections_done) == (100, 1)
+
+
+def test_api_process_counts_finished_tasks_in_global_stats_once(backend):
+    session = backend.ConversionSession("dist-stats", ["AAAA_1.pdf", "AAAA_2.pdf"], "batch")
+    result = {"status": "completed", "total_tokens": 10, "total_cost": 0.5, "page_count": 2, "num_sections": 3}
+    tasks = [
+        {"id": 1, "file_index": 0, "filename": "AAAA_1.pdf", "status": COMPLETED, "result": result,
+         "error": None, "step": 6, "updated_at": 1.0},
+        {"id": 2, "file_index": 1, "filename": "AAAA_2.pdf", "status": LEASED, "result": None,
+         "error": None, "step": 2, "updated_at": 2.0},
+    ]
+    before = dict(backend.global_stats)
+    session.sync_from_tasks(tasks, (10, 0.5, 3))
+    session.sync_from_tasks(tasks, (10, 0.5, 3))
+
+    assert backend.global_stats["total_tokens_all_forms"] - before["total_tokens_all_forms"] == 10
+    assert backend.global_stats["total_sections_all_forms"] - before["total_sections_all_forms"] == 3
+    assert session.status == "processing"
+    assert (session.budget.tokens, session.budget.cost) == (10, 0.5)
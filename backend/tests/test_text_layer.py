@@ -0,0 +1,43 @@
+import pytest
+
+from text_layer import PageText, extract_text_layer, page_answers, page_confidence
+
+
+def test_confidence_needs_enough_readable_text_or_fields():
+    assert page_confidence("", []) == 0.0
+    assert page_confidence("", [{"label": "Name", "type": "text"}]) == 0.9
+    assert page_confidence("x" * 400, []) == 1.0
+    assert page_confidence("x" * 100, [], min_chars=200) == 0.5
+    assert page_confidence("�" * 200, []) == 0.0
+
+
+def test_first_page_answers_the_title_and_its_section():
+    page = PageText(0, "\n  Application for a permit \nName: ____", [{"label": "Name", "type": "text"}], 1.0)
+    answers = page_answers(page)
+    assert [section for _page, _index, section, _answer in answers] == [
+        "page_000_section_0_title",
+        "page_000_section_1_text",
+    ]
+    assert answers[0][3] == ({"form_title": "Application for a permit"}, 0, 0, "text_layer")
+    response = answers[1][3][0]
+    assert response["section_id"] == "page_1" and response["fields"] == [{"label": "Name", "type": "text"}]
+
+
+def test_later_pages_have_no_title():
+    answers = page_answers(PageText(2, "Section B", [], 1.0))
+    assert [(index, section) for _page, index, section, _answer in answers] == [(0, "page_002_section_0_text")]
+
+
+def test_scanned_and_unreadable_pdfs(tmp_path):
+    pypdf = pytest.importorskip("pypdf")
+    writer = pypdf.PdfWriter()
+    writer.add_blank_page(width=612, height=792)
+    path = tmp_path / "SCAN_form.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    pages = extract_text_layer(str(path))
+    assert len(pages) == 1 and pages[0].confidence == 0.0
+
+    damaged = tmp_path / "DAMG_form.pdf"
+    damaged.write_bytes(b"%PDF-1.4 not really")
+    assert extract_text_layer(str(damaged)) is None
@@ -0,0 +1,156 @@
+"""
+Fast path for born-digital PDFs: section and field candidates from the text layer
+and AcroForm widgets, so only pages without a usable text layer need chat()
+"""
+import logging
+from dataclasses import dataclass, field
+
+try:
+    from pypdf import PdfReader
+    from pypdf.errors import PdfReadError
+except ImportError:  # the fast path is skipped without pypdf
+    PdfReader = None
+    PdfReadError = Exception
+
+logger = logging.getLogger("form_conversion")
+
+# AcroForm /FT values and the field types used in chat() responses
+FIELD_TYPES = {"/Tx": "text", "/Btn": "checkbox", "/Ch": "dropdown", "/Sig": "signature"}
+_RADIO_FLAG = 1 << 15
+_PUSHBUTTON_FLAG = 1 << 16
+_COMBO_FLAG = 1 << 17
+
+
+@dataclass(slots=True)
+class PageText:
+    page_number: int  # 0-based
+    text: str
+    fields: list = field(default_factory=list)
+    confidence: float = 0.0
+
+    @property
+    def title(self):
+        """First non-empty line, the title candidate on the first page"""
+        for line in self.text.splitlines():
+            if line.strip():
+                return line.strip()
+        return ""
+
+    def section_response(self):
+        """The page as a section, shaped like a chat() section response"""
+        return {
+            "section_id": f"page_{self.page_number + 1}",
+            "content": self.text.strip(),
+            "fields": self.fields,
+        }
+
+
+def _inherited(annotation, key):
+    """Field attributes may live on the widget or on its parent field"""
+    node = annotation
+    while node is not None:
+        if key in node:
+            return node[key]
+        parent = node.get("/Parent")
+        node = parent.get_object() if parent is not None else None
+    return None
+
+
+def _widget_field(annotation):
+    field_type = _inherited(annotation, "/FT")
+    if field_type is None:
+        return None
+    flags = int(_inherited(annotation, "/Ff") or 0)
+    kind = FIELD_TYPES.get(str(field_type), "text")
+    if field_type == "/Btn":
+        if flags & _PUSHBUTTON_FLAG:
+            return None
+        if flags & _RADIO_FLAG:
+            kind = "radio"
+    elif field_type == "/Ch" and not flags & _COMBO_FLAG:
+        kind = "list"
+    name = str(_inherited(annotation, "/T") or "")
+    label = str(_inherited(annotation, "/TU") or name)
+    data = {"label": label, "type": kind, "name": name}
+    options = _inherited(annotation, "/Opt")
+    if options:
+        data["options"] = [str(o[-1] if isinstance(o, list) else o) for o in options]
+    return data
+
+
+def _page_fields(page):
+    fields = []
+    seen = set()
+    for ref in page.get("/Annots") or []:
+        annotation = ref.get_object()
+        if annotation.get("/Subtype") != "/Widget":
+            continue
+        data = _widget_field(annotation)
+        # Radio groups have one widget per option but are one field
+        if data is None or (data["name"], data["type"]) in seen:
+            continue
+        seen.add((data["name"], data["type"]))
+        fields.append(data)
+    return fields
+
+
+def page_confidence(text, fields, min_chars=200):
+    """
+    0-1 estimate of how well the text layer describes a page: enough readable
+    text, or AcroForm fields. Scanned pages have no text layer and score 0.
+    """
+    stripped = text.strip()
+    if not stripped:
+        return 0.9 if fields else 0.0
+    readable = sum(1 for ch in stripped if (ch.isprintable() or ch.isspace()) and ch != "\ufffd")
+    readable_ratio = readable / len(stripped)
+    coverage = min(1.0, len(stripped) / min_chars)
+    if fields:
+        coverage = max(coverage, 0.9)
+    return round(readable_ratio * coverage, 3)
+
+
+def extract_text_layer(pdf_path, min_chars=200):
+    """
+    PageText for every page, or None when pypdf is missing or the PDF
+    cannot be read (encrypted, damaged), in which case the vision path is used
+    """
+    if PdfReader is None:
+        return None
+    try:
+        reader = PdfReader(pdf_path)
+        if reader.is_encrypted:
+            return None
+        pages = []
+        for page_number, page in enumerate(reader.pages):
+            text = page.extract_text() or ""
+            fields = _page_fields(page)
+            pages.append(
+                PageText(page_number, text, fields, page_confidence(text, fields, min_chars))
+            )
+        return pages
+    except (PdfReadError, OSError, ValueError, KeyError) as e:
+        logger.warning(f"⚠️ [TEXT] Could not read the text layer of {pdf_path}: {e}")
+        return None
+
+
+def page_answers(page):
+    """
+    (page, section index, section, (response, tokens, cost, source)) for a page
+    answered from its text layer, in the same shape process_page returns
+    """
+    answers = []
+    if page.page_number == 0 and page.title:
+        answers.append(
+            (0, 0, "page_000_section_0_title", ({"form_title": page.title}, 0, 0, "text_layer"))
+        )
+    index = len(answers)
+    answers.append(
+        (
+            page.page_number,
+            index,
+            f"page_{page.page_number:03d}_section_{index}_text",
+            (page.section_response(), 0, 0, "text_layer"),
+        )
+    )
+    return answers
@@ -22,6 +22,55 @@ def pdf_to_images(pdf_path, output_dir):
 
     return images_folder, page_count
 
+def pdf_page_count(pdf_path):
+    """
+    Number of pages in a PDF, without rendering them
+    """
+    # Simulated, matches pdf_to_images
+    return 3
+
+def rasterize_pdf_page(pdf_path, page_number):
+    """
+    Rasterize one PDF page (0-based) into an in-memory bitmap
+    Returns the bitmap bytes
+    """
+    # Simulated; a real implementation renders only this page, e.g.
+    # pdf2image.convert_from_path(pdf_path, first_page=n + 1, last_page=n + 1)
+    return b""
+
+def render_pdf_page(pdf_path, images_folder, page_number, bitmap=None):
+    """
+    Render one PDF page (0-based) to an image, writing bitmap if already rasterized
+    Returns image_path
+    """
+    os.makedirs(images_folder, exist_ok=True)
+    image_path = os.path.join(images_folder, f"page_{page_number:03d}.png")
+
+    if bitmap is None:
+        bitmap = rasterize_pdf_page(pdf_path, page_number)
+    with open(image_path, 'wb') as f:
+        f.write(bitmap)
+
+    return image_path
+
+def segment_page_image(image_path, sections_dir, page_number):
+    """
+    Segment one page image into sections
+    Returns the section file names in reading order
+    """
+    os.makedirs(sections_dir, exist_ok=True)
+
+    # Simulate the title on the first page and one content section per page
+    kinds = (["title"] if page_number == 0 else []) + ["content"]
+    section_names = []
+    for i, kind in enumerate(kinds):
+        section_name = f"page_{page_number:03d}_section_{i}_{kind}.png"
+        with open(os.path.join(sections_dir, section_name), 'w') as f:
+            f.write("")
+        section_names.append(section_name)
+
+    return section_names
+
 def process_form_images(images_folder, filename):
     """
     Process form images and create sections
@@ -40,9 +89,11 @@ def process_form_images(images_folder, filename):
 
     return sections_dir
 
-def chat(section_type, section_path):
+def chat(section_type, section_path, endpoint=None):
     """
     Simulate AI chat processing
+    endpoint is the endpoints.AIEndpoint (url, api_key, model_name, api_version)
+    picked for this call
     Returns (response, tokens, cost)
     """
     tokens = 250  # Simulated token count
@@ -76,37 +127,43 @@ def generate_af(json_file_path):
 </jcr:root>"""
     return content_xml
 
-def sandbox_packager(form_code, last_modified_date):
+# Folder under jcr_root/content/forms/af each packager mode deploys to
+PACKAGE_FORM_ROOTS = {"sandbox": "deep_test_2", "dev": "pdf_converted_afforms"}
+
+def prepare_package_skeleton(form_code, packager_mode, output_dir=os.path.join("outputs", "generated_AF")):
     """
-    Create sandbox package structure
+    Create the package folder structure before the form content is known
+    Returns (package_dir, content_path)
     """
-    package_dir = os.path.join("outputs", "generated_AF", form_code)
-    os.makedirs(package_dir, exist_ok=True)
-
-    # Create package structure
-    content_path = os.path.join(package_dir, "jcr_root", "content", "forms", "af", "deep_test_2", form_code.lower())
+    package_dir = os.path.join(output_dir, form_code)
+    content_path = os.path.join(
+        package_dir, "jcr_root", "content", "forms", "af", PACKAGE_FORM_ROOTS[packager_mode], form_code.lower()
+    )
     os.makedirs(content_path, exist_ok=True)
+    return package_dir, content_path
 
-    # Create .content.xml file
+def _write_package_content(content_path, content_xml):
     content_xml_path = os.path.join(content_path, ".content.xml")
     with open(content_xml_path, 'w') as f:
-        f.write(generate_af(""))
+        f.write(content_xml if content_xml is not None else generate_af(""))
 
-def dev_packager(form_code, last_modified_date):
+def sandbox_packager(form_code, last_modified_date, output_dir=os.path.join("outputs", "generated_AF"), content_xml=None):
     """
-    Create dev package structure
+    Create sandbox package structure
+    Returns package_dir
     """
-    package_dir = os.path.join("outputs", "generated_AF", form_code)
-    os.makedirs(package_dir, exist_ok=True)
+    package_dir, content_path = prepare_package_skeleton(form_code, "sandbox", output_dir)
+    _write_package_content(content_path, content_xml)
+    return package_dir
 
-    # Create package structure
-    content_path = os.path.join(package_dir, "jcr_root", "content", "forms", "af", "pdf_converted_afforms", form_code.lower())
-    os.makedirs(content_path, exist_ok=True)
-
-    # Create .content.xml file
-    content_xml_path = os.path.join(content_path, ".content.xml")
-    with open(content_xml_path, 'w') as f:
-        f.write(generate_af(""))
+def dev_packager(form_code, last_modified_date, output_dir=os.path.join("outputs", "generated_AF"), content_xml=None):
+    """
+    Create dev package structure
+    Returns package_dir
+    """
+    package_dir, content_path = prepare_package_skeleton(form_code, "dev", output_dir)
+    _write_package_content(content_path, content_xml)
+    return package_dir
 
 def process_json_strings(form_json):
     """
@@ -129,12 +186,13 @@ def copy_and_rename_zip_file(source_zip, destination_dir, new_name):
 
 def move_folder_to_zip(folder_path, zip_path):
     """
-    Move folder contents to zip
+    Move folder contents to zip, adding them to the copied template zip if it exists
     """
     import zipfile
     import shutil
 
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+    mode = 'a' if os.path.exists(zip_path) else 'w'
+    with zipfile.ZipFile(zip_path, mode, zipfile.ZIP_DEFLATED) as zf:
         if os.path.exists(folder_path):
             for root, dirs, files in os.walk(folder_path):
                 for file in files:
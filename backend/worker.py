@@ -0,0 +1,107 @@
+"""
+Standalone worker process for distributed mode
+
+Run one or more of these on any node that shares the task queue database and the
+uploads/outputs directories with the API server:
+
+    python worker.py --processes 4 --threads 2
+
+The backend is imported and preloaded once, with no threads running, then forked into
+--processes worker processes that are replaced after --max-tasks files or past
+--max-rss-mb.
+--processes 0 runs the worker threads in this process without recycling.
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+
+logger = logging.getLogger("form_conversion")
+
+
+def run_workers(app, worker_id, threads, poll_interval, recycler=None, stopping=None):
+    """Run worker threads until they stop or `stopping` is set by a signal"""
+    from task_queue import Worker
+
+    workers = [
+        Worker(
+            app.task_queue,
+            f"{worker_id}-{index}",
+            app.build_task_session,
+            app.run_task_session,
+            poll_interval=poll_interval,
+            recycler=recycler,
+        )
+        for index in range(threads)
+    ]
+    stopping = stopping or threading.Event()
+
+    def stop(signum, _frame):
+        # Finish the running tasks; anything left is requeued when its lease expires
+        logger.info(f"🛑 [WORKER] Signal {signum} received, stopping after current tasks")
+        for worker in workers:
+            worker.stop()
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, stop)
+    if recycler is None:
+        signal.signal(signal.SIGINT, stop)
+
+    threads = [worker.start() for worker in workers]
+    for thread in threads:
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process queued form conversion tasks")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes to fork, 0 to run in this process")
+    parser.add_argument("--threads", type=int, default=1, help="tasks to run at the same time per process")
+    parser.add_argument("--max-tasks", type=int, default=None, help="files per process before it is replaced")
+    parser.add_argument("--max-rss-mb", type=float, default=None, help="replace a process past this RSS")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    args = parser.parse_args()
+
+    # Imported here so --help works without a configured backend. Importing
+    # starts no threads (the API process calls app.start_background), so the
+    # forks below inherit a clean process
+    import app
+    from prefork import WorkerPool
+
+    if app.task_queue is None:
+        parser.error("[distributed] enabled is false in .config")
+
+    config = app.config_service.snapshot()
+    processes = args.processes
+    if processes is None:
+        processes = config.getint("distributed", "worker_processes", fallback=1)
+    max_tasks = args.max_tasks
+    if max_tasks is None:
+        max_tasks = config.getint("distributed", "max_tasks_per_process", fallback=0)
+    max_rss_mb = args.max_rss_mb
+    if max_rss_mb is None:
+        max_rss_mb = config.getfloat("distributed", "max_rss_mb", fallback=0)
+
+    if processes <= 0 or not hasattr(os, "fork"):
+        run_workers(app, args.worker_id, args.threads, args.poll_interval)
+        return
+
+    def child_main(slot, recycler):
+        run_workers(app, f"{args.worker_id}-p{slot}", args.threads, args.poll_interval, recycler)
+
+    pool = WorkerPool(processes, child_main, max_tasks=max_tasks, max_rss_mb=max_rss_mb, preload=app.preload)
+
+    def stop(signum, _frame):
+        logger.info(f"🛑 [POOL] Signal {signum} received, stopping worker processes")
+        pool.stop()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    pool.run()
+
+
+if __name__ == "__main__":
+    main()
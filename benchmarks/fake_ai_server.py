@@ -0,0 +1,208 @@
+"""
+Local fake OpenAI-compatible chat completions server for benchmarks and load tests.
+
+    python benchmarks/fake_ai_server.py --port 8900 --latency-ms 800 --rate-429 0.05
+
+Any POST to a path ending in /chat/completions is answered after the
+configured latency with a canned form section (or title) response.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeAIConfig:
+    def __init__(
+        self,
+        latency_ms=500.0,
+        jitter_ms=100.0,
+        rate_429=0.0,
+        prompt_tokens=1200,
+        completion_tokens=300,
+        retry_after=0.5,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.retry_after = retry_after
+
+
+def _completion_body(section_type, config):
+    if section_type == "title":
+        content = {"form_title": "Synthetic Benchmark Form"}
+    else:
+        content = {
+            "section_id": f"section_{random.randint(1, 9999)}",
+            "content": "Synthetic section content",
+            "fields": [
+                {"label": f"Field {i}", "type": "text"} for i in range(random.randint(1, 6))
+            ],
+        }
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "fake",
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": json.dumps(content)},
+            }
+        ],
+        "usage": {
+            "prompt_tokens": config.prompt_tokens,
+            "completion_tokens": config.completion_tokens,
+            "total_tokens": config.prompt_tokens + config.completion_tokens,
+        },
+    }
+
+
+class FakeAIServer:
+    """Threaded fake server; use as a context manager or call start()/stop()"""
+
+    def __init__(self, host="127.0.0.1", port=0, config=None):
+        self.config = config or FakeAIConfig()
+        self.stats = {"requests": 0, "rate_limited": 0, "completed": 0}
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": "not found"}})
+                    return
+
+                config = server.config
+                with server._lock:
+                    server.stats["requests"] += 1
+                if random.random() < config.rate_429:
+                    with server._lock:
+                        server.stats["rate_limited"] += 1
+                    self._send(
+                        429,
+                        {"error": {"code": "429", "message": "Rate limit exceeded"}},
+                        {"Retry-After": str(config.retry_after)},
+                    )
+                    return
+
+                delay = max(0.0, random.gauss(config.latency_ms, config.jitter_ms)) / 1000
+                time.sleep(delay)
+                section_type = payload.get("metadata", {}).get("section_type", "section")
+                with server._lock:
+                    server.stats["completed"] += 1
+                self._send(200, _completion_body(section_type, config))
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def make_chat_client(base_url, price_per_1k_tokens=0.01, max_retries=8, timeout=60):
+    """
+    Return a chat(section_type, section_path, endpoint=None) function with the
+    same contract as utils.chat that talks to an OpenAI-compatible server,
+    the endpoint's url when one is given and base_url otherwise.
+    """
+
+    def chat(section_type, section_path, endpoint=None):
+        root = endpoint.url if endpoint is not None and endpoint.url else base_url
+        url = root.rstrip("/") + "/v1/chat/completions"
+        body = json.dumps(
+            {
+                "model": "fake",
+                "messages": [{"role": "user", "content": f"Extract {section_type}: {section_path}"}],
+                "metadata": {"section_type": section_type},
+            }
+        ).encode("utf-8")
+        for attempt in range(max_retries + 1):
+            req = urllib.request.Request(
+                url, data=body, headers={"Content-Type": "application/json"}, method="POST"
+            )
+            try:
+                with urllib.request.urlopen(req, timeout=timeout) as resp:
+                    data = json.loads(resp.read())
+                break
+            except urllib.error.HTTPError as e:
+                if e.code != 429 or attempt == max_retries:
+                    raise
+                time.sleep(float(e.headers.get("Retry-After") or 1.0))
+        tokens = data["usage"]["total_tokens"]
+        response = json.loads(data["choices"][0]["message"]["content"])
+        return response, tokens, tokens / 1000 * price_per_1k_tokens
+
+    return chat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--prompt-tokens", type=int, default=1200)
+    parser.add_argument("--completion-tokens", type=int, default=300)
+    args = parser.parse_args()
+
+    config = FakeAIConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_429=args.rate_429,
+        prompt_tokens=args.prompt_tokens,
+        completion_tokens=args.completion_tokens,
+    )
+    server = FakeAIServer(args.host, args.port, config)
+    print(f"🤖 Fake AI server listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Load test of the Flask API with concurrent sessions and progress pollers.
+
+The backend runs in a forked process with chat() pointed at a local fake AI
+server, under the dev server (app.run(debug=True), as start.py runs it) or a
+production WSGI server. Uploaders each run whole sessions (upload -> process ->
+poll until done -> results); pollers behave like open browser tabs, polling
+/api/progress?summary=1 with If-None-Match every --poll-interval seconds.
+
+    python benchmarks/load_test.py --uploaders 50 --pollers 200 --server dev --output load_dev.json
+    python benchmarks/load_test.py --uploaders 50 --pollers 200 --server waitress --output load_waitress.json
+
+The report gives latency percentiles and error rates per route, session
+durations, and the server's threads, RSS and CPU sampled over time (Linux /proc).
+"""
+import argparse
+import configparser
+import contextlib
+import datetime
+import http.client
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from fake_ai_server import FakeAIConfig, FakeAIServer, make_chat_client
+from run_benchmark import _multipart, git_revision, load_app, percentile, prepare_workdir
+from synthetic_pdf import generate_pdfs
+
+SERVERS = ("dev", "waitress", "gunicorn")
+TERMINAL = ("completed", "error", "cancelled")
+
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def disable_reuse(config_path):
+    """Dedup and revision reuse would answer most repeated sections without a chat() call"""
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    for section in ("dedup", "revision"):
+        if not config.has_section(section):
+            config.add_section(section)
+        config.set(section, "enabled", "false")
+    with open(config_path, "w") as f:
+        config.write(f)
+
+
+def serve(server, port, threads, ai_url, keep_sleeps):
+    """
+    Server process: load the backend with the fake chat() and serve it until
+    terminated, production servers with the settings of backend/serve.py
+    """
+    import serve as production
+
+    def load():
+        backend, _calls = load_app(make_chat_client(ai_url, max_retries=8), keep_sleeps)
+        logging.getLogger("form_conversion").setLevel(logging.WARNING)
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        return backend.app
+
+    if server == "dev":
+        load().run(debug=True, use_reloader=False, host="127.0.0.1", port=port)
+    else:
+        production.run(server, load, production.ServerSettings(host="127.0.0.1", port=port, threads=threads))
+
+
+def wait_ready(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not process.is_alive():
+            raise RuntimeError(f"Server exited with code {process.exitcode}")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            connection.request("GET", "/api/storage")
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not start")
+
+
+class ProcessSampler:
+    """Threads, RSS and CPU of a process and its children, read from /proc every interval"""
+
+    def __init__(self, pid, interval=1.0):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def _tree(self, pid):
+        pids = [pid]
+        try:
+            with open(f"/proc/{pid}/task/{pid}/children") as f:
+                for child in f.read().split():
+                    pids.extend(self._tree(int(child)))
+        except OSError:
+            pass
+        return pids
+
+    def _read(self):
+        threads = rss_kb = cpu_ticks = 0
+        for pid in self._tree(self.pid):
+            try:
+                with open(f"/proc/{pid}/status") as f:
+                    for line in f:
+                        if line.startswith("Threads:"):
+                            threads += int(line.split()[1])
+                        elif line.startswith("VmRSS:"):
+                            rss_kb += int(line.split()[1])
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                cpu_ticks += int(fields[11]) + int(fields[12])  # utime + stime
+            except (OSError, IndexError, ValueError):
+                continue
+        return threads, rss_kb, cpu_ticks
+
+    def _run(self):
+        started = time.monotonic()
+        previous = None
+        while not self._stop.is_set():
+            now = time.monotonic()
+            threads, rss_kb, cpu_ticks = self._read()
+            cpu = None
+            if previous is not None and now > previous[0]:
+                cpu = round((cpu_ticks - previous[1]) / self._ticks / (now - previous[0]) * 100, 1)
+            previous = (now, cpu_ticks)
+            self.samples.append(
+                {"t_s": round(now - started, 2), "threads": threads, "rss_mb": round(rss_kb / 1024, 1), "cpu_pct": cpu}
+            )
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if os.path.isdir(f"/proc/{self.pid}"):
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+class Recorder:
+    """Latency and status of every request, by route"""
+
+    def __init__(self):
+        self.requests = defaultdict(list)  # route -> [(seconds, status)], status None for a failed request
+        self.sessions = []  # seconds from upload to a terminal status, and that status
+        self.session_ids = []
+        self.finished_ids = set()
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, status):
+        with self._lock:
+            self.requests[route].append((seconds, status))
+
+    def session_started(self, session_id):
+        with self._lock:
+            self.session_ids.append(session_id)
+
+    def session_finished(self, seconds, status, session_id=None):
+        with self._lock:
+            self.sessions.append((seconds, status))
+            self.finished_ids.add(session_id)
+
+    def active(self):
+        """Sessions whose uploader is still waiting for them"""
+        with self._lock:
+            return [session_id for session_id in self.session_ids if session_id not in self.finished_ids]
+
+    def summary(self):
+        with self._lock:
+            routes = {}
+            for route, items in sorted(self.requests.items()):
+                latencies = [seconds for seconds, _status in items]
+                errors = [status for _seconds, status in items if status is None or status >= 400]
+                routes[route] = {
+                    "requests": len(items),
+                    "errors": len(errors),
+                    "error_rate": round(len(errors) / len(items), 4),
+                    "not_modified": sum(1 for _seconds, status in items if status == 304),
+                    "p50_s": percentile(latencies, 50),
+                    "p95_s": percentile(latencies, 95),
+                    "p99_s": percentile(latencies, 99),
+                    "max_s": round(max(latencies), 4),
+                }
+            durations = [seconds for seconds, _status in self.sessions]
+            statuses = defaultdict(int)
+            for _seconds, status in self.sessions:
+                statuses[status] += 1
+            return routes, {
+                "sessions": len(self.sessions),
+                "statuses": dict(statuses),
+                "p50_s": percentile(durations, 50),
+                "p95_s": percentile(durations, 95),
+                "max_s": round(max(durations), 3) if durations else None,
+            }
+
+
+class Client:
+    """One keep-alive connection, as a browser tab would hold"""
+
+    def __init__(self, port, recorder, timeout=60):
+        self.port = port
+        self.recorder = recorder
+        self.timeout = timeout
+        self.connection = None
+        self.etag = None  # of the last response
+
+    def request(self, route, method, path, body=None, headers=None):
+        """(status, parsed JSON or None); status None when the request failed"""
+        started = time.perf_counter()
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=self.timeout)
+            try:
+                self.connection.request(method, path, body=body, headers=headers or {})
+                response = self.connection.getresponse()
+                data = response.read()
+                break
+            except (OSError, http.client.HTTPException):
+                self.close()
+                # A keep-alive connection the server already closed is retried once
+                if attempt:
+                    self.recorder.record(route, time.perf_counter() - started, None)
+                    return None, None
+        self.recorder.record(route, time.perf_counter() - started, response.status)
+        self.etag = response.getheader("ETag")
+        if response.status == 304 or not data:
+            return response.status, None
+        try:
+            return response.status, json.loads(data)
+        except ValueError:
+            return response.status, None
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def run_uploader(port, recorder, pdfs, rounds, poll_interval, stop):
+    client = Client(port, recorder)
+    try:
+        for _ in range(rounds):
+            if stop.is_set():
+                return
+            started = time.perf_counter()
+            body, content_type = _multipart(pdfs, "single" if len(pdfs) == 1 else "batch")
+            status, data = client.request(
+                "POST /api/upload", "POST", "/api/upload", body, {"Content-Type": content_type}
+            )
+            if status != 200:
+                recorder.session_finished(time.perf_counter() - started, "upload_failed")
+                continue
+            session_id = data["session_id"]
+            recorder.session_started(session_id)
+            client.request("POST /api/process", "POST", f"/api/process/{session_id}", b"")
+            state = None
+            while not stop.is_set():
+                status, data = client.request("GET /api/progress", "GET", f"/api/progress/{session_id}")
+                if status == 200 and data["status"] in TERMINAL:
+                    state = data["status"]
+                    break
+                time.sleep(poll_interval)
+            client.request("GET /api/sessions/results", "GET", f"/api/sessions/{session_id}/results?limit=50")
+            recorder.session_finished(time.perf_counter() - started, state or "unfinished", session_id)
+    finally:
+        client.close()
+
+
+def run_poller(port, recorder, poll_interval, stop):
+    """
+    A browser tab watching a random running session, as conversion-stages.jsx
+    polls it, then loading its results and moving on to another one
+    """
+    client = Client(port, recorder)
+    session_id = etag = None
+    # Tabs do not all open at the same moment
+    stop.wait(random.uniform(0, poll_interval))
+    try:
+        while not stop.is_set():
+            if session_id is None:
+                session_ids = recorder.active()
+                if not session_ids:
+                    stop.wait(poll_interval)
+                    continue
+                session_id, etag = random.choice(session_ids), None
+            headers = {"If-None-Match": etag} if etag else {}
+            status, data = client.request(
+                "GET /api/progress?summary=1", "GET", f"/api/progress/{session_id}?summary=1", headers=headers
+            )
+            if status == 200:
+                etag = client.etag
+                if isinstance(data, dict) and data.get("status") in TERMINAL:
+                    client.request(
+                        "GET /api/sessions/results", "GET", f"/api/sessions/{session_id}/results?limit=50"
+                    )
+                    session_id = None
+            elif status != 304:
+                session_id = None
+            stop.wait(poll_interval)
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the form conversion API")
+    parser.add_argument("--server", choices=SERVERS, default="dev",
+                        help="dev is app.run(debug=True); waitress and gunicorn are production servers")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="request threads of a production server (default: 4 x CPUs, 8-64)")
+    parser.add_argument("--uploaders", type=int, default=50, help="concurrent sessions")
+    parser.add_argument("--rounds", type=int, default=1, help="sessions each uploader runs one after another")
+    parser.add_argument("--pollers", type=int, default=200, help="browser tabs polling progress")
+    parser.add_argument("--files", type=int, default=1, help="PDFs per session")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--sections", type=int, default=4, help="sections per page")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds, the UI polls every second")
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--duration", type=float, default=600.0, help="stop after this many seconds")
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--allow-reuse", action="store_true",
+                        help="keep dedup and revision reuse, which skip most chat() calls")
+    parser.add_argument("--keep-sleeps", action="store_true", help="keep the simulated sleeps in app.py")
+    parser.add_argument("--workdir", help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--output", default="load_results.json")
+    args = parser.parse_args()
+
+    if args.server != "dev":
+        try:
+            __import__(args.server)
+        except ImportError:
+            parser.error(f"--server {args.server} needs it installed: pip install {args.server}")
+
+    output = os.path.abspath(args.output)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="form-conversion-load-")
+    ai_config = FakeAIConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_429=args.rate_429, retry_after=0.05
+    )
+    report = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "parameters": vars(args),
+    }
+    recorder = Recorder()
+    stop = threading.Event()
+
+    with contextlib.ExitStack() as stack:
+        ai_server = stack.enter_context(FakeAIServer(config=ai_config))
+        prepare_workdir(workdir, [ai_server.url])
+        if not args.allow_reuse:
+            disable_reuse(os.path.join(workdir, ".config"))
+        pdfs = generate_pdfs(os.path.join(workdir, "synthetic"), args.files, args.pages, args.sections)
+
+        port = free_port()
+        # Forked before any client thread starts; the fake AI server threads stay here
+        process = multiprocessing.get_context("fork").Process(
+            target=serve, args=(args.server, port, args.threads, ai_server.url, args.keep_sleeps), daemon=True
+        )
+        process.start()
+        stack.callback(process.join, 10)
+        stack.callback(process.terminate)
+        wait_ready(port, process)
+        print(f"🚀 {args.server} server on port {port} (pid {process.pid}), "
+              f"{args.uploaders} uploaders, {args.pollers} pollers")
+
+        sampler = ProcessSampler(process.pid, args.sample_interval).start()
+        threads = [
+            threading.Thread(
+                target=run_uploader, args=(port, recorder, pdfs, args.rounds, args.poll_interval, stop)
+            )
+            for _ in range(args.uploaders)
+        ]
+        pollers = [
+            threading.Thread(target=run_poller, args=(port, recorder, args.poll_interval, stop), daemon=True)
+            for _ in range(args.pollers)
+        ]
+        started = time.perf_counter()
+        for thread in threads + pollers:
+            thread.start()
+        deadline = started + args.duration
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.perf_counter()))
+        timed_out = any(thread.is_alive() for thread in threads)
+        stop.set()
+        for thread in threads + pollers:
+            thread.join(30)
+        wall_time = time.perf_counter() - started
+        sampler.stop()
+
+        routes, sessions = recorder.summary()
+        samples = sampler.samples
+        report["server"] = {"kind": args.server, "threads": args.threads or "auto" if args.server != "dev" else None}
+        report["wall_time_s"] = round(wall_time, 3)
+        report["timed_out"] = timed_out
+        report["routes"] = routes
+        report["sessions"] = sessions
+        report["fake_ai_server"] = dict(ai_server.stats)
+        report["peak"] = {
+            "threads": max((s["threads"] for s in samples), default=None),
+            "rss_mb": max((s["rss_mb"] for s in samples), default=None),
+            "cpu_pct": max((s["cpu_pct"] for s in samples if s["cpu_pct"] is not None), default=None),
+        }
+        report["samples"] = samples
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'route':32} {'requests':>8} {'errors':>7} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'max s':>8}")
+    for route, r in routes.items():
+        print(f"{route:32} {r['requests']:8} {r['errors']:7} {r['p50_s']:8} {r['p95_s']:8} {r['p99_s']:8} {r['max_s']:8}")
+    print(
+        f"📊 {sessions['sessions']} sessions {sessions['statuses']} in {wall_time:.1f}s, "
+        f"p50 {sessions['p50_s']} s p95 {sessions['p95_s']} s | peak {report['peak']['threads']} threads, "
+        f"{report['peak']['rss_mb']} MB RSS, {report['peak']['cpu_pct']}% CPU"
+    )
+    print(f"💾 Results written to {output}")
+    return 1 if timed_out else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark for the conversion pipeline.
+
+Generates synthetic PDFs, starts a fake OpenAI-compatible server and runs
+the backend pipeline against it, either by calling process_single_file
+directly or through the HTTP API (/api/upload -> /api/process -> /api/progress).
+
+    python benchmarks/run_benchmark.py --files 20 --pages 5 --latency-ms 300 --output bench.json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import logging
+import math
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from pathlib import Path
+
+from fake_ai_server import FakeAIConfig, FakeAIServer, make_chat_client
+from synthetic_pdf import generate_pdfs
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BACKEND_DIR = REPO_ROOT / "backend"
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile, None for an empty list"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return round(ordered[index], 4)
+
+
+def peak_rss_mb():
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024, 1)
+
+
+class _NoSleepTime:
+    """Stands in for the time module inside app.py to drop the simulated sleeps"""
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    @staticmethod
+    def sleep(_seconds):
+        pass
+
+
+def prepare_workdir(workdir, ai_urls=()):
+    """Backend paths are relative to its cwd, so run it from a scratch copy"""
+    os.makedirs(workdir, exist_ok=True)
+    shutil.copy(BACKEND_DIR / ".config", os.path.join(workdir, ".config"))
+    secrets = {"T_NUMBER": "bench"}
+    if len(ai_urls) > 1:
+        secrets["AI_ENDPOINTS"] = [
+            {"name": f"fake-{index}", "endpoint": url} for index, url in enumerate(ai_urls)
+        ]
+    with open(os.path.join(workdir, "secrets.json"), "w") as f:
+        json.dump(secrets, f)
+    os.chdir(workdir)
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+def shape_pipeline(backend, pages, sections):
+    """
+    The backend's render and segment steps are stubs with a fixed shape; make
+    them produce pages pages of sections sections each, the title on page 1
+    """
+
+    def page_sections(page_number):
+        return [
+            "title" if page_number == 0 and index == 0 else "content" for index in range(sections)
+        ]
+
+    def write_section(path):
+        # Distinct non-empty crops, like real ones: dedup and pruning leave them alone
+        with open(path, "wb") as f:
+            f.write(path.encode())
+
+    def pdf_to_images(pdf_path, output_dir):
+        images_folder = os.path.join(output_dir, Path(pdf_path).stem)
+        os.makedirs(images_folder, exist_ok=True)
+        return images_folder, pages
+
+    def process_form_images(images_folder, filename):
+        sections_dir = os.path.join(images_folder, "sections")
+        os.makedirs(sections_dir, exist_ok=True)
+        index = 0
+        for page_number in range(pages):
+            for kind in page_sections(page_number):
+                write_section(os.path.join(sections_dir, f"section_{index}_{kind}.png"))
+                index += 1
+        return sections_dir
+
+    def segment_page_image(image_path, sections_dir, page_number):
+        os.makedirs(sections_dir, exist_ok=True)
+        names = []
+        for index, kind in enumerate(page_sections(page_number)):
+            name = f"page_{page_number:03d}_section_{index}_{kind}.png"
+            write_section(os.path.join(sections_dir, name))
+            names.append(name)
+        return names
+
+    backend.pdf_to_images = pdf_to_images
+    backend.pdf_page_count = lambda _pdf_path: pages
+    backend.process_form_images = process_form_images
+    backend.segment_page_image = segment_page_image
+
+
+def load_app(chat_client, keep_sleeps):
+    import app as backend
+
+    calls = []
+    lock = threading.Lock()
+
+    def timed_chat(section_type, section_path, endpoint=None):
+        start = time.perf_counter()
+        try:
+            return chat_client(section_type, section_path, endpoint)
+        finally:
+            with lock:
+                calls.append(time.perf_counter() - start)
+
+    backend.chat = timed_chat
+    if not keep_sleeps:
+        backend.time = _NoSleepTime()
+    return backend, calls
+
+
+def summarise(results, wall_time, ai_calls, steps):
+    completed = [r for r in results if r.get("status") == "completed"]
+    step_stats = {}
+    for index, name in enumerate(steps):
+        durations = [r["step_durations"][index] for r in completed if "step_durations" in r]
+        step_stats[name] = {
+            "p50_s": percentile(durations, 50),
+            "p95_s": percentile(durations, 95),
+        }
+    return {
+        "files": len(results),
+        "completed": len(completed),
+        "errors": len(results) - len(completed),
+        "wall_time_s": round(wall_time, 3),
+        "files_per_min": round(len(completed) / wall_time * 60, 2) if wall_time else None,
+        # What the pipeline actually produced, not what was asked for
+        "pages": sum(r.get("page_count", 0) for r in completed),
+        "sections": sum(r.get("num_sections", 0) for r in completed),
+        "total_tokens": sum(r.get("total_tokens", 0) for r in completed),
+        "total_cost": round(sum(r.get("total_cost", 0) for r in completed), 6),
+        "ai_calls": len(ai_calls),
+        "ai_latency_p50_s": percentile(ai_calls, 50),
+        "ai_latency_p95_s": percentile(ai_calls, 95),
+        "steps": step_stats,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_direct(backend, pdfs, ai_calls, dedup):
+    """Drive process_single_file for every PDF in one batch session"""
+    filenames = [os.path.basename(path) for path in pdfs]
+    session = backend.ConversionSession(str(uuid.uuid4()), filenames, "batch")
+    for path in pdfs:
+        shutil.copy(path, os.path.join(session.storage.uploads, os.path.basename(path)))
+
+    session.status = "processing"
+    if dedup:
+        session.section_dedup = backend.SectionDeduplicator()
+    del ai_calls[:]
+    results = []
+    start = time.perf_counter()
+    for index, filename in enumerate(filenames):
+        session.current_file_index = index
+        session.current_file = filename
+        filepath = os.path.join(session.storage.uploads, filename)
+        results.append(
+            backend.process_single_file(session, filename, filepath, "sandbox", "bench")
+        )
+    wall_time = time.perf_counter() - start
+    return summarise(results, wall_time, list(ai_calls), session.steps)
+
+
+def _multipart(paths, mode):
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for path in paths:
+        body.write(f"--{boundary}\r\n".encode())
+        body.write(
+            f'Content-Disposition: form-data; name="files"; filename="{os.path.basename(path)}"\r\n'
+            "Content-Type: application/pdf\r\n\r\n".encode()
+        )
+        with open(path, "rb") as f:
+            body.write(f.read())
+        body.write(b"\r\n")
+    body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="mode"\r\n\r\n{mode}\r\n'.encode())
+    body.write(f"--{boundary}--\r\n".encode())
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+def _request(url, data=None, content_type=None, method="GET"):
+    headers = {"Content-Type": content_type} if content_type else {}
+    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        return json.loads(resp.read())
+
+
+def run_http(backend, pdfs, ai_calls, sessions, poll_interval):
+    """Drive the HTTP API with the given number of concurrent sessions"""
+    from werkzeug.serving import make_server
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}/api"
+
+    groups = [pdfs[i::sessions] for i in range(sessions) if pdfs[i::sessions]]
+    results = []
+    lock = threading.Lock()
+    del ai_calls[:]
+
+    def drive(paths):
+        mode = "single" if len(paths) == 1 else "batch"
+        body, content_type = _multipart(paths, mode)
+        session_id = _request(f"{base}/upload", body, content_type, "POST")["session_id"]
+        _request(f"{base}/process/{session_id}", b"", None, "POST")
+        while True:
+            progress = _request(f"{base}/progress/{session_id}")
+            if progress["status"] in ("completed", "error"):
+                break
+            time.sleep(poll_interval)
+        with lock:
+            results.extend(progress["results"])
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=drive, args=(group,)) for group in groups]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - start
+    server.shutdown()
+    summary = summarise(results, wall_time, list(ai_calls), list(backend.ConversionSession.STEPS))
+    summary["sessions"] = len(groups)
+    return summary
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the form conversion pipeline")
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--sections", type=int, default=4, help="sections per page")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--ai-servers", type=int, default=1,
+                        help="fake AI servers, configured as separate AI_ENDPOINTS when more than one")
+    parser.add_argument("--prompt-tokens", type=int, default=1200)
+    parser.add_argument("--completion-tokens", type=int, default=300)
+    parser.add_argument("--mode", choices=["direct", "http", "both"], default="both")
+    parser.add_argument("--sessions", type=int, default=1, help="concurrent HTTP sessions")
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--no-dedup", action="store_true", help="disable section dedup in direct mode")
+    parser.add_argument("--keep-sleeps", action="store_true", help="keep the simulated sleeps in app.py")
+    parser.add_argument("--workdir", help="scratch directory (default: a new temp dir)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--verbose", action="store_true", help="show backend output")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="form-conversion-bench-")
+
+    ai_config = FakeAIConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_429=args.rate_429,
+        prompt_tokens=args.prompt_tokens,
+        completion_tokens=args.completion_tokens,
+        retry_after=0.05,
+    )
+    report = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "parameters": vars(args),
+    }
+
+    with contextlib.ExitStack() as stack:
+        ai_servers = [
+            stack.enter_context(FakeAIServer(config=ai_config)) for _ in range(max(1, args.ai_servers))
+        ]
+        prepare_workdir(workdir, [server.url for server in ai_servers])
+        pdfs = generate_pdfs(os.path.join(workdir, "synthetic"), args.files, args.pages, args.sections)
+        # With several servers the backend's endpoint pool handles 429s and failover
+        chat_client = make_chat_client(ai_servers[0].url, max_retries=8 if len(ai_servers) == 1 else 0)
+        backend, ai_calls = load_app(chat_client, args.keep_sleeps)
+        shape_pipeline(backend, args.pages, args.sections)
+        if not args.verbose:
+            logging.getLogger("form_conversion").setLevel(logging.WARNING)
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with quiet:
+            if args.mode in ("direct", "both"):
+                report["direct"] = run_direct(backend, pdfs, ai_calls, not args.no_dedup)
+            if args.mode in ("http", "both"):
+                report["http"] = run_http(backend, pdfs, ai_calls, args.sessions, args.poll_interval)
+        report["fake_ai_server"] = {
+            key: sum(server.stats[key] for server in ai_servers) for key in ai_servers[0].stats
+        }
+        report["ai_endpoints"] = backend.ai_endpoints.stats()
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for mode in ("direct", "http"):
+        if mode in report:
+            r = report[mode]
+            print(
+                f"📊 {mode:6} | {r['completed']}/{r['files']} files, {r['pages']} pages, {r['sections']} sections | "
+                f"{r['files_per_min']} files/min | "
+                f"AI p50 {r['ai_latency_p50_s']} s p95 {r['ai_latency_p95_s']} s | peak RSS {r['peak_rss_mb']} MB"
+            )
+    print(f"💾 Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Generate synthetic multi-page form PDFs for benchmarking.
+No third-party dependencies: the PDF is written by hand.
+"""
+import os
+
+
+def _page_stream(page_number, sections):
+    """Content stream drawing one boxed, labelled block per section"""
+    ops = []
+    height = 792
+    margin = 36
+    block_height = (height - 2 * margin) / max(sections, 1)
+    for i in range(sections):
+        top = height - margin - i * block_height
+        y = top - block_height + 6
+        ops.append(f"{margin} {y:.1f} {612 - 2 * margin} {block_height - 12:.1f} re S")
+        ops.append(
+            f"BT /F1 12 Tf {margin + 8} {top - 24:.1f} Td "
+            f"(Page {page_number} Section {i} - Field label: ________) Tj ET"
+        )
+    return "\n".join(ops).encode("latin-1")
+
+
+def build_pdf(pages=3, sections_per_page=4):
+    """Return the bytes of a PDF with the given page and section counts"""
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages_obj = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_ids = []
+    for page_number in range(1, pages + 1):
+        stream = _page_stream(page_number, sections_per_page)
+        content = add(
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+        page_ids.append(
+            add(
+                (
+                    f"<< /Type /Page /Parent {pages_obj} 0 R /MediaBox [0 0 612 792] "
+                    f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {content} 0 R >>"
+                ).encode("latin-1")
+            )
+        )
+
+    kids = " ".join(f"{p} 0 R" for p in page_ids)
+    objects[catalog - 1] = f"<< /Type /Catalog /Pages {pages_obj} 0 R >>".encode("latin-1")
+    objects[pages_obj - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        catalog,
+        xref,
+    )
+    return bytes(out)
+
+
+def generate_pdfs(directory, count, pages=3, sections_per_page=4, prefix="BENC"):
+    """
+    Write count PDFs into directory and return their paths.
+    Names keep an alphabetic 4 character prefix so validate_pdf_filename accepts them.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    for i in range(count):
+        # Give every file its own alphabetic form code so outputs do not collide
+        code = prefix[:2] + letters[(i // 26) % 26] + letters[i % 26]
+        path = os.path.join(directory, f"{code}_synthetic_{i:04d}.pdf")
+        with open(path, "wb") as f:
+            f.write(build_pdf(pages, sections_per_page))
+        paths.append(path)
+    return paths
@@ -3,8 +3,14 @@
 Startup script for the Form Conversion webapp.
 This script starts the Flask backend first, detects its host/port,
 then starts the React frontend with proper proxy configuration.
+
+With --prod it builds the UI once and starts a production deployment instead:
+backend/serve.py (gunicorn or waitress) serving the API and ui/dist, plus
+worker.py when [distributed] is enabled. SIGHUP reloads the server gracefully.
 """
 
+import argparse
+import configparser
 import os
 import sys
 import time
@@ -128,6 +134,82 @@ def start_frontend(backend_port):
         print("❌ Frontend failed to start")
         return None
 
+def build_frontend(force=False):
+    """Build ui/dist with Vite unless a build already exists."""
+    if not force and Path("ui/dist/index.html").exists():
+        print("✅ Using the existing UI build in ui/dist (--build to rebuild)")
+        return True
+    print("🔨 Building the React frontend...")
+    if not Path("ui/node_modules").exists():
+        if subprocess.call(["npm", "ci"], cwd="ui") != 0:
+            print("❌ npm ci failed")
+            return False
+    if subprocess.call(["npm", "run", "build"], cwd="ui") != 0:
+        print("❌ UI build failed")
+        return False
+    print("✅ UI built into ui/dist")
+    return True
+
+def backend_config():
+    """backend/.config, for the settings start.py needs before the backend runs."""
+    config = configparser.ConfigParser()
+    config.read(Path("backend") / ".config")
+    return config
+
+def start_production(args):
+    """Start the production server (and workers) and supervise them."""
+    if not args.no_build and not build_frontend(force=args.build):
+        return 1
+
+    command = [sys.executable, "serve.py", "--server", args.server]
+    for option, value in (("--host", args.host), ("--port", args.port), ("--threads", args.threads)):
+        if value is not None:
+            command += [option, str(value)]
+    print("🚀 Starting the production server...")
+    processes = {"server": subprocess.Popen(command, cwd="backend")}
+
+    config = backend_config()
+    if config.getboolean("distributed", "enabled", fallback=False):
+        # Conversions run in [distributed] worker_processes forked worker processes
+        worker_command = [sys.executable, "worker.py"]
+        if args.worker_processes is not None:
+            worker_command += ["--processes", str(args.worker_processes)]
+        print("🚀 Starting conversion workers...")
+        processes["workers"] = subprocess.Popen(worker_command, cwd="backend")
+
+    port = args.port or config.getint("server", "port", fallback=5001)
+    if wait_for_server('localhost', port):
+        print(f"✅ App ready at http://localhost:{port}")
+    else:
+        print("❌ Server failed to start")
+        for process in processes.values():
+            process.terminate()
+        return 1
+
+    def stop(_sig, _frame):
+        print("\n🛑 Stopping servers...")
+        for process in processes.values():
+            process.terminate()
+
+    def reload(_sig, _frame):
+        print("🔄 Reloading the server gracefully...")
+        processes["server"].send_signal(signal.SIGHUP)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, reload)
+
+    # Exit when any of them stops, taking the others down with it
+    while all(process.poll() is None for process in processes.values()):
+        time.sleep(1)
+    for name, process in processes.items():
+        if process.poll() is None:
+            process.terminate()
+        process.wait()
+        print(f"⏹️ {name} exited with code {process.returncode}")
+    return 0
+
 def main():
     """Main startup function."""
     print("🔄 Starting Form Conversion Web App...")
@@ -186,7 +268,23 @@ def main():
 
     return 0
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Start the Form Conversion web app")
+    parser.add_argument("--prod", action="store_true",
+                        help="production deployment: built UI and a multi-threaded WSGI server")
+    parser.add_argument("--build", action="store_true", help="rebuild ui/dist even if it exists")
+    parser.add_argument("--no-build", action="store_true", help="serve the API without building the UI")
+    parser.add_argument("--server", choices=["auto", "gunicorn", "waitress"], default="auto")
+    parser.add_argument("--host", default=None, help="default: [server] host in backend/.config")
+    parser.add_argument("--port", type=int, default=None, help="default: [server] port in backend/.config")
+    parser.add_argument("--threads", type=int, default=None, help="request threads, default: 4 x CPUs (8-64)")
+    parser.add_argument("--worker-processes", type=int, default=None,
+                        help="worker.py processes with [distributed] enabled")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
+
     # Check if we're in the right directory
     if not Path("backend").exists() or not Path("ui").exists():
         print("❌ Please run this script from the form-conversion root directory")
@@ -197,4 +295,4 @@ if __name__ == "__main__":
         print("  └── start.py")
         sys.exit(1)
 
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(start_production(args) if args.prod else main())
\ No newline at end of file
@@ -2,4 +2,4 @@
 
 # Simple shell wrapper for the Python startup script
 cd "$(dirname "$0")"
-python3 start.py
\ No newline at end of file
+python3 start.py "$@"
\ No newline at end of file
@@ -1,6 +1,7 @@
 "use client";
 
 import { useState, useEffect } from "react";
+import { Button } from "@/components/ui/button";
 import { Card } from "@/components/ui/card";
 import { Progress } from "@/components/ui/progress";
 import { apiClient } from "@/lib/api";
@@ -13,6 +14,7 @@ import {
   Package,
   CheckCircle,
   AlertTriangle,
+  XCircle,
 } from "lucide-react";
 
 export function ConversionStages({ fileName, file, onComplete, onError }) {
@@ -21,6 +23,7 @@ export function ConversionStages({ fileName, file, onComplete, onError }) {
   const [error, setError] = useState(null);
   const [isProcessing, setIsProcessing] = useState(false);
   const [hasStarted, setHasStarted] = useState(false);
+  const [isCancelling, setIsCancelling] = useState(false);
 
   useEffect(() => {
     let pollInterval;
@@ -44,14 +47,15 @@ export function ConversionStages({ fileName, file, onComplete, onError }) {
         // Poll for progress
         pollInterval = setInterval(async () => {
           try {
-            const progress = await apiClient.getProgress(uploadResult.session_id);
+            const progress = await apiClient.getProgress(uploadResult.session_id, { summary: true });
             setProgressData(progress);
 
             if (progress.status === 'completed') {
               clearInterval(pollInterval);
               setIsProcessing(false);
-              onComplete(progress);
-            } else if (progress.status === 'error') {
+              const page = await apiClient.getSessionResults(uploadResult.session_id);
+              onComplete({ ...progress, results: page.results });
+            } else if (progress.status === 'error' || progress.status === 'cancelled') {
               clearInterval(pollInterval);
               setIsProcessing(false);
               setError(progress.error_message || 'An error occurred during processing');
@@ -82,6 +86,20 @@ export function ConversionStages({ fileName, file, onComplete, onError }) {
     };
   }, [file, fileName, hasStarted, onComplete, onError]);
 
+  const handleCancel = async () => {
+    if (!sessionId || isCancelling) {
+      return;
+    }
+    setIsCancelling(true);
+    try {
+      // The backend stops at its next check; polling then sees status cancelled
+      await apiClient.cancelProcessing(sessionId);
+    } catch (err) {
+      console.error('Error cancelling processing:', err);
+      setIsCancelling(false);
+    }
+  };
+
   if (error) {
     return (
       <Card className="p-8 backdrop-blur-sm bg-card/95 border-border/50">
@@ -122,6 +140,16 @@ export function ConversionStages({ fileName, file, onComplete, onError }) {
   const currentStepIndex = progressData.current_step || 0;
   const overallProgress = progressData.progress || 0;
   const steps = progressData.steps || [];
+  // The summary carries started_at rather than elapsed_time so it can be cached
+  const elapsedTime = progressData.started_at
+    ? Math.max(0, Math.floor(Date.now() / 1000 - progressData.started_at))
+    : 0;
+  const budget = progressData.budget;
+  const budgetNotes = {
+    throttled: "Close to a token/cost ceiling, AI calls are slowed down",
+    paused: "Daily token/cost ceiling reached, waiting for budget to free up",
+    exceeded: "Session token/cost ceiling reached",
+  };
 
   return (
     <Card className="p-8 backdrop-blur-sm bg-card/95 border-border/50">
@@ -130,9 +158,9 @@ export function ConversionStages({ fileName, file, onComplete, onError }) {
           Converting your file
         </h2>
         <p className="text-muted-foreground">{fileName}</p>
-        {progressData.elapsed_time && (
+        {elapsedTime > 0 && (
           <p className="text-sm text-muted-foreground mt-1">
-            Elapsed time: {Math.floor(progressData.elapsed_time / 60)}:{(progressData.elapsed_time % 60).toString().padStart(2, '0')}
+            Elapsed time: {Math.floor(elapsedTime / 60)}:{(elapsedTime % 60).toString().padStart(2, '0')}
           </p>
         )}
       </div>
@@ -155,6 +183,30 @@ export function ConversionStages({ fileName, file, onComplete, onError }) {
           </div>
         </div>
 
+        {/* Budget */}
+        {budget && (
+          <div className="space-y-1 text-sm">
+            <div className="flex justify-between">
+              <span className="text-muted-foreground">Tokens used</span>
+              <span className="text-foreground font-medium">
+                {budget.tokens.toLocaleString()} (projected {budget.projected_tokens.toLocaleString()})
+              </span>
+            </div>
+            <div className="flex justify-between">
+              <span className="text-muted-foreground">Cost</span>
+              <span className="text-foreground font-medium">
+                ${budget.cost.toFixed(2)} (projected ${budget.projected_cost.toFixed(2)})
+              </span>
+            </div>
+            {budgetNotes[budget.state] && (
+              <div className="flex items-center p-3 mt-2 bg-amber-50/50 dark:bg-amber-950/20 border border-amber-200/50 dark:border-amber-800/30 rounded-lg">
+                <AlertTriangle className="w-4 h-4 mr-2 text-amber-600 dark:text-amber-400" />
+                <span className="text-amber-700 dark:text-amber-300">{budgetNotes[budget.state]}</span>
+              </div>
+            )}
+          </div>
+        )}
+
         {/* Step Indicators */}
         <div className="space-y-3">
           {steps.map((stepLabel, index) => {
@@ -241,6 +293,20 @@ export function ConversionStages({ fileName, file, onComplete, onError }) {
             );
           })}
         </div>
+
+        {isProcessing && (
+          <div className="flex justify-center pt-2">
+            <Button
+              onClick={handleCancel}
+              disabled={isCancelling}
+              variant="outline"
+              className="cursor-pointer"
+            >
+              <XCircle className="w-4 h-4 mr-2" />
+              {isCancelling ? "Cancelling..." : "Cancel conversion"}
+            </Button>
+          </div>
+        )}
       </div>
     </Card>
   );
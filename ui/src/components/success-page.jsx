@@ -16,7 +16,8 @@ export function SuccessPage({ fileName, results, onReset }) {
   const handleDownload = async () => {
     try {
       if (results?.results?.[0]?.package_name) {
-        const blob = await apiClient.downloadFile(`generated_AF/${results.results[0].package_name}.zip`);
+        const packagePath = results.results[0].package_path || `generated_AF/${results.results[0].package_name}.zip`;
+        const blob = await apiClient.downloadFile(packagePath);
         const url = window.URL.createObjectURL(blob);
         const link = document.createElement("a");
         link.href = url;
@@ -68,8 +68,22 @@ class ApiClient {
     return response.json();
   }
 
-  async getProgress(sessionId) {
-    const response = await fetch(`${API_BASE_URL}/progress/${sessionId}`);
+  async cancelProcessing(sessionId) {
+    const response = await fetch(`${API_BASE_URL}/process/${sessionId}/cancel`, {
+      method: 'POST',
+    });
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.error || 'Failed to cancel processing');
+    }
+
+    return response.json();
+  }
+
+  async getProgress(sessionId, { summary = false } = {}) {
+    const query = summary ? '?summary=1' : '';
+    const response = await fetch(`${API_BASE_URL}/progress/${sessionId}${query}`);
 
     if (!response.ok) {
       const error = await response.json();
@@ -90,6 +104,24 @@ class ApiClient {
     return response.json();
   }
 
+  async getSessionResults(sessionId, { after = null, limit = 100, fields = [] } = {}) {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (after) {
+      params.set('after', after);
+    }
+    if (fields.length) {
+      params.set('fields', fields.join(','));
+    }
+    const response = await fetch(`${API_BASE_URL}/sessions/${sessionId}/results?${params}`);
+
+    if (!response.ok) {
+      const error = await response.json();
+      throw new Error(error.error || 'Failed to get results');
+    }
+
+    return response.json();
+  }
+
   async downloadFile(filename) {
     const response = await fetch(`${API_BASE_URL}/download/${filename}`);
 